@@ -0,0 +1,58 @@
+"""Timings for from_json_parallel / json_parallel on 10 ** 5 instances
+
+Run with `python benchmarks/parallel.py` from the project root.
+
+The parent process still builds every instance from the workers' codec
+records, or encodes every instance for them, so its share of the work
+bounds the speedup whatever the number of workers: the "cap" lines are
+the serial time over that share.
+"""
+from timeit import timeit
+
+import singularity as S
+from singularity import codec
+
+
+N = 10 ** 5
+WORKERS = 4
+
+
+class Pet(S.Base):
+    name = S.StringField()
+    species = S.StringField()
+
+
+class Person(S.Base):
+    name = S.StringField()
+    age = S.NumberField()
+    pets = S.ListField(Pet)
+
+
+def run(label, statement, number=3):
+    elapsed = timeit(statement, number=number) / number
+    print(f"{label:<48} {elapsed * 1000:10.2f} ms")
+    return elapsed
+
+
+def main():
+    items = [
+        {"name": f"Person {i}", "age": i % 90, "pets": [{"name": "Rex", "species": "dog"}]}
+        for i in range(N)
+    ]
+    chunks = [items[start: start + 1000] for start in range(0, N, 1000)]
+    people = [Person.m.from_json(item) for item in items]
+    records = codec.dump_many(people, allow_pickle=True)
+
+    serial = run("from_json, serial", lambda: [Person.m.from_json(item) for item in items])
+    adopt = run("parent share: codec.load_many", lambda: list(codec.load_many(records, Person, allow_pickle=True)))
+    run(f"from_json_parallel, {WORKERS} workers", lambda: Person.m.from_json_parallel(chunks, workers=WORKERS))
+    print(f"{'  cap':<48} {serial / adopt:10.2f} x")
+
+    serial = run("json, serial", lambda: [person.m.json() for person in people])
+    encode = run("parent share: codec.dump_many", lambda: codec.dump_many(people, allow_pickle=True))
+    run(f"json_parallel, {WORKERS} workers", lambda: Person.m.json_parallel(people, workers=WORKERS))
+    print(f"{'  cap':<48} {serial / encode:10.2f} x")
+
+
+if __name__ == "__main__":
+    main()
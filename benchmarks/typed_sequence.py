@@ -0,0 +1,49 @@
+"""Timings for TypedSequence bulk operations on 10 ** 6 items
+
+Run with `python benchmarks/typed_sequence.py` from the project root.
+"""
+from timeit import timeit
+
+import singularity as S
+
+
+N = 10 ** 6
+
+
+class Item:
+    pass
+
+
+class Series(S.Base):
+    items = S.ListField(Item)
+    samples = S.ListField(float)
+
+
+def run(label, statement, number=5):
+    elapsed = timeit(statement, number=number) / number
+    print(f"{label:<48} {elapsed * 1000:10.2f} ms")
+
+
+def append_all(items):
+    sequence = S.fields.TypedSequence(Item)
+    for item in items:
+        sequence.append(item)
+
+
+def main():
+    items = [Item() for _ in range(N)]
+    samples = [float(i) for i in range(N)]
+    series = Series()
+    sequence = S.fields.TypedSequence(Item, items)
+
+    run("TypedSequence(Item, list) - bulk checked", lambda: S.fields.TypedSequence(Item, items))
+    run("TypedSequence(Item, TypedSequence) - no checks", lambda: S.fields.TypedSequence(Item, sequence))
+    run("ListField.__set__ adopting a TypedSequence", lambda: setattr(series.d, "items", sequence))
+    run("extend by 10 ** 6 items", lambda: S.fields.TypedSequence(Item).extend(items))
+    run("append 10 ** 6 items one by one", lambda: append_all(items), number=1)
+    run("TypedSequence(float, list) - array backed", lambda: S.fields.TypedSequence(float, samples))
+    run("ListField(float).json", lambda: Series.f.samples.json(S.fields.TypedSequence(float, samples)))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,8 @@ setup(
     long_description = open('README.md').read(),
     requires=['dateparser'],
     extras_require={
-        'simple_model': 'pysimplemodel'
+        'simple_model': 'pysimplemodel',
+        'numpy': 'numpy',
     },
     test_requires = ['pytest'],
     classifiers = [
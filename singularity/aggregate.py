@@ -0,0 +1,303 @@
+from bisect import bisect_right
+import math
+import weakref
+
+from .columns import Collection, _numpy
+from .fields import _SENTINEL
+
+
+MEASURES = ("sum", "min", "max", "mean")
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _group_totals(np, codes, values, size):
+    # Sums, minimums and maximums of `values` by group code, as lists of
+    # Python numbers - ints stay ints, and are never rounded
+    if values.dtype.kind == "f":
+        sums = np.bincount(codes, weights=values, minlength=size)
+        mins, maxs = np.full(size, np.inf), np.full(size, -np.inf)
+    elif values.dtype.kind in "iu" and (
+        not len(values) or max(-int(values.min()), int(values.max())) * len(values) <= _INT64_MAX
+    ):
+        # No sum can overflow
+        sums = np.zeros(size, dtype=np.int64)
+        np.add.at(sums, codes, values)
+        mins, maxs = np.full(size, _INT64_MAX), np.full(size, -_INT64_MAX)
+    else:
+        sums, mins, maxs = [0] * size, [math.inf] * size, [-math.inf] * size
+        for code, value in zip(codes.tolist(), values.tolist()):
+            sums[code] += value
+            if value < mins[code]:
+                mins[code] = value
+            if value > maxs[code]:
+                maxs[code] = value
+        return sums, mins, maxs
+    np.minimum.at(mins, codes, values)
+    np.maximum.at(maxs, codes, values)
+    return sums.tolist(), mins.tolist(), maxs.tolist()
+
+
+class _Stats:
+    # Running statistics for one measured field in one group.
+    __slots__ = ("n", "sum", "min", "max", "hist", "stale")
+
+    def __init__(self, bins=None):
+        self.n = 0
+        self.sum = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.hist = [0] * (len(bins) - 1) if bins is not None else None
+        self.stale = False
+
+
+class Aggregation:
+    """Live grouped statistics over all instances of a model in a context.
+
+    Created with `context.aggregate(Model, group_by="status", sum="amount")`.
+    The first computation runs vectorized over a columnar copy of the
+    instances. Afterwards, the field watchers keep the figures up to date
+    as instances are created, changed or collected, with no rescans
+    (except for a group's min or max when its current extreme is removed).
+
+    Call `close()` to stop tracking changes.
+    """
+
+    def __init__(self, context, model, group_by=None, bins=None, **measures):
+        self.context = context
+        self.model = model
+        self.group_by = group_by
+        self.bins = list(bins) if bins is not None else None
+        self.measures = {}
+        for op, fields in measures.items():
+            if op not in MEASURES + ("hist",):
+                raise TypeError(f"Unknown aggregation {op!r}")
+            if isinstance(fields, str):
+                fields = [fields]
+            for field_name in fields:
+                self.measures.setdefault(field_name, set()).add(op)
+        if "hist" in measures and self.bins is None:
+            raise TypeError("'hist' needs the bin edges passed as 'bins'")
+        unknown = set(self.measures) | ({group_by} if group_by else set())
+        unknown -= set(model.m.fields)
+        if unknown:
+            raise KeyError(f"Unknown fields {sorted(unknown)!r} for {model.__name__!r}")
+
+        self.groups = {}
+        self.members = {}
+        # Weak references to the live instances whose IDs were taken over
+        # by a later instance, by ID: counted again once it is collected
+        self._displaced = {}
+        self._watched = [model.m.fields[name] for name in self.measures]
+        if group_by:
+            self._watched.append(model.m.fields[group_by])
+        self._compute(list(context.instances(model)))
+        for field in self._watched:
+            field.watch(self._on_change)
+        context.aggregations.append(self)
+
+    def close(self):
+        for field in self._watched:
+            field.unwatch(self._on_change)
+        if self in self.context.aggregations:
+            self.context.aggregations.remove(self)
+
+    def _new_group(self):
+        return {"count": 0, "stats": {name: _Stats(self.bins) for name in self.measures}}
+
+    def _compute(self, instances):
+        np = _numpy()
+        collection = Collection(self.model, instances)
+        if self.group_by:
+            column = collection.columns[self.group_by]
+            if column.categories is not None:
+                keys = [
+                    column.categories[code] if valid else None
+                    for code, valid in zip(column.values.tolist(), column.mask.tolist())
+                ]
+            else:
+                keys = [
+                    value if valid else None
+                    for value, valid in zip(column.values.tolist(), column.mask.tolist())
+                ]
+        else:
+            keys = [None] * len(instances)
+        index = {}
+        inverse = np.fromiter(
+            (index.setdefault(key, len(index)) for key in keys), dtype=np.intp, count=len(keys)
+        )
+        group_keys = list(index)
+        size = len(group_keys)
+        counts = np.bincount(inverse, minlength=size)
+        for key, count in zip(group_keys, counts.tolist()):
+            group = self.groups[key] = self._new_group()
+            group["count"] = count
+
+        for field_name in self.measures:
+            column = collection.columns[field_name]
+            valid = column.mask
+            codes = inverse[valid]
+            values = column.values[valid]
+            n = np.bincount(codes, minlength=size).tolist()
+            sums, mins, maxs = _group_totals(np, codes, values, size)
+            if self.bins is not None:
+                values = values.astype(np.float64)
+                bin_index = np.searchsorted(self.bins, values, side="right") - 1
+                # As in numpy.histogram, the last bin includes its right edge
+                bin_index[values == self.bins[-1]] = len(self.bins) - 2
+                inside = (bin_index >= 0) & (bin_index < len(self.bins) - 1)
+                hist = np.zeros((size, len(self.bins) - 1), dtype=np.int64)
+                np.add.at(hist, (codes[inside], bin_index[inside]), 1)
+            for position, key in enumerate(group_keys):
+                stats = self.groups[key]["stats"][field_name]
+                stats.n = n[position]
+                stats.sum = sums[position]
+                stats.min = mins[position] if stats.n else math.inf
+                stats.max = maxs[position] if stats.n else -math.inf
+                if self.bins is not None:
+                    stats.hist = hist[position].tolist()
+
+        for instance, key in zip(instances, keys):
+            self._track(instance, key)
+
+    def _track(self, instance, key):
+        data = instance._data
+        values = {name: data.get(name, _SENTINEL) for name in self.measures}
+        id_ = instance.id
+        ref = weakref.ref(instance, lambda ref, id_=id_: self._on_collected(id_, ref))
+        self.members[id_] = [ref, key, values]
+
+    # Incremental maintenance
+
+    def add(self, instance):
+        """Start counting an instance - called by the context on registration
+
+        As in the context, an instance registered with the ID of a counted
+        one takes its place.
+        """
+        if not isinstance(instance, self.model):
+            return
+        entry = self.members.get(instance.id)
+        if entry is not None:
+            current = entry[0]()
+            if current is instance:
+                return
+            self._leave(entry[1], entry[2])
+            if current is not None:
+                self._displaced.setdefault(instance.id, []).append(entry[0])
+        group_key = instance._data.get(self.group_by, None) if self.group_by else None
+        self._track(instance, group_key)
+        self._enter(group_key, self.members[instance.id][2])
+
+    def _enter(self, key, values):
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = self._new_group()
+        group["count"] += 1
+        for name, value in values.items():
+            if value is not _SENTINEL:
+                self._add_value(group["stats"][name], value)
+
+    def _leave(self, key, values):
+        group = self.groups[key]
+        group["count"] -= 1
+        for name, value in values.items():
+            if value is not _SENTINEL:
+                self._remove_value(group["stats"][name], value)
+        if not group["count"]:
+            del self.groups[key]
+
+    def _add_value(self, stats, value):
+        stats.n += 1
+        stats.sum += value
+        if value < stats.min:
+            stats.min = value
+        if value > stats.max:
+            stats.max = value
+        if stats.hist is not None:
+            self._bin(stats, value, 1)
+
+    def _remove_value(self, stats, value):
+        stats.n -= 1
+        stats.sum -= value
+        if value <= stats.min or value >= stats.max:
+            stats.stale = True
+        if stats.hist is not None:
+            self._bin(stats, value, -1)
+
+    def _bin(self, stats, value, delta):
+        bins = self.bins
+        if bins[0] <= value <= bins[-1]:
+            position = min(bisect_right(bins, value) - 1, len(bins) - 2)
+            stats.hist[position] += delta
+
+    def _on_change(self, instance, field, old, new):
+        entry = self.members.get(getattr(instance, "_id", None))
+        if entry is None or entry[0]() is not instance:
+            # Not a registered instance - e.g. a row proxy
+            return
+        ref, key, values = entry
+        if self.group_by and field.name == self.group_by:
+            new_key = None if new is _SENTINEL else new
+            self._leave(key, values)
+            entry[1] = new_key
+            self._enter(new_key, values)
+        # The group key field may be measured as well
+        if field.name in values:
+            stats = self.groups[entry[1]]["stats"][field.name]
+            if old is not _SENTINEL:
+                self._remove_value(stats, old)
+            if new is not _SENTINEL:
+                self._add_value(stats, new)
+            values[field.name] = new
+
+    def _on_collected(self, id_, ref):
+        entry = self.members.get(id_)
+        if entry is None or entry[0] is not ref:
+            return
+        del self.members[id_]
+        self._leave(entry[1], entry[2])
+        displaced = self._displaced.pop(id_, [])
+        while displaced:
+            instance = displaced.pop()()
+            if instance is not None:
+                if displaced:
+                    self._displaced[id_] = displaced
+                self.add(instance)
+                break
+
+    def _refresh(self, key, name):
+        stats = self.groups[key]["stats"][name]
+        present = [
+            entry[2][name] for entry in self.members.values()
+            if entry[1] == key and entry[2][name] is not _SENTINEL
+        ]
+        stats.min = min(present, default=math.inf)
+        stats.max = max(present, default=-math.inf)
+        stats.stale = False
+
+    def result(self):
+        """`{group: {"count": n, "sum_amount": ..., ...}}` for the current data"""
+        result = {}
+        for key, group in self.groups.items():
+            row = result[key] = {"count": group["count"]}
+            for name, ops in self.measures.items():
+                stats = group["stats"][name]
+                if stats.stale:
+                    self._refresh(key, name)
+                if "sum" in ops:
+                    row[f"sum_{name}"] = stats.sum
+                if "mean" in ops:
+                    row[f"mean_{name}"] = stats.sum / stats.n if stats.n else None
+                if "min" in ops:
+                    row[f"min_{name}"] = stats.min if stats.n else None
+                if "max" in ops:
+                    row[f"max_{name}"] = stats.max if stats.n else None
+                if "hist" in ops:
+                    row[f"hist_{name}"] = list(stats.hist)
+        return result
+
+    def __getitem__(self, key):
+        return self.result()[key]
+
+    def __repr__(self):
+        return f"<Aggregation of {self.model.__name__!r} by {self.group_by!r}>"
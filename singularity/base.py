@@ -1,16 +1,24 @@
+from collections.abc import MutableMapping
+from functools import partial
 import json
+import sys
 import uuid
-import weakref
 
-from .fields import Field, ComputedField, _SENTINEL, TypedSequence, IDField
+from .fields import (
+    Field, ComputedField, _SENTINEL, TypedSequence, IDField, UNSET, ListField, _Snapshot, _borrowers, _settle,
+    _use_layout
+)
+from . import codec, parallel, digest, documents
+from .columns import Collection
 from .context_ import get_context
-
-context = get_context()
+from .registry import model_registry
+from .paths import compile_path, get_item, PathTrie
+from .refs import to_json as json_with_refs, from_json as from_json_with_refs
+from .documents import DocumentData, new_node
 
 
 class Bindable:
 
-    _cache = {}
     _instance = None
 
     def __init__(self, owner, **kwargs):
@@ -18,25 +26,28 @@ class Bindable:
             self._owner = owner
         super().__init__(**kwargs)
 
+    @classmethod
+    def _bound_type(cls):
+        # Bound namespaces keep their instance in a slot and share the
+        # attributes of the unbound one, so binding copies nothing
+        bound_type = cls.__dict__.get("_bound_subclass")
+        if bound_type is None:
+            bound_type = type(cls.__name__, (cls,), {"__slots__": ("_instance",)})
+            cls._bound_subclass = bound_type
+        return bound_type
+
     def _bind(self, parent_instance):
-        instance = type(self)(None)
-        instance.__dict__ = self.__dict__.copy()
-        instance._instance = parent_instance
+        instance = object.__new__(self._bound_type())
+        object.__setattr__(instance, "__dict__", self.__dict__)
+        object.__setattr__(instance, "_instance", parent_instance)
         return instance
 
     def __get__(self, instance, owner):
         if instance is None:
             return self
-
-        if self not in self.__class__._cache:
-            self.__class__._cache[self] = {}
-        descriptor_cache = self.__class__._cache[self]
-        ref = instance.id
-        if ref in descriptor_cache:
-            return descriptor_cache[ref]
-        descriptor_cache[ref] = bound_instance = self._bind(instance)
-        return bound_instance
-
+        # Not cached: a cache entry would either keep the instance alive
+        # or, held on the instance, delay its collection until a gc pass
+        return self._bind(instance)
 
 
 class DataContainer(Bindable):
@@ -47,7 +58,13 @@ class DataContainer(Bindable):
         return attr.__get__(self._instance, self._owner)
 
     def __setattr__(self, attr, value):
-        if attr in ["_instance",  "_owner", "__dict__"] or attr not in self._owner.m.fields:
+        if attr in ["_instance",  "_owner", "__dict__"]:
+            return super().__setattr__(attr, value)
+        if attr not in self._owner.m.fields:
+            if self._instance is not None:
+                # Bound namespaces share their attributes with the unbound
+                # one: unknown names are ignored, as they are not fields
+                return
             return super().__setattr__(attr, value)
         attr = self._owner.f.__dict__[attr]
         attr.__set__(self._instance, value)
@@ -62,6 +79,57 @@ class DataContainer(Bindable):
         return list(self._instance.m.defined_fields() if self._instance and self._instance else self._owner.m.defined_fields())
 
 
+class RecordData(MutableMapping):
+    """Mapping view over the slots of a `layout="record"` instance.
+
+    It is what such instances expose as `_data`, and is created on demand,
+    so instances carry no per-object dictionary.
+    """
+
+    __slots__ = ("_instance",)
+
+    def __init__(self, instance):
+        self._instance = instance
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self._instance, type(self._instance).m.slot_attrs[key])
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        setattr(self._instance, type(self._instance).m.slot_attrs[key], value)
+
+    def __delitem__(self, key):
+        try:
+            delattr(self._instance, type(self._instance).m.slot_attrs[key])
+        except AttributeError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        instance = self._instance
+        for name, attr in type(instance).m.slot_attrs.items():
+            if hasattr(instance, attr):
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"RecordData({dict(self)!r})"
+
+
+def _get_record_data(instance):
+    return RecordData(instance)
+
+
+def _set_record_data(instance, data):
+    for attr in type(instance).m.slot_attrs.values():
+        if hasattr(instance, attr):
+            delattr(instance, attr)
+    RecordData(instance).update(data)
+
+
 class FieldContainer:
     def __iter__(self):
         yield from self.__dict__.keys()
@@ -72,7 +140,10 @@ class FieldContainer:
 
 class Instrumentation(Bindable):
 
-    def json(self, serialize=False, obj=None):
+    def json(self, serialize=False, obj=None, refs=False):
+        # With refs=True, instances met again are written as {"$ref": id}
+        if refs:
+            return json_with_refs(obj or self._instance, serialize)
         sentinel = object()
         result = {}
         for field_name, field in self.fields.items():
@@ -81,14 +152,19 @@ class Instrumentation(Bindable):
                 result[field_name] = field.json(value)
         return result if not serialize else json.dumps(result)
 
-    def from_json(self, data, strict=False):
+    def from_json(self, data, strict=False, refs=False):
+        if refs:
+            return from_json_with_refs(self._owner, data, strict)
         if isinstance(data, str):
             data = json.loads(data)
-        instance = self._owner()
+        id_ = data.get("id")
+        if id_ is not None:
+            # IDs in JSON are strings, even for classes with trusted IDs
+            id_ = self.fields["id"].from_json(id_)
+        instance = self._owner(id=id_)
         for key, value in data.items():
             field = self.fields.get(key)
             if isinstance(field, IDField):
-                instance._id = field.from_json(value)
                 continue
             if isinstance(field, ComputedField):
                 continue
@@ -97,12 +173,43 @@ class Instrumentation(Bindable):
             elif hasattr(field, "m"):
                 value = field.m.from_json(value)
 
-            if strict and field is None:
-                raise KeyError(f"Unknown field {key!r}")
+            if field is None:
+                if strict:
+                    raise KeyError(f"Unknown field {key!r}")
+                continue
 
             setattr(instance.d, key, value)
         return instance
 
+    def document(self):
+        """The live document dict of a `layout="document"` instance"""
+        data = self._instance._data
+        if not isinstance(data, DocumentData):
+            raise TypeError(f"{self._owner.__name__!r} instances are not stored as documents")
+        return data.node
+
+    def record(self):
+        """Field values in slot order, with UNSET for fields with no value"""
+        data = self._instance._data
+        return tuple(data.get(name, UNSET) for name in self.slots)
+
+    def sizeof(self):
+        """Bytes used by the instance itself and its field storage"""
+        instance = self._instance
+        size = sys.getsizeof(instance)
+        if hasattr(instance, "__dict__"):
+            size += sys.getsizeof(instance.__dict__)
+        if not self.record_layout:
+            size += sys.getsizeof(instance._data)
+        return size
+
+    def from_json_parallel(self, chunks, workers=None, ordered=True):
+        """Decode chunks of JSON records in a process pool - see `singularity.parallel`"""
+        return parallel.from_json_parallel(self._owner, chunks, workers, ordered)
+
+    def json_parallel(self, instances, workers=None, chunk_size=1000, serialize=False, ordered=True):
+        return parallel.json_parallel(self._owner, instances, workers, chunk_size, serialize, ordered)
+
     def defined_fields(self):
         if not self._instance or not self._instance:
             yield from self.fields.keys()
@@ -123,69 +230,123 @@ class Instrumentation(Bindable):
     def copy(self):
         # creates a new instance from parent class with all data
         # copied, but a new ID and as a separate object in context.
+        # Sequences are shared until either instance changes them.
         if not self._instance:
             raise TypeError("Only instances of dataclasses can be copied")
         instance = self._owner()
         instance._data.update(self._instance._data)
+        if self.layout == "document":
+            # Lists are copied into the new document
+            return instance
+        fields = self._owner.m.fields
+        snapshot = _Snapshot(deep=False)
+        names = []
+        for name, value in self._instance._data.items():
+            if isinstance(fields.get(name), ListField):
+                snapshot.lend(value)
+                names.append(name)
+        snapshot.borrow(instance, names)
         return instance
 
     def deepcopy(self, memo=None):
-        raise NotImplementedError
-        from copy import deepcopy
+        # Child instances and sequences are shared until changed, on either
+        # side (see fields._loans), so the cost is in what is changed afterwards.
         if not self._instance:
             raise TypeError("Only instances of dataclasses can be deep-copied")
-        instance = self._owner()
-        instance._data = deepcopy(self._instance._data, memo)
-        return instance
+        return _deepcopy(self._instance, {} if memo is None else memo)
+
+    def digest(self):
+        """Content digest (16 bytes): equal instances have equal digests
+
+        Kept up to date as fields change - see `singularity.digest`.
+        """
+        if not self._instance:
+            raise TypeError("Only instances have digests")
+        return digest.digest(self._instance)
+
+    def diff(self, other):
+        """`{path: (own_value, other_value)}` for the fields that differ from `other`"""
+        if not self._instance:
+            raise TypeError("Only instances can be compared")
+        return digest.diff(self._instance, other)
+
+    def compile_path(self, path):
+        """Return a reusable accessor for a dotted item path
+
+        >>> city = Person.m.compile_path("addresses.*.city")
+        >>> list(city.get_many(person))
+        """
+        return compile_path(path)
+
+    def pluck(self, instances, path, default=None, typecode=None, dtype=None):
+        """Extract the value at `path` from each of `instances`
+
+        See `CompiledPath.pluck` for the return values.
+        """
+        return compile_path(path).pluck(instances, default, typecode, dtype)
+
+    @property
+    def Collection(self):
+        """Columnar collection class for this model: `Model.m.Collection(instances)`"""
+        return partial(Collection, self._owner)
+
+    def to_columns(self, instances):
+        """Columnar (struct-of-arrays) copy of `instances`. Needs NumPy."""
+        return Collection(self._owner, instances)
+
+    def to_bytes(self, allow_pickle=False):
+        """Compact binary record for the instance - see `singularity.codec`"""
+        return codec.encode(self._instance, allow_pickle=allow_pickle)
+
+    def from_bytes(self, data, allow_pickle=False):
+        return codec.decode(data, 0, self._owner, allow_pickle=allow_pickle)[0]
 
     def get_many(self, key, default=None):
-        try:
-            if "." not in key:
-                if key == "*":
-                    raise KeyError("'*' only makes sense for sequence components of the key")
-                yield getattr(self._instance.d, key)
-                return
-            item = self._instance
-            for comp, path_remainder in self.parse_path(key):
-                if comp == "*":
-                    if not isinstance(item, TypedSequence):
-                        raise KeyError("'*' only makes sense for sequence components of the key")
-                    for element in item:
-                        if not path_remainder:
-                            yield element
-                        elif isinstance(element, Base):
-                            yield from element.m.get_many(path_remainder, default)
-                        else:
-                            raise KeyError(f"Components are not an instance of Base after '*' in {key!r}")
-
-                    return
-                if isinstance(comp, int):
-                    if isinstance(item, TypedSequence):
-                        item = item[comp]
-                        continue
-                    raise KeyError(f"Integer {comp!r} not allowed in this part of the path")
-                item = getattr(item.d, comp)
-            yield item
-
-        except (KeyError, AttributeError):
-            yield default
+        if "." not in key and key == "*":
+            raise KeyError("'*' only makes sense for sequence components of the key")
+        yield from compile_path(key).get_many(self._instance, default)
 
     def get(self, path, default=None):
-        if "*" in path:
-            raise KeyError("Invalid '*' in item path")
-        return next(self.get_many(path, default))
+        return get_item(self._instance, path, default)
 
     def _get_inner_item(self, path):
-        if "." in path:
-            path_prefix, last_component = path.rsplit(".", 1)
-            for inner in self.get_many(path_prefix):
-                yield inner, last_component
-
-        else:
-            inner = self._instance
-            last_component = path
+        compiled = compile_path(path)
+        last_component = path.rpartition(".")[2]
+        for inner in compiled.inner_items(self._instance):
             yield inner, last_component
 
+    def update(self, changes):
+        """Set many item paths at once: `instance.m.update({"father.name": "João"})`
+
+        Paths are grouped by common prefixes, so each shared prefix
+        is walked once. All values are validated before any is set:
+        if one of them is rejected, the instance is left unchanged.
+        """
+        if hasattr(changes, "items"):
+            changes = changes.items()
+        trie = PathTrie.from_items(changes)
+
+        actions = []
+        for inner_item, last, value, path in trie.targets(self._instance):
+            if isinstance(inner_item, TypedSequence):
+                if last == "*":
+                    indexes = range(len(inner_item))
+                elif isinstance(last, int) and -len(inner_item) <= last < len(inner_item):
+                    indexes = (last,)
+                else:
+                    raise KeyError(path)
+                inner_item._check(value)
+                actions.extend((inner_item.__setitem__, index, value) for index in indexes)
+                continue
+            field = type(inner_item).m.fields.get(last) if isinstance(inner_item, Base) else None
+            if field is None:
+                raise KeyError(f"Field {path!r} is not defined for instances of {self._owner.__name__!r}")
+            field.validate(type(inner_item), value)
+            actions.append((field.__set__, inner_item, value))
+
+        for action, target, value in actions:
+            action(target, value)
+
     def settable_fields(self):
         for key, value in self.fields.items():
             if not isinstance(value, ComputedField) or hasattr(value, "setter"):
@@ -206,7 +367,8 @@ class Meta(type):
     # class attributes are ordered by default.
     # otherwise, __prepare__ should return an OrderedDict
 
-    def __new__(metacls, name, bases, attrs, strict=False, **kwargs):
+    def __new__(metacls, name, bases, attrs, strict=False, id_factory=None, trusted_ids=None,
+                layout=None, **kwargs):
 
         container = FieldContainer()
         computed_fields = set()
@@ -216,16 +378,36 @@ class Meta(type):
             if isinstance(field, ComputedField):
                 computed_fields.add(field)
 
+        declared = {}
         for attr_name, value in list(attrs.items()):
             if not isinstance(value, Field):
                 continue
             container.__dict__[attr_name] = value
             if strict and attr_name != "id":
                 del attrs[attr_name]
+                declared[attr_name] = value
             if isinstance(value, ComputedField):
                 computed_fields.add(value)
 
-        if strict:
+        parent_m = next((base.m for base in bases if isinstance(base, Meta)), None)
+        if layout is None:
+            layout = parent_m.layout if parent_m else "dict"
+        if layout not in ("dict", "record", "document"):
+            raise TypeError(f"Unknown layout {layout!r}")
+
+        slot_names = ()
+        if layout == "record":
+            # Each field gets a fixed slot, instead of a key on a per-instance dict.
+            inherited = parent_m.slots if parent_m and parent_m.layout == "record" else ()
+            slot_names = inherited + tuple(
+                field_name for field_name, field in container.__dict__.items()
+                if not isinstance(field, ComputedField) and field_name not in inherited
+            )
+            attrs["__slots__"] = tuple(attrs.get("__slots__", ())) + tuple(
+                f"_r_{field_name}" for field_name in slot_names[len(inherited):]
+            )
+            attrs["_data"] = property(_get_record_data, _set_record_data)
+        if layout != "record" and strict:
             slots = set(attrs.get("__slots__", ()))
             slots.update({"_data"})
             attrs["__slots__"] = tuple(slots)
@@ -238,44 +420,108 @@ class Meta(type):
         cls.m.strict = strict
         cls.m.fields = container.__dict__
         cls.m.computed_fields = computed_fields
-
-        if strict:
-            for field_name, field in cls.m.fields.items():
-                field.__set_name__(cls, field_name)
+        cls.m.layout = layout
+        cls.m.record_layout = layout == "record"
+        # Field names in slot order, and the instance attributes holding them
+        cls.m.slots = slot_names
+        cls.m.slot_attrs = {field_name: f"_r_{field_name}" for field_name in slot_names}
+
+        if id_factory is None and parent_m:
+            id_factory = parent_m.id_factory
+        if trusted_ids is None:
+            trusted_ids = parent_m.trusted_ids if parent_m else False
+        # When None, the active context's "id_factory" is used.
+        cls.m.id_factory = id_factory
+        # Trusted IDs are stored as passed in, without being re-parsed as UUIDs
+        cls.m.trusted_ids = trusted_ids
+
+        # Taken out of the class body, so not named by type.__new__.
+        # Inherited fields keep the class declaring them as their owner.
+        for field_name, field in declared.items():
+            field.__set_name__(cls, field_name)
+        # Record layout fields read and write the slots, others `_data`
+        for field_name, field in container.__dict__.items():
+            if not isinstance(field, ComputedField):
+                _use_layout(field, field_name in cls.m.slot_attrs)
+
+        model_registry[f"{cls.__module__}.{cls.__qualname__}"] = cls
 
         return cls
 
 
+def _deepcopy(source, memo):
+    copied = memo.get(id(source))
+    if copied is not None:
+        return copied
+    # Instances copied with the same memo share a snapshot
+    snapshot = memo.get(_Snapshot)
+    if snapshot is None:
+        snapshot = memo[_Snapshot] = _Snapshot(deep=True)
+    snapshot.lend(source)
+    memo[id(source)] = copied = snapshot.get(source)
+    return copied
+
+
+def _restore(cls, id_, data=None):
+    if cls.m.layout == "document":
+        # Documents are pickled as their dict
+        return documents.root(cls, data)
+    # Field values come next, through __setstate__: created first, the
+    # instance can be referred to from its own values, as in cycles
+    instance = cls.__new__(cls)
+    instance._id = id_
+    if data is not None:
+        # Pickled with the values as arguments, by earlier versions
+        instance.__setstate__(data)
+    return instance
+
+
 class Base(metaclass=Meta):
     __slots__ = ("__weakref__", "_id")
 
     def __init__(self, *args, **kwargs):
 
-        self._data = {}
+        cls_m = type(self).m
+        context = get_context()
 
         id_ = kwargs.pop("id", None)
         if not id_:
-            id_ = uuid.uuid4()
-        elif not isinstance(id_, uuid.UUID):
+            id_ = (cls_m.id_factory or context.id_factory)()
+        elif not cls_m.trusted_ids and not isinstance(id_, uuid.UUID):
             id_ = uuid.UUID(id_)
         self._id = id_
 
+        if cls_m.layout == "document":
+            self._data = DocumentData(new_node(id_), type(self))
+        elif not cls_m.record_layout:
+            self._data = {}
+
+        # Fields are set straight through their descriptors, so that no
+        # bound "d" namespace has to be created and cached for each instance.
+        fields = cls_m.fields
         seem = set()
-        for field_name, arg in zip(self.m.settable_fields(), args):
-            setattr(self.d, field_name, arg)
+        for field_name, arg in zip(cls_m.settable_fields(), args):
+            fields[field_name].__set__(self, arg)
             seem.add(field_name)
 
         for field_name, arg in kwargs.items():
             if field_name in seem:
                 raise TypeError(f"Argument {field_name!r} passed twice")
 
-            setattr(self.d, field_name, arg)
+            if field_name in fields:
+                fields[field_name].__set__(self, arg)
+            else:
+                setattr(self.d, field_name, arg)
 
-        context.data[id_] = self._data
+        context.register(self)
+        if cls_m.layout == "document":
+            context.add_document(self)
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
+        if type(other) is type(self) and digest.differ(self, other):
+            return False
         sentinel = object()
         return all(
             getattr(self.d, field_name, sentinel) == getattr(other.d, field_name, sentinel)
@@ -303,25 +549,38 @@ class Base(metaclass=Meta):
     def __deepcopy__(self, memo=None):
         return self.m.deepcopy(memo)
 
+    def __reduce_ex__(self, protocol):
+        # Keeps the ID, and registers the unpickled instance in the context.
+        if _borrowers:
+            _settle(self)
+        if isinstance(self._data, DocumentData):
+            return _restore, (self.__class__, self._id, self._data.node)
+        return _restore, (self.__class__, self._id), dict(self._data)
+
     def __getstate__(self):
-        return self._data
+        if _borrowers:
+            _settle(self)
+        return dict(self._data)
 
     def __setstate__(self, state):
         self._data = state
+        get_context().register(self)
 
     # Mapping Methods
 
     def get(self, key, default=None):
-        return self.m.get(key, default)
+        return get_item(self, key, default)
 
     def __getitem__(self, key):
-        item = self.get(key, default=_SENTINEL)
+        item = get_item(self, key, _SENTINEL)
         if item is _SENTINEL:
             raise KeyError(key)
         return item
 
     def __setitem__(self, key, value):
-        for inner_item, last_component in self.m._get_inner_item(key):
+        compiled = compile_path(key)
+        last_component = key.rpartition(".")[2]
+        for inner_item in compiled.inner_items(self):
 
             if not inner_item or not isinstance(inner_item, (Base, Field, TypedSequence)):
                 raise KeyError(f"Field {key!r} is not defined for instances of {self.__class__.__name__!r}")
@@ -337,7 +596,9 @@ class Base(metaclass=Meta):
                 inner_item.__setitem__(int(last_component), value)
 
     def __delitem__(self, key):
-        for inner_item, last_component in self.m._get_inner_item(key):
+        compiled = compile_path(key)
+        last_component = key.rpartition(".")[2]
+        for inner_item in compiled.inner_items(self):
             if not isinstance(inner_item, TypedSequence):
                 delattr(inner_item.d, last_component)
             else:
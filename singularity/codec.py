@@ -0,0 +1,494 @@
+"""Compact binary encoding for singularity instances, driven by each class' fields.
+
+A record is laid out as:
+
+    schema id (u32) | instance id (16 bytes) | presence bitmap | field values...
+
+The schema id is a CRC of the class name and its field names and kinds,
+and is used to find the class back when decoding. Only fields with a
+value set are encoded, in field order. Numbers, dates, datetimes and
+UUIDs have fixed-width encodings, strings and nested records are
+prefixed by their length as a varint - an instance met again in the
+same record, as in cyclic graphs, is written as a zero length followed
+by its id, and decoded as the same instance. int and float lists are
+stored as raw little-endian arrays, so their items are read back as
+plain ints and floats, and ints beyond 64 bits can't be encoded in them.
+Integers beyond 64 bits and Decimals
+have tagged encodings of their own, and other values are stored as JSON
+when that reads them back unchanged.
+
+Anything else can only be pickled, and decoding a pickle runs arbitrary
+code: it is refused with a `CodecError` unless both sides are called
+with `allow_pickle=True`, for data that comes from a trusted source.
+"""
+from array import array
+import datetime
+from decimal import Decimal
+import json
+import pickle
+import struct
+import sys
+import uuid
+import zlib
+
+from . import documents
+from .context_ import get_context
+from .registry import model_registry
+from .fields import (
+    ComputedField, NumberField, StringField, DateField, DateTimeField, UUIDField,
+    TypeField, ListField, TypedSequence, ArraySequence, _interned, _borrowers, _settle
+)
+
+
+_schemas = {}
+_classes = {}
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_NAIVE = -0x8000
+
+_u32 = struct.Struct("<I")
+_i32 = struct.Struct("<i")
+_i64 = struct.Struct("<q")
+_f64 = struct.Struct("<d")
+_datetime = struct.Struct("<qh")
+
+# Tags for NumberField values
+_INT, _FLOAT, _BOOL, _BIG_INT, _DECIMAL = b"i", b"f", b"b", b"n", b"d"
+# Tags for values without an encoding of their own
+_JSON, _PICKLE = b"j", b"p"
+
+
+class CodecError(ValueError):
+    pass
+
+
+class Schema:
+    __slots__ = ("cls", "id", "fields", "bitmap_size")
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.fields = [
+            (name, field) for name, field in cls.m.fields.items()
+            if not isinstance(field, ComputedField)
+        ]
+        signature = f"{cls.__module__}.{cls.__qualname__}:" + ",".join(
+            f"{name}:{type(field).__name__}" for name, field in self.fields
+        )
+        self.id = zlib.crc32(signature.encode("utf-8"))
+        self.bitmap_size = (len(self.fields) + 7) // 8
+
+
+def schema(cls):
+    result = _schemas.get(cls)
+    if result is None:
+        result = _schemas[cls] = Schema(cls)
+        _classes[result.id] = cls
+    return result
+
+
+def alias(cls, original):
+    """Encode the instances of `cls` as instances of `original`"""
+    _schemas[cls] = schema(original)
+
+
+def _find_class(schema_id):
+    cls = _classes.get(schema_id)
+    if cls is None:
+        # Compute the schemas of classes not seen by the codec yet
+        for candidate in list(model_registry.values()):
+            schema(candidate)
+        cls = _classes.get(schema_id)
+    if cls is None:
+        raise CodecError(f"Unknown schema id {schema_id:#010x}")
+    return cls
+
+
+# Varints
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buffer, pos):
+    result = shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_bytes(out, data):
+    _write_varint(out, len(data))
+    out += data
+
+
+def _checked_end(buffer, end):
+    # Slices past the end of the buffer would silently come back short
+    if end > len(buffer):
+        raise CodecError("Truncated record")
+    return end
+
+
+def _read_bytes(buffer, pos):
+    size, pos = _read_varint(buffer, pos)
+    end = _checked_end(buffer, pos + size)
+    return buffer[pos: end], end
+
+
+def _read_uuid(buffer, pos):
+    end = _checked_end(buffer, pos + 16)
+    return uuid.UUID(bytes=bytes(buffer[pos: end])), end
+
+
+# Values
+
+def _json_safe(value):
+    # Whether `value` is read back from JSON unchanged
+    kind = type(value)
+    if value is None or kind in (bool, int, float, str):
+        return True
+    if kind is list:
+        return all(_json_safe(item) for item in value)
+    if kind is dict:
+        return all(type(key) is str and _json_safe(item) for key, item in value.items())
+    return False
+
+
+def _write_other(out, value, allow_pickle):
+    if _json_safe(value):
+        out += _JSON
+        _write_bytes(out, json.dumps(value, separators=(",", ":")).encode("utf-8"))
+    elif allow_pickle:
+        out += _PICKLE
+        _write_bytes(out, pickle.dumps(value))
+    else:
+        raise CodecError(
+            f"Can't encode {type(value).__name__!r} values without allow_pickle=True"
+        )
+
+
+def _read_other(buffer, pos, allow_pickle):
+    tag = buffer[pos: pos + 1]
+    data, pos = _read_bytes(buffer, pos + 1)
+    if tag == _JSON:
+        return json.loads(str(data, "utf-8")), pos
+    if tag == _PICKLE:
+        if not allow_pickle:
+            raise CodecError("Refusing to unpickle a value without allow_pickle=True")
+        return pickle.loads(data), pos
+    raise CodecError(f"Unknown value tag {bytes(tag)!r}")
+
+
+def _write_number(out, value, allow_pickle):
+    if type(value) is bool:
+        out += _BOOL
+        out.append(value)
+    elif type(value) is int and -(1 << 63) <= value < (1 << 63):
+        out += _INT
+        out += _i64.pack(value)
+    elif type(value) is int:
+        out += _BIG_INT
+        _write_bytes(out, value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True))
+    elif type(value) is float:
+        out += _FLOAT
+        out += _f64.pack(value)
+    elif type(value) is Decimal:
+        out += _DECIMAL
+        _write_bytes(out, str(value).encode("ascii"))
+    else:
+        _write_other(out, value, allow_pickle)
+
+
+def _read_number(buffer, pos, allow_pickle):
+    tag = buffer[pos: pos + 1]
+    if tag == _INT:
+        return _i64.unpack_from(buffer, pos + 1)[0], pos + 9
+    if tag == _FLOAT:
+        return _f64.unpack_from(buffer, pos + 1)[0], pos + 9
+    if tag == _BOOL:
+        return bool(buffer[pos + 1]), pos + 2
+    if tag == _BIG_INT:
+        data, pos = _read_bytes(buffer, pos + 1)
+        return int.from_bytes(data, "little", signed=True), pos
+    if tag == _DECIMAL:
+        data, pos = _read_bytes(buffer, pos + 1)
+        return Decimal(str(data, "ascii")), pos
+    return _read_other(buffer, pos, allow_pickle)
+
+
+def _write_datetime(out, value):
+    offset = value.utcoffset()
+    micros = (value.replace(tzinfo=None) - _EPOCH) // datetime.timedelta(microseconds=1)
+    minutes = _NAIVE if offset is None else offset // datetime.timedelta(minutes=1)
+    out += _datetime.pack(micros, minutes)
+
+
+def _read_datetime(buffer, pos):
+    micros, minutes = _datetime.unpack_from(buffer, pos)
+    value = _EPOCH + datetime.timedelta(microseconds=micros)
+    if minutes != _NAIVE:
+        value = value.replace(tzinfo=datetime.timezone(datetime.timedelta(minutes=minutes)))
+    return value, pos + _datetime.size
+
+
+def _write_array(out, value):
+    data = value._data
+    _write_varint(out, len(data))
+    if sys.byteorder == "big":
+        data = array(data.typecode, data)
+        data.byteswap()
+    out += data.tobytes()
+
+
+def _read_array(buffer, pos, type_):
+    count, pos = _read_varint(buffer, pos)
+    result = TypedSequence(type_)
+    end = _checked_end(buffer, pos + count * result._data.itemsize)
+    result._data.frombytes(buffer[pos: end])
+    if sys.byteorder == "big":
+        result._data.byteswap()
+    return result, end
+
+
+def _item_codec(type_):
+    # (writer, reader) for the items of a ListField
+    if hasattr(type_, "m") or hasattr(type_, "singularity_deferred_type"):
+        return (
+            _write_nested,
+            lambda buffer, pos, register, allow_pickle, refs, view: _read_nested(
+                buffer, pos, type_, register, allow_pickle, refs, view
+            ),
+        )
+    if type_ is str:
+        return (
+            lambda out, value, allow_pickle, refs: _write_bytes(out, value.encode("utf-8")),
+            lambda buffer, pos, register, allow_pickle, refs, view: _read_str(buffer, pos),
+        )
+    return (
+        lambda out, value, allow_pickle, refs: _write_other(out, value, allow_pickle),
+        lambda buffer, pos, register, allow_pickle, refs, view: _read_other(buffer, pos, allow_pickle),
+    )
+
+
+def _read_str(buffer, pos):
+    data, pos = _read_bytes(buffer, pos)
+    return str(data, "utf-8"), pos
+
+
+def _write_nested(out, value, allow_pickle, refs):
+    if id(value) in refs:
+        # Already in this record: a back-reference
+        _write_varint(out, 0)
+        out += value.id.bytes
+        return
+    _write_bytes(out, encode(value, allow_pickle=allow_pickle, refs=refs))
+
+
+def _read_nested(buffer, pos, cls, register, allow_pickle, refs, view=None):
+    size, pos = _read_varint(buffer, pos)
+    if not size:
+        id_, pos = _read_uuid(buffer, pos)
+        try:
+            return refs[id_], pos
+        except KeyError:
+            raise CodecError(f"Back-reference to {id_} outside of the record") from None
+    end = _checked_end(buffer, pos + size)
+    if view is not None:
+        return view(pos, cls), end
+    instance, record_end = decode(buffer, pos, cls, register, allow_pickle, refs)
+    if record_end != end:
+        raise CodecError("Nested record size does not match its contents")
+    return instance, end
+
+
+def _write_value(out, field, value, allow_pickle, refs):
+    if isinstance(field, NumberField):
+        _write_number(out, value, allow_pickle)
+    elif isinstance(field, StringField):
+        _write_bytes(out, value.encode("utf-8"))
+    elif isinstance(field, DateTimeField):
+        _write_datetime(out, value)
+    elif isinstance(field, DateField):
+        out += _i32.pack(value.toordinal())
+    elif isinstance(field, UUIDField):
+        out += value.bytes
+    elif isinstance(field, TypeField):
+        _write_nested(out, value, allow_pickle, refs)
+    elif isinstance(field, ListField):
+        if field.type in (int, float):
+            # As other sequences of numbers, as those of documents
+            if not isinstance(value, ArraySequence):
+                try:
+                    value = ArraySequence(field.type, value)
+                except OverflowError as error:
+                    raise CodecError(f"Only 64 bit ints can be encoded in ListField {field.name!r}") from error
+            _write_array(out, value)
+            return
+        write_item = _item_codec(field.type)[0]
+        _write_varint(out, len(value))
+        for item in value:
+            write_item(out, item, allow_pickle, refs)
+    else:
+        _write_other(out, value, allow_pickle)
+
+
+def _read_value(buffer, pos, field, register, allow_pickle, refs, view=None):
+    if isinstance(field, NumberField):
+        return _read_number(buffer, pos, allow_pickle)
+    if isinstance(field, StringField):
+        value, pos = _read_str(buffer, pos)
+        # Option values are read back as the field's shared strings
+        return field.from_json(value), pos
+    if isinstance(field, DateTimeField):
+        return _read_datetime(buffer, pos)
+    if isinstance(field, DateField):
+        return datetime.date.fromordinal(_i32.unpack_from(buffer, pos)[0]), pos + 4
+    if isinstance(field, UUIDField):
+        return _read_uuid(buffer, pos)
+    if isinstance(field, TypeField):
+        return _read_nested(buffer, pos, field.type, register, allow_pickle, refs, view)
+    if isinstance(field, ListField):
+        if field.type in (int, float):
+            return _read_array(buffer, pos, field.type)
+        read_item = _item_codec(field.type)[1]
+        count, pos = _read_varint(buffer, pos)
+        items = []
+        for _ in range(count):
+            item, pos = read_item(buffer, pos, register, allow_pickle, refs, view)
+            items.append(item)
+        result = TypedSequence(field.type)
+        result._data = items
+        return result, pos
+    return _read_other(buffer, pos, allow_pickle)
+
+
+# Records
+
+def encode(instance, out=None, allow_pickle=False, refs=None):
+    """Binary record for `instance`. If `out` is a bytearray, the record is appended to it
+
+    `refs` maps the ids of the instances already written in the
+    enclosing record, written again as back-references, to them.
+    """
+    result = bytearray() if out is None else out
+    record_schema = schema(type(instance))
+    if _borrowers:
+        _settle(instance)
+    data = instance._data
+    if refs is None:
+        refs = {}
+    # Kept alive, so that their ids stay valid
+    refs[id(instance)] = instance
+    result += _u32.pack(record_schema.id)
+    result += instance.id.bytes
+    bitmap_pos = len(result)
+    bitmap = bytearray(record_schema.bitmap_size)
+    result += bitmap
+    for index, (name, field) in enumerate(record_schema.fields):
+        try:
+            value = data[name]
+        except KeyError:
+            continue
+        bitmap[index >> 3] |= 1 << (index & 7)
+        _write_value(result, field, value, allow_pickle, refs)
+    result[bitmap_pos: bitmap_pos + len(bitmap)] = bitmap
+    return bytes(result) if out is None else result
+
+
+def read_header(buffer, pos=0, cls=None):
+    """Class, id and the position of the field values of the record at `buffer[pos:]`"""
+    schema_id = _u32.unpack_from(buffer, _checked_end(buffer, pos + 4) - 4)[0]
+    record_cls = _find_class(schema_id)
+    if cls is not None and not issubclass(record_cls, cls):
+        raise CodecError(f"Expected a {cls.__name__!r} record, got {record_cls.__name__!r}")
+    pos += 4
+    id_, pos = _read_uuid(buffer, pos)
+    return record_cls, id_, pos
+
+
+def read_fields(buffer, pos, record_cls, data, register=True, allow_pickle=False, refs=None, view=None):
+    """Decode the field values starting at `buffer[pos:]` into the `data` mapping
+
+    Returns the position after the record. `refs` maps the ids of the
+    instances back-references can point to to the instances. If given,
+    `view(pos, cls)` makes the instances of the nested records, at
+    `buffer[pos:]`, in place of decoding them.
+    """
+    if refs is None:
+        refs = {}
+    record_schema = schema(record_cls)
+    end = _checked_end(buffer, pos + record_schema.bitmap_size)
+    bitmap = buffer[pos: end]
+    pos = end
+    try:
+        for index, (name, field) in enumerate(record_schema.fields):
+            if bitmap[index >> 3] & (1 << (index & 7)):
+                value, pos = _read_value(buffer, pos, field, register, allow_pickle, refs, view)
+                data[name] = _interned(value) if field.intern else value
+    except (IndexError, struct.error) as error:
+        # Fixed size values and varints cut short
+        raise CodecError("Truncated record") from error
+    return pos
+
+
+def decode(buffer, pos=0, cls=None, register=True, allow_pickle=False, refs=None):
+    """Decode the record at `buffer[pos:]` - returns `(instance, end_position)`
+
+    `buffer` can be bytes, a bytearray or a memoryview: values are read from
+    it in place. If `cls` is given, the record must be of that class or
+    one of its subclasses. With `register=False`, the new instances are
+    not added to the active context. Pickled values are only read with
+    `allow_pickle=True`.
+    """
+    if not isinstance(buffer, memoryview):
+        buffer = memoryview(buffer)
+    record_cls, id_, pos = read_header(buffer, pos, cls)
+
+    if refs is None:
+        refs = {}
+    if record_cls.m.layout == "document":
+        data = {}
+        pos = read_fields(buffer, pos, record_cls, data, register, allow_pickle, refs)
+        return documents.from_values(record_cls, id_, data, register), pos
+
+    instance = record_cls.__new__(record_cls)
+    instance._id = id_
+    if not record_cls.m.record_layout:
+        instance._data = {}
+    refs[id_] = instance
+    pos = read_fields(buffer, pos, record_cls, instance._data, register, allow_pickle, refs)
+    if register:
+        get_context().register(instance)
+    return instance, pos
+
+
+def dumps(instance, allow_pickle=False):
+    return encode(instance, allow_pickle=allow_pickle)
+
+
+def loads(data, cls=None, allow_pickle=False):
+    return decode(data, 0, cls, allow_pickle=allow_pickle)[0]
+
+
+def dump_many(instances, allow_pickle=False):
+    """Length-prefixed records for all `instances`, in one bytes object"""
+    out = bytearray()
+    for instance in instances:
+        _write_bytes(out, encode(instance, allow_pickle=allow_pickle))
+    return bytes(out)
+
+
+def load_many(data, cls=None, register=True, allow_pickle=False):
+    buffer = memoryview(data)
+    pos = 0
+    size = len(buffer)
+    while pos < size:
+        record_size, pos = _read_varint(buffer, pos)
+        yield decode(buffer, pos, cls, register, allow_pickle)[0]
+        pos += record_size
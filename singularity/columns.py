@@ -0,0 +1,222 @@
+from collections.abc import MutableMapping
+import datetime
+
+from .fields import (
+    Field, ComputedField, NumberField, StringField, DateField, DateTimeField, _SENTINEL
+)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError("NumPy is needed for columnar collections") from error
+    return numpy
+
+
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _fits_int64(value):
+    return _INT64_MIN <= value <= _INT64_MAX
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class Column:
+    """Values of one field across all rows of a Collection.
+
+    `values` is a NumPy array and `mask` a boolean array that is False
+    for rows where the field is not set. Fields with `options` are
+    stored as categorical: `values` holds integer codes into `categories`.
+    NumberFields holding only ints are int64 columns, or object columns
+    when some of them do not fit in 64 bits.
+    """
+
+    def __init__(self, field, values, mask, categories=None):
+        self.field = field
+        self.values = values
+        self.mask = mask
+        self.categories = categories
+
+    @classmethod
+    def build(cls, field, raw):
+        np = _numpy()
+        mask = np.fromiter((value is not _SENTINEL for value in raw), dtype=bool, count=len(raw))
+        present = [value for value in raw if value is not _SENTINEL]
+        categories = None
+
+        if isinstance(field, StringField) and field.categories:
+            categories = field.categories
+            lookup = field.codes
+            values = np.fromiter(
+                (lookup[value] if value is not _SENTINEL else -1 for value in raw),
+                dtype=np.int32, count=len(raw)
+            )
+            return cls(field, values, mask, categories)
+
+        if isinstance(field, NumberField):
+            if not all(type(value) is int for value in present):
+                dtype, fill = np.float64, np.nan
+            elif not present or _fits_int64(min(present)) and _fits_int64(max(present)):
+                dtype, fill = np.int64, 0
+            else:
+                # Kept exact, as Python ints
+                dtype, fill = object, 0
+        elif isinstance(field, DateTimeField):
+            dtype, fill = "datetime64[us]", None
+            raw = [_naive_utc(value) if value is not _SENTINEL else value for value in raw]
+        elif isinstance(field, DateField):
+            dtype, fill = "datetime64[D]", None
+        else:
+            dtype, fill = object, None
+
+        values = np.array(
+            [value if value is not _SENTINEL else fill for value in raw], dtype=dtype
+        )
+        return cls(field, values, mask)
+
+    def __len__(self):
+        return len(self.values)
+
+    def masked(self):
+        """The column as a `numpy.ma` masked array"""
+        return _numpy().ma.masked_array(self.values, mask=~self.mask)
+
+    def get(self, index):
+        if not self.mask[index]:
+            raise KeyError(self.field.name)
+        value = self.values[index]
+        if self.categories is not None:
+            return self.categories[value]
+        if isinstance(self.field, DateTimeField):
+            return value.astype(datetime.datetime)
+        if isinstance(self.field, DateField):
+            return value.astype(datetime.date)
+        if hasattr(value, "item"):
+            return value.item()
+        return value
+
+    def set(self, index, value):
+        np = _numpy()
+        if self.categories is not None:
+            value = self.field.encode(value)
+        elif isinstance(self.field, DateTimeField):
+            value = _naive_utc(value)
+        elif self.values.dtype.kind in "iu":
+            if not isinstance(value, int):
+                self.values = self.values.astype(np.float64)
+            elif not _fits_int64(value):
+                self.values = self.values.astype(object)
+        self.values[index] = value
+        self.mask[index] = True
+
+    def unset(self, index):
+        if not self.mask[index]:
+            raise KeyError(self.field.name)
+        self.mask[index] = False
+
+    def take(self, selector):
+        return Column(self.field, self.values[selector], self.mask[selector], self.categories)
+
+
+class RowData(MutableMapping):
+    """`_data` for row proxies: reads and writes go to the collection's columns"""
+
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns, index):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key):
+        try:
+            column = self._columns[key]
+        except KeyError:
+            raise KeyError(key)
+        return column.get(self._index)
+
+    def __setitem__(self, key, value):
+        self._columns[key].set(self._index, value)
+
+    def __delitem__(self, key):
+        self._columns[key].unset(self._index)
+
+    def __iter__(self):
+        for name, column in self._columns.items():
+            if column.mask[self._index]:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class Collection:
+    """Struct-of-arrays storage for many instances of one model.
+
+    Each field becomes a `Column`. Indexing with an integer gives a row
+    proxy: an instance of the model whose field values live in the
+    columns, so existing code can use it, while filters and aggregates
+    run vectorized over `columns[name].values`.
+
+    For classes with `layout="record"`, rows are copies of the column values.
+    """
+
+    def __init__(self, model, instances=(), _columns=None, _ids=None):
+        self.model = model
+        if _columns is not None:
+            self.columns = _columns
+            self.ids = _ids
+            return
+        instances = list(instances)
+        self.ids = [instance.id for instance in instances]
+        self.columns = {}
+        for name, field in model.m.fields.items():
+            if isinstance(field, ComputedField) or not isinstance(field, Field):
+                continue
+            raw = [instance._data.get(name, _SENTINEL) for instance in instances]
+            self.columns[name] = Column.build(field, raw)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        model = self.model
+        row = model.__new__(model)
+        row._id = self.ids[index]
+        row._data = RowData(self.columns, index)
+        return row
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return f"<Collection of {len(self)} {self.model.__name__!r} rows>"
+
+    def filter(self, selector):
+        """New collection with the rows selected by a boolean array or index array"""
+        np = _numpy()
+        selector = np.asarray(selector)
+        if selector.dtype == bool:
+            selector = np.flatnonzero(selector)
+        columns = {name: column.take(selector) for name, column in self.columns.items()}
+        ids = [self.ids[index] for index in selector]
+        return type(self)(self.model, _columns=columns, _ids=ids)
+
+    def to_instances(self):
+        """Materialize the rows as new, regular instances of the model
+
+        They get new IDs: the instances the collection was built from
+        keep theirs, and stay the ones the context finds by ID.
+        """
+        model = self.model
+        return [model(**dict(row._data)) for row in self]
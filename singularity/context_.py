@@ -1,13 +1,131 @@
+import weakref
+
+from .aggregate import Aggregation
+from .edges import EdgeIndex
+from .events import ChangeBus
+from .interning import InternPool
+from .ids import uuid4
+
 
 # TODO
 # This has to become a context-local variable
 active_context = None
 
 class Context:
-    def __init__(self):
+    def __init__(self, id_factory=uuid4):
         self.data = {}
+        # Callable returning a new ID for instances whose class
+        # does not define its own "id_factory"
+        self.id_factory = id_factory
+        # Live instances, by class and ID
+        self.types = {}
+        self.aggregations = []
+        # Change feed: context.changes.observe(Model, callback)
+        self.changes = ChangeBus()
+        # Root documents of layout="document" instances, by ID, and their classes
+        self.documents = {}
+        self.document_classes = {}
+        # Links of EdgeFields
+        self.edges = EdgeIndex(self)
+        # TextIndexes of StringFields declared with text_index=True, by field
+        self.text_indexes = {}
+        # Shared values for fields declared with intern=True
+        self.intern_pool = InternPool()
         # self.backend = None
 
+    def register(self, instance):
+        self.data[instance._id] = instance._data
+        cls = type(instance)
+        if cls not in self.types:
+            self.types[cls] = weakref.WeakValueDictionary()
+        self.types[cls][instance._id] = instance
+        for aggregation in self.aggregations:
+            aggregation.add(instance)
+        for index in self.text_indexes.values():
+            index.add(instance)
+
+    def get(self, id_, default=None):
+        for instances in self.types.values():
+            instance = instances.get(id_)
+            if instance is not None:
+                return instance
+        if id_ in self.documents:
+            from .documents import view
+            return view(self.document_classes[id_], self.documents[id_])
+        return default
+
+    def add_document(self, instance):
+        self.documents[instance.id] = instance._data.node
+        self.document_classes[instance.id] = type(instance)
+
+    def remove_document(self, id_, node):
+        if self.documents.get(id_) is node:
+            del self.documents[id_]
+            del self.document_classes[id_]
+
+    def instances(self, cls):
+        """Live instances of `cls` and its subclasses"""
+        for type_, instances in list(self.types.items()):
+            if issubclass(type_, cls):
+                yield from list(instances.values())
+
+    def aggregate(self, model, group_by=None, bins=None, **measures):
+        """Grouped statistics over the instances of `model`, kept up to date
+
+        >>> totals = context.aggregate(Sale, group_by="status", sum="amount", max="amount")
+        >>> totals.result()
+        {'open': {'count': 2, 'sum_amount': 12, 'max_amount': 10}, ...}
+        """
+        return Aggregation(self, model, group_by=group_by, bins=bins, **measures)
+
+    def text_index(self, field):
+        """The TextIndex of `field`, created over the live instances on first use"""
+        index = self.text_indexes.get(field)
+        if index is None:
+            from .textindex import TextIndex
+            index = self.text_indexes[field] = TextIndex(field)
+            for instance in self.instances(field.owner):
+                index.add(instance)
+        return index
+
+    def search(self, model, field_name, query, limit=None, offset=0, scores=False):
+        """Instances of `model` whose text-indexed `field_name` matches `query`
+
+        >>> context.search(Person, "name", "jo* silva", limit=20, offset=40)
+
+        All words must match, and words ending in "*" are prefixes. The
+        best ranked come first; with `scores=True`, `(instance, score)`
+        pairs are returned.
+        """
+        field = model.m.fields.get(field_name)
+        if field is None:
+            raise KeyError(f"Unknown field {field_name!r} for {model.__name__!r}")
+        if not getattr(field, "text_index", False):
+            raise TypeError(f"Field {field_name!r} of {model.__name__!r} is not text indexed")
+        result = self.text_index(field).search(query, limit=limit, offset=offset, cls=model)
+        return result if scores else [instance for instance, score in result]
+
+    def traverse(self, start, path_pattern=None, max_depth=None, direction="out", limit=None, until=None):
+        """Yield the instances reached from `start` along `path_pattern`
+
+        >>> list(context.traverse(person, "children+.pets", max_depth=4))
+
+        `direction` is "out", "in" (follow fields backwards: who refers
+        to the instance) or "both". Stops after `limit` results, or after
+        yielding a result for which `until(result)` is true.
+        """
+        from .traversal import traverse
+        return traverse(self, start, path_pattern, max_depth, direction, limit, until)
+
+    def freeze_to_shared_memory(self, name=None, cls=object):
+        """Copy the live instances of `cls` into a shared memory segment
+
+        Returns a read-only `SharedContext` over it: worker processes
+        attach to the same data with `SharedContext(snapshot.name)`.
+        """
+        from .shared import freeze
+        return freeze(self.instances(cls), name=name)
+
 
 class MemoryContext(Context):
     """The simplest context -
@@ -16,9 +134,9 @@ class MemoryContext(Context):
     """
 
 
-    def __init__(self):
+    def __init__(self, **kwargs):
         self.backend = "memory"
-        super().__init__()
+        super().__init__(**kwargs)
 
 def get_context():
     global active_context
@@ -0,0 +1,269 @@
+"""Content digests for instances, Merkle style.
+
+The digest of an instance covers its class and the values of its fields
+(not its ID). Child instances and sequences contribute the digests of
+their contents, so equal graphs get equal digests, and comparing two
+digests tells if two graphs differ without walking them.
+
+Values with no canonical key of their own are keyed by their repr, and
+equal ones may then get different keys: digests including such keys
+are only used to tell graphs are equal, never that they differ.
+
+Digests are cached per instance. Once a class has been digested, its
+fields are watched: a write to a field (or an in-place change to a
+ListField's sequence) drops the cached digest of that instance and of
+every instance whose digest was computed from it. Recomputing then only
+redoes the instances on the path to the change - the other children's
+digests come from the cache.
+"""
+import datetime
+from functools import partial
+from hashlib import blake2b
+import numbers
+import uuid
+import weakref
+
+from .fields import ComputedField, ListField, TypedSequence, ArraySequence, UNSET, _borrowers, _settle
+
+
+# {id(instance): (weak reference to the instance, digest, whether it has no repr keys)}
+_digests = {}
+# {id(child): {id(parent), ...}} parents whose digests include the child's
+_parents = {}
+_watched = set()
+
+
+# Keys get `inexact` appended to when they are a repr
+
+def _repr_key(value, inexact):
+    inexact.append(value)
+    return b"r" + repr(value).encode()
+
+
+def _number_key(value, inexact):
+    # Numbers that compare equal get the same key, as 1 == 1.0 == True
+    if isinstance(value, numbers.Integral):
+        return b"n%d" % int(value)
+    try:
+        as_float = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return _repr_key(value, inexact)
+    if as_float == value:
+        if as_float.is_integer():
+            return b"n%d" % int(as_float)
+        return b"f" + repr(as_float).encode()
+    return _repr_key(value, inexact)
+
+
+def _keys(keys):
+    return b"".join(b"%d:%s" % (len(key), key) for key in keys)
+
+
+def _value_key(value, inexact):
+    if isinstance(value, str):
+        return b"s" + value.encode("utf-8")
+    if isinstance(value, numbers.Number):
+        return _number_key(value, inexact)
+    if value is None:
+        return b"0"
+    if isinstance(value, datetime.datetime) and value.utcoffset() is not None:
+        # Aware datetimes are equal across time zones
+        value = value.astimezone(datetime.timezone.utc)
+    elif isinstance(value, datetime.time) and value.utcoffset() is not None:
+        return _repr_key(value, inexact)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return b"d" + value.isoformat().encode()
+    if isinstance(value, uuid.UUID):
+        return b"u" + value.bytes
+    if isinstance(value, ArraySequence):
+        if value.type is int:
+            return b"q" + value._data.tobytes()
+        return b"[" + b"".join(_number_key(item, inexact) + b"," for item in value._data) + b"]"
+    if isinstance(value, (bytes, bytearray)):
+        return b"b" + bytes(value)
+    if isinstance(value, list):
+        return b"l" + _keys(_value_key(item, inexact) for item in value)
+    if isinstance(value, tuple):
+        return b"t" + _keys(_value_key(item, inexact) for item in value)
+    # Dicts and sets don't depend on the order of their items
+    if type(value) is dict:
+        return b"m" + _keys(sorted(
+            _keys((_value_key(key, inexact), _value_key(item, inexact))) for key, item in value.items()
+        ))
+    if isinstance(value, (set, frozenset)):
+        return b"e" + _keys(sorted(_value_key(item, inexact) for item in value))
+    return _repr_key(value, inexact)
+
+
+def _changed(instance, field, old, new):
+    invalidate(instance)
+
+
+def invalidate(instance):
+    """Drop the cached digests of `instance` and of everything containing it"""
+    _invalidate(id(instance))
+
+
+def _collected(key, ref):
+    entry = _digests.get(key)
+    if entry is not None and entry[0] is ref:
+        _invalidate(key)
+
+
+def _invalidate(key):
+    pending = [key]
+    while pending:
+        key = pending.pop()
+        _digests.pop(key, None)
+        pending.extend(_parents.pop(key, ()))
+
+
+def _watch(cls):
+    if cls in _watched:
+        return
+    for field in cls.m.fields.values():
+        if not isinstance(field, ComputedField):
+            field.watch(_changed)
+    _watched.add(cls)
+
+
+def _fields(instance):
+    return [
+        (name, field) for name, field in type(instance).m.fields.items()
+        if not isinstance(field, ComputedField)
+    ]
+
+
+def _values(instance):
+    # Fields with defaults are read as __eq__ reads them, setting the default
+    if _borrowers:
+        _settle(instance)
+    data = instance._data
+    for name, field in _fields(instance):
+        if isinstance(field, ListField) or hasattr(field, "default"):
+            try:
+                value = field.__get__(instance, type(instance))
+            except AttributeError:
+                value = UNSET
+            if isinstance(field, ListField) and field.watchers:
+                # In-place changes to the sequence must reach the watchers
+                field._watch_items(instance, value)
+        else:
+            value = data.get(name, UNSET)
+        yield name, value
+
+
+def _cached_entry(instance):
+    entry = _digests.get(id(instance))
+    if entry is not None and entry[0]() is instance:
+        return entry
+    return None
+
+
+def cached(instance):
+    """The cached digest of `instance`, or None"""
+    entry = _cached_entry(instance)
+    return None if entry is None else entry[1]
+
+
+def _child_key(value, parent, ancestors, inexact, cycles):
+    if hasattr(type(value), "m"):
+        if id(value) in ancestors:
+            # A cycle: refer to the ancestor by distance
+            position = ancestors.index(id(value))
+            cycles.append(position)
+            return b"^%d" % (len(ancestors) - position)
+        _parents.setdefault(id(value), set()).add(id(parent))
+        return b"i" + _digest(value, ancestors, inexact, cycles)
+    if isinstance(value, TypedSequence) and not isinstance(value, ArraySequence):
+        return b"[" + b"".join(
+            _child_key(item, parent, ancestors, inexact, cycles) + b"," for item in value
+        ) + b"]"
+    return _value_key(value, inexact)
+
+
+def _digest(instance, ancestors, inexact, cycles):
+    # `cycles` gets the positions in `ancestors` of the instances that
+    # cycles in the digested graph lead back to.
+    entry = _cached_entry(instance)
+    if entry is not None:
+        if not entry[2]:
+            inexact.append(instance)
+        return entry[1]
+    cls = type(instance)
+    _watch(cls)
+    hasher = blake2b(f"{cls.__module__}.{cls.__qualname__}".encode(), digest_size=16)
+    position = len(ancestors)
+    ancestors = ancestors + [id(instance)]
+    own_inexact = []
+    own_cycles = []
+    for name, value in _values(instance):
+        if value is UNSET:
+            continue
+        key = _child_key(value, instance, ancestors, own_inexact, own_cycles)
+        hasher.update(b"%d:%s%d:" % (len(name), name.encode(), len(key)))
+        hasher.update(key)
+    result = hasher.digest()
+    outer = [ancestor for ancestor in own_cycles if ancestor < position]
+    if outer:
+        # Refers to its ancestors by distance: only valid under them, not cached
+        cycles.extend(outer)
+    else:
+        key = id(instance)
+        _digests[key] = (weakref.ref(instance, partial(_collected, key)), result, not own_inexact)
+    if own_inexact:
+        inexact.append(instance)
+    return result
+
+
+def digest(instance):
+    """16 byte content digest of `instance`"""
+    return _digest(instance, [], [], [])
+
+
+def differ(first, second):
+    """True if the cached digests show the instances differ, False if unsure"""
+    first_entry = _cached_entry(first)
+    if first_entry is None or not first_entry[2]:
+        return False
+    second_entry = _cached_entry(second)
+    return second_entry is not None and second_entry[2] and first_entry[1] != second_entry[1]
+
+
+def _is_instance(value):
+    return hasattr(type(value), "m")
+
+
+def _diff(first, second, path, result, seen):
+    if first is second:
+        return
+    if _is_instance(first) and type(first) is type(second):
+        if (id(first), id(second)) in seen:
+            # Compared already, further up the cycles they are in
+            return
+        seen.add((id(first), id(second)))
+        inexact = []
+        if _digest(first, [], inexact, []) != _digest(second, [], inexact, []) or inexact:
+            for (name, first_value), (_, second_value) in zip(_values(first), _values(second)):
+                _diff(first_value, second_value, f"{path}.{name}" if path else name, result, seen)
+        return
+    if (
+        isinstance(first, TypedSequence) and isinstance(second, TypedSequence)
+        and len(first) == len(second) and first.type == second.type
+    ):
+        for index, (first_item, second_item) in enumerate(zip(first, second)):
+            _diff(first_item, second_item, f"{path}.{index}", result, seen)
+        return
+    if first != second:
+        result[path] = (first, second)
+
+
+def diff(first, second):
+    """`{path: (first_value, second_value)}` for the fields that differ
+
+    Paths are dotted, as accepted by `instance[path]`. Only children
+    whose digests differ are visited. Missing values are UNSET.
+    """
+    result = {}
+    _diff(first, second, "", result, set())
+    return result
@@ -0,0 +1,230 @@
+"""Document storage: instances as views over plain nested dicts and lists.
+
+For classes created with `layout="document"`, the data of each instance
+is a JSON-shaped dict - child instances are nested dicts, ListFields are
+lists, and dates, datetimes and UUIDs - instance IDs included - are kept
+in their JSON form. The
+active context holds root documents in `context.documents`, by ID, and
+`instance.m.document()` returns the live dict, ready for `json.dumps`
+or to be written to a backend in one go.
+
+`instance._data` is a `DocumentData` mapping over the dict, converting
+values as fields are read and written. Child instances and sequences
+read from a document are views over their part of it, and the same view
+is returned while it is alive. Instances assigned to a field of a
+document are stored as a nested dict, and become views over it; lists
+assigned from another document are copied.
+
+Copies of document instances - deep copies, unpickled and decoded
+instances - are views over documents of their own.
+"""
+from collections.abc import MutableMapping
+import copy
+import uuid
+import weakref
+
+from .context_ import get_context
+from .fields import ListField, TypeField, TypedSequence, ArraySequence
+from .refs import _model
+
+
+# Live views, by id() of the dict or list they show
+_views = weakref.WeakValueDictionary()
+
+
+def view(cls, node):
+    """Instance of `cls` over the document `node` - the existing one, if alive"""
+    instance = _views.get(id(node))
+    if instance is not None and getattr(instance._data, "node", None) is node:
+        return instance
+    instance = cls.__new__(cls)
+    instance._id = uuid.UUID(node["id"])
+    instance._data = DocumentData(node, cls)
+    _views[id(node)] = instance
+    get_context().register(instance)
+    return instance
+
+
+def root(cls, node):
+    """View over `node`, added to the context as a root document"""
+    instance = view(cls, node)
+    get_context().add_document(instance)
+    return instance
+
+
+def from_values(cls, id_, data, register=True):
+    """Instance of `cls` with ID `id_` over a new document holding the field values in `data`
+
+    With `register=True`, it is added to the context as a root document.
+    """
+    node = new_node(id_)
+    node_data = DocumentData(node, cls)
+    for name, value in data.items():
+        node_data[name] = value
+    if register:
+        return root(cls, node)
+    instance = cls.__new__(cls)
+    instance._id = id_
+    instance._data = node_data
+    return instance
+
+
+def _new_ids(cls, node):
+    node["id"] = str((cls.m.id_factory or get_context().id_factory)())
+    for name, field in cls.m.fields.items():
+        model = _model(field)
+        if model is None or name not in node:
+            continue
+        for item in node[name] if isinstance(field, ListField) else [node[name]]:
+            if isinstance(item, dict):
+                _new_ids(model, item)
+
+
+def copy_document(instance):
+    """Root document copied from the one of `instance`, with new IDs for all instances in it"""
+    node = copy.deepcopy(instance._data.node)
+    _new_ids(type(instance), node)
+    return root(type(instance), node)
+
+
+def embed(instance):
+    """The document node for `instance`, turning it into a view over the node"""
+    data = instance._data
+    if isinstance(data, DocumentData):
+        node = data.node
+        # No longer a root: it lives inside another document now
+        get_context().remove_document(instance.id, node)
+        _views.setdefault(id(node), instance)
+        return node
+    cls = type(instance)
+    node = new_node(instance.id)
+    node_data = DocumentData(node, cls)
+    for name, value in data.items():
+        node_data[name] = value
+    if not cls.m.record_layout:
+        instance._data = node_data
+        _views[id(node)] = instance
+        get_context().data[instance.id] = node_data
+    return node
+
+
+def new_node(id_):
+    return {"id": str(id_)}
+
+
+def to_node(field, value):
+    if isinstance(field, TypeField):
+        return embed(value) if _model(field) else value
+    if isinstance(field, ListField):
+        if isinstance(value, DocumentSequence):
+            # Each document has lists of its own
+            return list(value._data)
+        if isinstance(value, ArraySequence):
+            return value.tolist()
+        if _model(field):
+            return [embed(item) for item in value]
+        return list(value)
+    if hasattr(field, "from_json"):
+        return field.json(value)
+    return value
+
+
+def from_node(field, raw):
+    if isinstance(field, TypeField):
+        model = _model(field)
+        return view(model, raw) if model else raw
+    if isinstance(field, ListField):
+        sequence = _views.get(id(raw))
+        if sequence is None or sequence._data is not raw:
+            sequence = _views[id(raw)] = DocumentSequence(_model(field) or field.type, raw)
+        return sequence
+    if hasattr(field, "from_json"):
+        return field.from_json(raw)
+    return raw
+
+
+class DocumentData(MutableMapping):
+    """`_data` for instances whose values live in a document dict"""
+
+    __slots__ = ("node", "fields")
+
+    def __init__(self, node, cls):
+        self.node = node
+        self.fields = cls.m.fields
+
+    def __getitem__(self, key):
+        if key == "id":
+            raise KeyError(key)
+        return from_node(self.fields.get(key), self.node[key])
+
+    def __setitem__(self, key, value):
+        if key == "id":
+            raise KeyError(key)
+        if isinstance(value, DocumentSequence) and self.node.get(key) is value._data:
+            return
+        self.node[key] = to_node(self.fields.get(key), value)
+
+    def __delitem__(self, key):
+        if key == "id":
+            raise KeyError(key)
+        del self.node[key]
+
+    def __contains__(self, key):
+        return key != "id" and key in self.node
+
+    def __iter__(self):
+        return (key for key in self.node if key != "id")
+
+    def __len__(self):
+        return len(self.node) - ("id" in self.node)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
+class DocumentSequence(TypedSequence):
+    """TypedSequence over a list inside a document
+
+    Instances are stored as nested dicts, and read back as views.
+    """
+
+    def __init__(self, type_, items):
+        self.type = type_
+        self._data = items
+        self._model = hasattr(type_, "m")
+
+    def _check_many(self, values):
+        if isinstance(values, DocumentSequence):
+            values = list(values)
+        values = list(super()._check_many(values))
+        if self._model:
+            values = [embed(value) for value in values]
+        return values
+
+    def __getitem__(self, index):
+        item = self._data[index]
+        if not self._model:
+            return item
+        if isinstance(index, slice):
+            return [view(self.type, node) for node in item]
+        return view(self.type, item)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._data[index] = self._check_many(value)
+        else:
+            self._check(value)
+            self._data[index] = embed(value) if self._model else value
+        if self.watchers:
+            self._notify()
+
+    def insert(self, index, value):
+        self._check(value)
+        self._data.insert(index, embed(value) if self._model else value)
+        if self.watchers:
+            self._notify()
+
+    def __repr__(self):
+        return f"<{self.type.__name__}>{list(self)!r}"
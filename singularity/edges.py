@@ -0,0 +1,135 @@
+"""Adjacency index for EdgeFields.
+
+Each context has an `EdgeIndex` (`context.edges`). Links are kept by
+`(class, field name, id)` in both directions:
+
+- `outgoing[(cls, name, id)]`: ids linked from that instance through the field;
+- `incoming[(cls, name, id)]`: ids of the instances linking to that one through it.
+
+Adjacency sets are dicts (ordered, O(1) membership), so linking,
+unlinking and reverse lookups never scan. Linked instances are kept by
+the index until unlinked or removed with `remove(instance)`.
+"""
+from collections import deque
+
+
+class EdgeIndex:
+    def __init__(self, context):
+        self.context = context
+        self.outgoing = {}
+        self.incoming = {}
+        # Linked instances by id
+        self.nodes = {}
+        # (class, name) of the fields with links
+        self.fields = set()
+
+    def _key(self, field, id_):
+        return (field.owner, field.name, id_)
+
+    def resolve(self, id_):
+        instance = self.nodes.get(id_)
+        if instance is None:
+            instance = self.context.get(id_)
+        return instance
+
+    def _add(self, field, source_id, target_id):
+        self.fields.add((field.owner, field.name))
+        self.outgoing.setdefault(self._key(field, source_id), {})[target_id] = None
+        self.incoming.setdefault(self._key(field, target_id), {})[source_id] = None
+
+    def _discard(self, field, source_id, target_id):
+        for index, key, other in (
+            (self.outgoing, self._key(field, source_id), target_id),
+            (self.incoming, self._key(field, target_id), source_id),
+        ):
+            adjacent = index.get(key)
+            if adjacent is not None:
+                adjacent.pop(other, None)
+                if not adjacent:
+                    del index[key]
+
+    def _ids(self, item):
+        # Instances are registered as nodes, IDs are taken as they are
+        id_ = getattr(item, "id", None)
+        if id_ is None or not hasattr(type(item), "m"):
+            return item
+        self.nodes[id_] = item
+        return id_
+
+    def link(self, field, source, target):
+        """Link `source` to `target` through `field`, and back through its reciprocal field"""
+        source_id, target_id = self._ids(source), self._ids(target)
+        self._add(field, source_id, target_id)
+        reciprocal = field.reciprocal(target)
+        if reciprocal is not None:
+            self._add(reciprocal, target_id, source_id)
+
+    def link_many(self, field, pairs):
+        """Link each `(source, target)` pair of `pairs` through `field`"""
+        reciprocals = {}
+        add = self._add
+        for source, target in pairs:
+            source_id, target_id = self._ids(source), self._ids(target)
+            add(field, source_id, target_id)
+            target_cls = type(target)
+            if target_cls not in reciprocals:
+                reciprocals[target_cls] = field.reciprocal(target)
+            reciprocal = reciprocals[target_cls]
+            if reciprocal is not None:
+                add(reciprocal, target_id, source_id)
+
+    def unlink(self, field, source, target):
+        source_id, target_id = self._ids(source), self._ids(target)
+        self._discard(field, source_id, target_id)
+        reciprocal = field.reciprocal(target)
+        if reciprocal is not None:
+            self._discard(reciprocal, target_id, source_id)
+
+    def targets(self, field, source):
+        """IDs linked from `source` through `field`, in link order"""
+        return self.outgoing.get(self._key(field, getattr(source, "id", source)), {})
+
+    def sources(self, field, target):
+        """IDs of the instances linking to `target` through `field`"""
+        return self.incoming.get(self._key(field, getattr(target, "id", target)), {})
+
+    def referrers(self, field, target):
+        """Instances linking to `target` through `field`"""
+        return [self.resolve(id_) for id_ in self.sources(field, target)]
+
+    def remove(self, instance):
+        """Drop all links from and to `instance`"""
+        id_ = instance.id
+        for cls, name in self.fields:
+            for index, other_index in ((self.outgoing, self.incoming), (self.incoming, self.outgoing)):
+                for other_id in index.pop((cls, name, id_), ()):
+                    adjacent = other_index.get((cls, name, other_id))
+                    if adjacent is not None:
+                        adjacent.pop(id_, None)
+                        if not adjacent:
+                            del other_index[(cls, name, other_id)]
+        self.nodes.pop(id_, None)
+
+    def bfs(self, start, fields, max_depth=None, incoming=False):
+        """Breadth-first walk from `start` along `fields` - yields `(instance, depth)`
+
+        `start` itself is yielded first, at depth 0. With `incoming=True`,
+        links are followed backwards.
+        """
+        if not isinstance(fields, (list, tuple)):
+            fields = [fields]
+        index = self.incoming if incoming else self.outgoing
+        keys = [(field.owner, field.name) for field in fields]
+        start_id = getattr(start, "id", start)
+        seen = {start_id}
+        queue = deque([(start_id, 0)])
+        while queue:
+            id_, depth = queue.popleft()
+            yield self.resolve(id_), depth
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for cls, name in keys:
+                for other_id in index.get((cls, name, id_), ()):
+                    if other_id not in seen:
+                        seen.add(other_id)
+                        queue.append((other_id, depth + 1))
@@ -0,0 +1,125 @@
+"""A change feed for field values.
+
+Listeners subscribe to a class or to a single field with
+`context.changes.observe(target, callback)`, and are called with a list
+of `Change` tuples. Outside of a batch, each change is delivered as it
+happens. Inside `with context.changes.batch():` changes are buffered, and
+repeated changes to the same field of the same instance are coalesced into
+one - keeping the first old value and the last new value - before
+listeners are called, once, when the outermost batch ends.
+
+Changes come from field assignment and deletion, and from in-place
+changes to the sequences of ListFields (reported with `old is new`).
+Values that were not set are given as `UNSET`.
+
+Batches are local to the thread or asyncio task that opens them: changes
+made elsewhere meanwhile are not buffered in them.
+"""
+import asyncio
+from collections import namedtuple
+from contextlib import contextmanager
+import contextvars
+
+from .fields import ComputedField, Field, UNSET, _SENTINEL
+
+
+Change = namedtuple("Change", "instance field old new")
+
+# The open batches of the current thread or asyncio task, by ChangeBus.
+# The mapping is replaced, never changed in place.
+_batches = contextvars.ContextVar("singularity_change_batches", default={})
+
+
+class _Batch:
+    __slots__ = ("pending", "open")
+
+    def __init__(self):
+        # {(id(instance), field): Change}, in order of first change
+        self.pending = {}
+        self.open = True
+
+
+class ChangeBus:
+    def __init__(self):
+        # [(target, callback)], target being a class or a Field
+        self.observers = []
+        self._fields = set()
+
+    def observe(self, target, callback=None):
+        """Call `callback(changes)` for changes on instances of a class, or on one field
+
+        Without a callback, changes are put in a new `asyncio.Queue`,
+        which is returned.
+        """
+        if callback is None:
+            queue = asyncio.Queue()
+            self.observe(target, queue.put_nowait)
+            return queue
+        if isinstance(target, Field):
+            fields = [target]
+        else:
+            fields = [
+                field for field in target.m.fields.values()
+                if not isinstance(field, ComputedField)
+            ]
+        for field in fields:
+            if field not in self._fields:
+                field.watch(self._on_change)
+                self._fields.add(field)
+        self.observers.append((target, callback))
+        return callback
+
+    def unobserve(self, target, callback):
+        self.observers = [
+            (observed, observer) for observed, observer in self.observers
+            if not (observed is target and observer == callback)
+        ]
+
+    def close(self):
+        for field in self._fields:
+            field.unwatch(self._on_change)
+        self._fields.clear()
+        self.observers = []
+
+    @contextmanager
+    def batch(self):
+        batches = _batches.get()
+        if self in batches:
+            # Nested: delivered with the outermost batch
+            yield self
+            return
+        batch = _Batch()
+        token = _batches.set({**batches, self: batch})
+        try:
+            yield self
+        finally:
+            _batches.reset(token)
+            # Tasks started inside the batch may outlive it: their later
+            # changes are delivered as they happen
+            batch.open = False
+            self._deliver(list(batch.pending.values()))
+
+    def _on_change(self, instance, field, old, new):
+        old = UNSET if old is _SENTINEL else old
+        new = UNSET if new is _SENTINEL else new
+        batch = _batches.get().get(self)
+        if batch is None or not batch.open:
+            self._deliver([Change(instance, field, old, new)])
+            return
+        key = (id(instance), field)
+        previous = batch.pending.get(key)
+        if previous is not None:
+            old = previous.old
+        batch.pending[key] = Change(instance, field, old, new)
+
+    def _deliver(self, changes):
+        for target, callback in list(self.observers):
+            if isinstance(target, Field):
+                selected = [change for change in changes if change.field is target]
+            else:
+                selected = [
+                    change for change in changes
+                    if isinstance(change.instance, target) and change.field.name in target.m.fields
+                ]
+            if selected:
+                callback(selected)
@@ -1,9 +1,18 @@
 from abc import ABCMeta
+from array import array
 from collections.abc import MutableSequence
+import contextvars
+import copy
 import datetime
+from functools import partial
+from itertools import islice
 import numbers
+from pickle import PickleBuffer
+import sys
+import threading
 import types
 import uuid
+import weakref
 
 import dateparser
 
@@ -11,6 +20,33 @@ import dateparser
 _SENTINEL = object()
 
 
+class _Unset:
+    # Placeholder for fields with no value in fixed-position records.
+    __slots__ = ()
+
+    def __repr__(self):
+        return "UNSET"
+
+    def __bool__(self):
+        return False
+
+    def __reduce__(self):
+        return "UNSET"
+
+
+UNSET = _Unset()
+
+# While a cached ComputedField is computed, the (instance, field) pairs
+# read by its getter are collected in the list held here; per context, as
+# other threads and tasks read fields at the same time. (sequence, None)
+# pairs stand for reads of a ListField's items.
+_reads = contextvars.ContextVar("singularity_field_reads", default=None)
+# How many computations are running in any context: reads skip the
+# ContextVar lookup while it is 0
+_capturing = 0
+_capturing_lock = threading.Lock()
+
+
 def deferred_type_factory(name):
     module_name = ""
     if "." in name and not module_name:
@@ -59,6 +95,11 @@ def _wraptype(type_):
 class Field:
     name = ""
     type = object
+    # Callables called as `watcher(instance, field, old, new)` after
+    # each change, with _SENTINEL standing for "no value".
+    watchers = ()
+    # Whether values are replaced by equal ones from the context's InternPool
+    intern = False
 
     def __init__(self, default=_SENTINEL):
         if default is not _SENTINEL:
@@ -67,6 +108,10 @@ class Field:
     def __get__(self, instance, owner):
         if instance is None:
             return self
+        if _capturing:
+            reads = _reads.get()
+            if reads is not None:
+                reads.append((instance, self))
         try:
             return instance._data[self.name]
         except KeyError as error:
@@ -76,20 +121,51 @@ class Field:
 
     def __set__(self, instance, value):
         self._check(type(instance), value)
+        if self.intern:
+            value = _interned(value)
+        if _loans or _borrowers:
+            _before_set(instance, self.name)
+        if self.watchers:
+            old = instance._data.get(self.name, _SENTINEL)
+            instance._data[self.name] = value
+            self._notify(instance, old, value)
+            return
         instance._data[self.name] = value
 
     def __delete__(self, instance):
+        if _loans or _borrowers:
+            _before_set(instance, self.name)
+        if self.watchers:
+            old = instance._data.pop(self.name)
+            self._notify(instance, old, _SENTINEL)
+            return
         del instance._data[self.name]
 
+    def watch(self, callback):
+        self.watchers = self.watchers + (callback,)
+
+    def unwatch(self, callback):
+        self.watchers = tuple(watcher for watcher in self.watchers if watcher != callback)
+
+    def _notify(self, instance, old, new):
+        for watcher in self.watchers:
+            watcher(instance, self, old, new)
+
     def __set_name__(self, owner, name):
         self.owner = owner
         self.name = name
+        # Instance attribute holding the value in layout="record" classes
+        self.slot = f"_r_{name}"
 
     def _check(self, owner, value):
         if not isinstance(value, self.type):
             raise TypeError(f"Field '{self.name}' of '{owner.__name__}' "
                             f"instances must be set to an instance of '{self.type.__name__}'")
 
+    def validate(self, owner, value):
+        # Raises as __set__ would, without changing any instance
+        self._check(owner, value)
+
     def setdefault(self, default=_SENTINEL, instance=None):
         if default is _SENTINEL:
             default = self.default
@@ -118,6 +194,9 @@ class Field:
         # permission problems - but remember - default parameter
         # setting is an action of the field creator (be it in code, or dynamic class creation)
         # not from the one querying the system right now
+        if getattr(getattr(instance, "_data", None), "read_only", False):
+            # As for instances in shared memory: the default is read, not stored
+            return default
         self.__set__(instance, default)
         return default
 
@@ -125,19 +204,72 @@ class Field:
         return value
 
 
+def _interned(value):
+    from .context_ import get_context
+    return get_context().intern_pool.intern(value)
+
+
+def _index_text(instance, field, old, new):
+    from .context_ import get_context
+    get_context().text_index(field).update(instance, new)
+
+
 class StringField(Field):
+    """String values, optionally restricted to `options`
+
+    Fields with options are categorical: the options are compiled into
+    a frozen table, and values are checked with a dict lookup and stored
+    as the table's interned string, shared by all instances. `encode`
+    and `decode` convert values to and from their integer codes - the
+    positions in `options` - as used by columnar Collections.
+    """
 
     type = str
 
-    def __init__(self, options=None, **kwargs):
+    def __init__(self, options=None, text_index=False, intern=False, **kwargs):
         self.options = options
+        self.intern = intern
+        self.categories = tuple(sys.intern(option) for option in options) if options else None
+        self.codes = types.MappingProxyType(
+            {option: code for code, option in enumerate(self.categories or ())}
+        )
+        # True, or a tokenizer callable: values are kept in a TextIndex
+        # in the context, for `context.search`
+        self.text_index = text_index
         super().__init__(**kwargs)
+        if text_index:
+            self.watch(_index_text)
 
-    def __set__(self, instance, value):
-        if self.options and value not in self.options:
+    def encode(self, value):
+        """Integer code of an option"""
+        try:
+            return self.codes[value]
+        except (KeyError, TypeError):
             raise ValueError(f"Value must be set to one of {self.options!r}")
+
+    def decode(self, code):
+        return self.categories[code]
+
+    def __set__(self, instance, value):
+        if self.categories:
+            value = self.categories[self.encode(value)]
         return super().__set__(instance, value)
 
+    def validate(self, owner, value):
+        if self.categories:
+            self.encode(value)
+        super().validate(owner, value)
+
+    def json(self, value):
+        if self.categories:
+            return self.categories[self.encode(value)]
+        return value
+
+    def from_json(self, value):
+        if self.categories:
+            return self.categories[self.encode(value)]
+        return value
+
 
 class NumberField(Field):
     type = numbers.Number
@@ -146,6 +278,10 @@ class NumberField(Field):
 class DateField(Field):
     type = datetime.date
 
+    def __init__(self, default=_SENTINEL, intern=False):
+        self.intern = intern
+        super().__init__(default)
+
     def json(self, value):
         return value.isoformat()
 
@@ -186,9 +322,46 @@ class UUIDField(Field):
         return uuid.uuid4()
 
 
+# array.array typecodes for element types stored unboxed
+ARRAY_TYPECODES = {int: "q", float: "d"}
+# NumPy dtype kinds accepted for each element type
+_NUMPY_KINDS = {int: "iu", float: "f"}
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _unboxable(type_, values):
+    # Whether the initial `values` of a sequence of `type_` are stored
+    # unchanged in an array: plain ints that fit in 64 bits, or plain
+    # floats - not bools or IntEnums, which would be read back as ints.
+    # Other iterables than lists and tuples are not looked at in advance.
+    if isinstance(values, TypedSequence) and not isinstance(values, ArraySequence):
+        values = values._data
+    if not isinstance(values, (list, tuple)) or not values:
+        return True
+    if not set(map(type, values)) <= {type_}:
+        return False
+    return type_ is not int or (min(values) >= _INT64_MIN and max(values) <= _INT64_MAX)
+
+
 class TypedSequence(MutableSequence):
+    # Callables called as `watcher(sequence)` after each change
+    watchers = ()
+    # Set once the sequence is held in a ListField: it is not adopted by another
+    _owned = False
+
+    def __new__(cls, type_=None, initial_values=None):
+        # Sequences of primitive numbers are array-backed, unless their
+        # initial values can't be stored as they are
+        if cls is TypedSequence and type_ in ARRAY_TYPECODES and _unboxable(type_, initial_values):
+            cls = ArraySequence
+        return super().__new__(cls)
+
     def __init__(self, type_, initial_values=None):
         self.type = type_
+        if isinstance(initial_values, TypedSequence) and initial_values.type == type_:
+            # Already validated
+            self._data = list(initial_values._data)
+            return
         self._data = []
         if initial_values:
             self.extend(initial_values)
@@ -197,19 +370,46 @@ class TypedSequence(MutableSequence):
         if not isinstance(value, self.type):
             raise TypeError(f"Only values of type '{self.type.__name__}' can be inserted!")
 
+    def _check_many(self, values):
+        # Checks each distinct item type once, instead of each item
+        if isinstance(values, TypedSequence) and values.type == self.type:
+            return values._data
+        values = list(values)
+        for type_ in set(map(type, values)):
+            if not issubclass(type_, self.type):
+                raise TypeError(f"Only values of type '{self.type.__name__}' can be inserted!")
+        return values
+
+    def watch(self, callback):
+        self.watchers = self.watchers + (callback,)
+
+    def unwatch(self, callback):
+        self.watchers = tuple(watcher for watcher in self.watchers if watcher != callback)
+
+    def _notify(self):
+        for watcher in self.watchers:
+            watcher(self)
+
     def __getitem__(self, index):
         return self._data.__getitem__(index)
 
     def __setitem__(self, index, value):
+        if _loans and id(self) in _loans:
+            _before_write(self)
         if isinstance(index, slice):
-            for item in value:
-                self._check(item)
-            return self._data.__setitem__(index, value)
-        self._check(value)
-        self._data[index] = value
+            self._data.__setitem__(index, self._check_many(value))
+        else:
+            self._check(value)
+            self._data[index] = value
+        if self.watchers:
+            self._notify()
 
     def __delitem__(self, index):
+        if _loans and id(self) in _loans:
+            _before_write(self)
         self._data.__delitem__(index)
+        if self.watchers:
+            self._notify()
 
     def __len__(self):
         return len(self._data)
@@ -220,62 +420,320 @@ class TypedSequence(MutableSequence):
         return all(self_item == other_item for self_item, other_item in zip(self, other))
 
     def insert(self, index, value):
+        if _loans and id(self) in _loans:
+            _before_write(self)
         self._check(value)
         self._data.insert(index, value)
+        if self.watchers:
+            self._notify()
+
+    def extend(self, values):
+        if _loans and id(self) in _loans:
+            _before_write(self)
+        self._data.extend(self._check_many(values))
+        if self.watchers:
+            self._notify()
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
 
     def clear(self):
+        if _loans and id(self) in _loans:
+            _before_write(self)
         self._data.clear()
+        if self.watchers:
+            self._notify()
 
     def __repr__(self):
         return f"<{self.type.__name__}>{self._data!r}"
 
-"""
-# TODO: Postponned until we have rich-object fields .
-class SmartSequence(TypedSequence):
-    def __init__(self, type_, owner_type, reciprocal_field=None, initial_values=None):
-        self.type = type_
-        self.owner_type = owner_type
 
-        self._data = []
-        if initial_values:
+# Copy-on-write
+#
+# Copies start out sharing the sequences and child instances of their
+# source, which are lent to a `_Snapshot` of the copy: `_loans` maps the
+# id of each lent value to a weak reference to it and to the snapshots
+# it is lent to. Before a lent value changes - a field of it is set or
+# deleted, or it is a sequence and is mutated, through any reference -
+# each of those snapshots copies it, so copies never see later changes.
+# A copy holding a lent value in a field is given its snapshot's copy
+# of it when it reads the field: `_borrowers` maps the id of each such
+# copy to a weak reference to it, its snapshot and the names of those
+# fields. Reading a lent value from anywhere else copies nothing.
+#
+# Deep copies lend everything reachable from their source through
+# TypeFields and ListFields, in one walk over it that copies nothing -
+# except for `layout="document"` instances, plain data copied whole as
+# they are met. Shallow copies only lend their sequences. Writes through
+# `ArraySequence.memoryview()` are not seen.
+
+_loans = {}
+_borrowers = {}
+
+
+def _forget_loan(key, ref):
+    loan = _loans.get(key)
+    if loan is not None and loan[0] is ref:
+        del _loans[key]
+
+
+def _forget_borrower(key, ref):
+    borrower = _borrowers.get(key)
+    if borrower is not None and borrower[0] is ref:
+        del _borrowers[key]
+
+
+def _children(value):
+    # Sequences and instances held by `value`, a sequence or an instance
+    if isinstance(value, TypedSequence):
+        if isinstance(value, ArraySequence):
+            return ()
+        return [item for item in value._data if hasattr(type(item), "m")]
+    fields = type(value).m.fields
+    return [
+        child for name, child in value._data.items()
+        if isinstance(fields.get(name), (TypeField, ListField))
+        and (isinstance(child, TypedSequence) or hasattr(type(child), "m"))
+    ]
+
+
+class _Snapshot:
+    """The values lent by a copy operation, and their copies, made on demand"""
+
+    def __init__(self, deep):
+        self.deep = deep
+        # For values of plain fields, copied when their instance is
+        self.memo = {}
+        # Lent values by id - kept alive, so that their ids stay valid
+        self.sources = {}
+        # Copies given to readers, by id of their source
+        self.copies = weakref.WeakValueDictionary()
+        # Copies of lent values taken before they changed, not read yet
+        self.pending = {}
+
+    def lend(self, value):
+        ref = weakref.ref(self)
+        stack = [value]
+        while stack:
+            value = stack.pop()
+            key = id(value)
+            if key in self.sources:
+                continue
+            self.sources[key] = value
+            loan = _loans.get(key)
+            if loan is None or loan[0]() is not value:
+                loan = _loans[key] = (weakref.ref(value, partial(_forget_loan, key)), [])
+            loan[1][:] = [snapshot for snapshot in loan[1] if snapshot() is not None]
+            loan[1].append(ref)
+            if not self.deep:
+                continue
+            if hasattr(type(value), "m") and type(value).m.layout == "document":
+                self.before_write(value)
+            else:
+                stack.extend(_children(value))
+
+    def _copy(self, value):
+        # A copy of `value` as it is now, sharing its lent children
+        if isinstance(value, TypedSequence):
+            return TypedSequence(value.type, value)
+        from .context_ import get_context
+        cls = type(value)
+        if cls.m.layout == "document":
+            from .documents import copy_document
+            return copy_document(value)
+        instance = cls.__new__(cls)
+        instance._id = (cls.m.id_factory or get_context().id_factory)()
+        if not cls.m.record_layout:
+            instance._data = {}
+        fields = cls.m.fields
+        data = {}
+        for name, item in value._data.items():
+            if isinstance(fields.get(name), (TypeField, ListField)) and id(item) in self.sources:
+                data[name] = item
+            else:
+                data[name] = copy.deepcopy(item, self.memo)
+        instance._data.update(data)
+        return instance
+
+    def before_write(self, value):
+        key = id(value)
+        if key not in self.pending:
+            self.pending[key] = self._copy(value)
+
+    def get(self, value):
+        """The copy of `value` - the same one for as long as it is in use"""
+        key = id(value)
+        result = self.copies.get(key)
+        if result is None:
+            result = self.pending.pop(key, None)
+            if result is None:
+                result = self._copy(value)
+            self._expose(result)
+            self.copies[key] = result
+        return result
+
+    def _expose(self, value):
+        if isinstance(value, TypedSequence):
+            if self.deep and not isinstance(value, ArraySequence):
+                value._data = [
+                    self.get(item) if id(item) in self.sources else item for item in value._data
+                ]
+            return
+        if type(value).m.layout == "document":
+            # Registered as a root document when copied
+            return
+        from .context_ import get_context
+        get_context().register(value)
+        self.borrow(value, [name for name, item in value._data.items() if id(item) in self.sources])
+
+    def borrow(self, instance, names):
+        """Have `instance` get copies of the lent values in its fields `names` when reading them"""
+        if names:
+            key = id(instance)
+            ref = weakref.ref(instance, partial(_forget_borrower, key))
+            _borrowers[key] = (ref, self, set(names))
+
+
+def _before_write(value):
+    # Lets the snapshots `value` is lent to copy it before it changes
+    for ref in _loans.pop(id(value))[1]:
+        snapshot = ref()
+        if snapshot is not None:
+            snapshot.before_write(value)
+
+
+def _before_set(instance, name):
+    # The field `name` of `instance` is about to be set or deleted
+    key = id(instance)
+    if key in _loans:
+        _before_write(instance)
+    borrower = _borrowers.get(key)
+    if borrower is not None:
+        borrower[2].discard(name)
+
+
+def _borrowed(instance, name, value):
+    # The value `instance` should see in its field `name`, holding `value`
+    key = id(instance)
+    ref, snapshot, names = _borrowers[key]
+    if name not in names:
+        return value
+    names.discard(name)
+    if not names:
+        del _borrowers[key]
+    if id(value) not in snapshot.sources:
+        return value
+    value = snapshot.get(value)
+    instance._data[name] = value
+    return value
+
+
+def _settle(instance):
+    """Give `instance`, if it is a copy, its own copies of the values it still shares"""
+    borrower = _borrowers.get(id(instance))
+    if borrower is not None:
+        data = instance._data
+        for name in list(borrower[2]):
+            _borrowed(instance, name, data[name])
+
+
+def _restore_array_sequence(type_, buffer):
+    sequence = ArraySequence(type_)
+    sequence._data.frombytes(memoryview(buffer).cast("B"))
+    return sequence
+
+
+class ArraySequence(TypedSequence):
+    """TypedSequence for `int` or `float` items, stored in an `array.array`.
+
+    Bulk operations check the whole batch at once, and accept arrays,
+    NumPy arrays and other buffers without converting each item.
+    ints are stored as signed 64 bit values: adding ints beyond that
+    range raises OverflowError, and int subclasses, as bools and
+    IntEnums, are read back as plain ints. `TypedSequence(int, values)`
+    only makes an ArraySequence when its initial values are stored
+    unchanged, and a list-backed TypedSequence otherwise.
+    """
+
+    def __init__(self, type_, initial_values=None):
+        self.type = type_
+        self.typecode = ARRAY_TYPECODES[type_]
+        self._data = array(self.typecode)
+        if initial_values is not None:
             self.extend(initial_values)
 
-    def _check(self, value):
-        if not isinstance(value, self.type):
-            raise TypeError(f"Only values of type '{self.type.__name__}' can be inserted!")
+    def _check_many(self, values):
+        # Returns the values as an array with this sequence's typecode
+        if isinstance(values, ArraySequence):
+            values = values._data
+        if isinstance(values, array):
+            if values.typecode == self.typecode:
+                return values
+            values = values.tolist()
+        elif hasattr(values, "dtype"):
+            if values.dtype.kind not in _NUMPY_KINDS[self.type]:
+                raise TypeError(f"Only values of type '{self.type.__name__}' can be inserted!")
+            if values.dtype.kind == "u" and values.dtype.itemsize == 8 and len(values):
+                # Would wrap around when cast to int64
+                if values.max() > _INT64_MAX:
+                    raise OverflowError("uint64 value beyond the range of signed 64 bit ints")
+            result = array(self.typecode)
+            dtype = "float64" if self.type is float else "int64"
+            result.frombytes(values.astype(dtype, copy=False).tobytes())
+            return result
+        else:
+            values = list(values)
+        if not set(map(type, values)) <= {self.type}:
+            for value in values:
+                self._check(value)
+        return array(self.typecode, values)
 
-    def __getitem__(self, index):
-        return self._data.__getitem__(index)
+    def _check(self, value):
+        super()._check(value)
+        if self.type is int and not _INT64_MIN <= value <= _INT64_MAX:
+            raise OverflowError("int beyond the range of signed 64 bit ints")
 
     def __setitem__(self, index, value):
+        if _loans and id(self) in _loans:
+            _before_write(self)
         if isinstance(index, slice):
-            for item in value:
-                self._check(item)
-            return self._data.__setitem__(index, value)
-        self._check(value)
-        self._data[index] = value
+            self._data[index] = self._check_many(value)
+        else:
+            self._check(value)
+            self._data[index] = value
+        if self.watchers:
+            self._notify()
 
-    def __delitem__(self, index):
-        self._data.__delitem__(index)
+    def __eq__(self, other):
+        if isinstance(other, ArraySequence):
+            return self.type == other.type and self._data == other._data
+        return super().__eq__(other)
 
-    def __len__(self):
-        return len(self._data)
+    def clear(self):
+        if _loans and id(self) in _loans:
+            _before_write(self)
+        del self._data[:]
+        if self.watchers:
+            self._notify()
 
-    def __eq__(self, other):
-        if not isinstance(other, TypedSequence) or self.type != other.type or len(self) != len(other):
-            return False
-        return all(self_item == other_item for self_item, other_item in zip(self, other))
+    def memoryview(self):
+        """Zero-copy view of the stored values"""
+        return memoryview(self._data)
 
-    def insert(self, index, value):
-        self._check(value)
-        self._data.insert(index, value)
+    def __buffer__(self, flags):
+        return memoryview(self._data)
 
-    def clear(self):
-        self._data.clear()
+    def tolist(self):
+        return self._data.tolist()
+
+    def __reduce_ex__(self, protocol):
+        # With pickle protocol 5 the values can travel out-of-band
+        buffer = PickleBuffer(self._data) if protocol >= 5 else self._data.tobytes()
+        return _restore_array_sequence, (self.type, buffer)
 
     def __repr__(self):
-        return f"<{self.type.__name__}>{self._data!r}"
-"""
+        return f"<{self.type.__name__}>{self._data.tolist()!r}"
 
 class DeferrableTypeMixin:
     def __init__(self, type_=object, **kwargs):
@@ -290,46 +748,192 @@ class DeferrableTypeMixin:
 
 class TypeField(DeferrableTypeMixin, Field):
 
+    def __get__(self, instance, owner):
+        value = super().__get__(instance, owner)
+        if _borrowers and id(instance) in _borrowers:
+            value = _borrowed(instance, self.name, value)
+        return value
+
     def json(self, value):
         return self.type.m.json(obj=value)
 
     def from_json(self, value):
         return self.type.m.from_json(value)
 
-# TODO
+def _edges():
+    from .context_ import get_context
+    return get_context().edges
+
+
+class EdgeSequence(TypedSequence):
+    """The instances linked from `instance` through an EdgeField
+
+    A view over the context's EdgeIndex: changes link and unlink.
+    Links have no position - items inserted at any index are appended.
+    """
+
+    def __init__(self, field, instance):
+        self.type = field.type
+        self.field = field
+        self.instance = instance
+
+    @property
+    def _data(self):
+        edges = _edges()
+        return [edges.resolve(id_) for id_ in edges.targets(self.field, self.instance)]
+
+    def __getitem__(self, index):
+        edges = _edges()
+        targets = edges.targets(self.field, self.instance)
+        if isinstance(index, slice):
+            return [edges.resolve(id_) for id_ in list(targets)[index]]
+        # Only the target asked for is resolved, walking from the nearest end
+        ids = iter(targets) if index >= 0 else reversed(targets)
+        id_ = next(islice(ids, index if index >= 0 else -index - 1, None), _SENTINEL)
+        if id_ is _SENTINEL:
+            raise IndexError("EdgeSequence index out of range")
+        return edges.resolve(id_)
+
+    def __len__(self):
+        return len(_edges().targets(self.field, self.instance))
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __contains__(self, value):
+        return getattr(value, "id", None) in _edges().targets(self.field, self.instance)
+
+    def _check(self, value):
+        # IDs link instances by ID, whether they are live yet or not
+        if not isinstance(value, uuid.UUID):
+            super()._check(value)
+
+    def _check_many(self, values):
+        values = list(values)
+        super()._check_many([value for value in values if not isinstance(value, uuid.UUID)])
+        return values
+
+    def insert(self, index, value):
+        self._check(value)
+        _edges().link(self.field, self.instance, value)
+
+    def extend(self, values):
+        values = self._check_many(values)
+        _edges().link_many(self.field, [(self.instance, value) for value in values])
+
+    def __setitem__(self, index, value):
+        old = self[index]
+        if isinstance(index, slice):
+            values = self._check_many(value)
+            for item in old:
+                _edges().unlink(self.field, self.instance, item)
+            self.extend(values)
+            return
+        self._check(value)
+        _edges().unlink(self.field, self.instance, old)
+        _edges().link(self.field, self.instance, value)
+
+    def __delitem__(self, index):
+        old = self[index]
+        for item in (old if isinstance(index, slice) else [old]):
+            _edges().unlink(self.field, self.instance, item)
+
+    def clear(self):
+        for item in list(self):
+            _edges().unlink(self.field, self.instance, item)
+
+
 class EdgeField(DeferrableTypeMixin, Field):
-    pass
-"""
-    def __init__(self, reciprocal_field=None, **kwargs):
+    """Two-way links between instances, kept in the context's EdgeIndex
+
+    Linking `a` to `b` through `a`'s field also links `b` to `a` through
+    the field named `reciprocal_field` on `b`'s class. A field linking a
+    class to itself is its own reciprocal, unless another name is given.
+    With `reciprocal_field=False`, links are one-way, but can still be
+    followed backwards with `referrers`.
+    """
+
+    def __init__(self, type_=object, reciprocal_field=None, **kwargs):
         self.reciprocal_field = reciprocal_field
-        super().__init__(**kwargs)
+        super().__init__(type_, **kwargs)
 
     def __set_name__(self, owner, name):
         super().__set_name__(owner, name)
-        if issubclass(owner, self.type):
+        if self.reciprocal_field is None and issubclass(owner, self.type):
             self.reciprocal_field = name
-        elif not self.reciprocal_field:
-            raise TypeError("EdgeFields must have a reciprocal_field name to connect different classes")
-        self.owner = owner
+
+    def reciprocal(self, target):
+        """The field linking `target` (an instance or an ID) back, or None"""
+        if not self.reciprocal_field:
+            return None
+        cls = type(target)
+        if not hasattr(cls, "m"):
+            if self.reciprocal_field == self.name and issubclass(self.owner, self.type):
+                return self
+            cls = self.type
+        field = getattr(cls, "m", None) and cls.m.fields.get(self.reciprocal_field)
+        if not isinstance(field, EdgeField):
+            raise TypeError(
+                f"{cls.__name__!r} has no EdgeField {self.reciprocal_field!r} "
+                f"reciprocal to '{self.owner.__name__}.{self.name}'"
+            )
+        return field
 
     def __get__(self, instance, owner):
         if instance is None:
             return self
-        if self.name not in instance._data:
-            instance._data[self.name] = SmartSequence(self.type, owner, self.reciprocal_field)
-        return instance._data[self.name]
+        return EdgeSequence(self, instance)
 
     def __set__(self, instance, value):
-        super().__set__(
-            instance, SmartSequence(self.type, self.owner, self.reciprocal_field, value)
-        )
+        sequence = EdgeSequence(self, instance)
+        values = sequence._check_many(value)
+        sequence.clear()
+        sequence.extend(values)
+
+    def __delete__(self, instance):
+        EdgeSequence(self, instance).clear()
+
+    def validate(self, owner, value):
+        # Raises as __set__ would, without linking anything
+        EdgeSequence(self, None)._check_many(value)
+
+    def link_many(self, pairs):
+        """Link each `(source, target)` pair in one pass"""
+        _edges().link_many(self, pairs)
+
+    def referrers(self, instance):
+        """Instances linking to `instance` through this field"""
+        return _edges().referrers(self, instance)
 
     def json(self, value):
-        return self.type.m.json(obj=value)
+        if isinstance(value, EdgeSequence):
+            # The IDs linked, whether their instances are live or not
+            return [str(id_) for id_ in _edges().targets(self, value.instance)]
+        return [str(item.id) for item in value]
 
     def from_json(self, value):
-        return self.type.m.from_json(value)
-"""
+        # Linked by ID: the targets may be decoded later, or not at all
+        return [uuid.UUID(item) if isinstance(item, str) else item for item in value]
+
+
+class _ListWatcher:
+    # Sequence watcher passing in-place changes on to its ListField's
+    # watchers, as a change from and to the same sequence.
+    __slots__ = ("ref", "field")
+
+    def __init__(self, instance, field):
+        self.ref = weakref.ref(instance)
+        self.field = field
+
+    def __call__(self, sequence):
+        instance = self.ref()
+        if instance is not None and self.field.watchers:
+            self.field._notify(instance, sequence, sequence)
+
+
+# Sequence classes ListFields adopt instances of, rather than copying them
+_ADOPTABLE = (TypedSequence, ArraySequence)
+
 
 class ListField(DeferrableTypeMixin, Field):
     def _check(self, owner, value):
@@ -340,13 +944,47 @@ class ListField(DeferrableTypeMixin, Field):
     def __get__(self, instance, owner):
         if instance is None:
             return self
-        return instance._data.setdefault(self.name, TypedSequence(self.type))
+        return self._opened(instance, instance._data.setdefault(self.name, TypedSequence(self.type)))
+
+    def _opened(self, instance, value):
+        # The sequence stored for `instance`, as handed out by __get__
+        if _borrowers and id(instance) in _borrowers:
+            value = _borrowed(instance, self.name, value)
+        if self.watchers:
+            self._watch_items(instance, value)
+        if _capturing:
+            reads = _reads.get()
+            if reads is not None:
+                reads.append((instance, self))
+                reads.append((value, None))
+        value._owned = True
+        return value
 
     def __set__(self, instance, value):
-        super().__set__(instance, TypedSequence(self.type, value))
+        # New sequences of this field's type are adopted as they are. Those
+        # read from a field are copied, so that no two instances share one.
+        if not (type(value) in _ADOPTABLE and value.type == self.type and not value._owned):
+            value = TypedSequence(self.type, value)
+        value._owned = True
+        super().__set__(instance, value)
+        if self.watchers:
+            self._watch_items(instance, value)
+
+    def _watch_items(self, instance, sequence):
+        for watcher in sequence.watchers:
+            if type(watcher) is _ListWatcher and watcher.field is self and watcher.ref() is instance:
+                return
+        sequence.watch(_ListWatcher(instance, self))
+
+    def validate(self, owner, value):
+        for item in value:
+            if not isinstance(item, self.type):
+                raise TypeError(f"Only values of type '{self.type.__name__}' can be inserted!")
 
     def json(self, value):
-        if hasattr(self.type, "json"):
+        if isinstance(value, ArraySequence):
+            value = value.tolist()
+        elif hasattr(self.type, "json"):
             value = [self.type.json(item) for item in value]
         elif hasattr(self.type, "m"):
             value = [item.m.json() for item in value]
@@ -360,26 +998,194 @@ class ListField(DeferrableTypeMixin, Field):
         return value
 
 
+
+class _RecordAccess(Field):
+    """Descriptor methods for the fields of `layout="record"` classes
+
+    Values are read from the slot attributes directly, with no RecordData
+    mapping. Meta gives such fields a subclass of their class and of this
+    one (see `_use_layout`), so that the fields of other classes need not
+    test for the layout on each access.
+    """
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if _capturing:
+            reads = _reads.get()
+            if reads is not None:
+                reads.append((instance, self))
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            if not hasattr(self, "default"):
+                raise
+            return self.setdefault(instance=instance)
+
+    def __set__(self, instance, value):
+        self._check(type(instance), value)
+        if self.intern:
+            value = _interned(value)
+        if _loans or _borrowers:
+            _before_set(instance, self.name)
+        if self.watchers:
+            old = getattr(instance, self.slot, _SENTINEL)
+            setattr(instance, self.slot, value)
+            self._notify(instance, old, value)
+            return
+        setattr(instance, self.slot, value)
+
+    def __delete__(self, instance):
+        if _loans or _borrowers:
+            _before_set(instance, self.name)
+        old = getattr(instance, self.slot)
+        delattr(instance, self.slot)
+        if self.watchers:
+            self._notify(instance, old, _SENTINEL)
+
+
+class _RecordListAccess:
+    # Put before ListField in the bases of its record variant
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot, None)
+        if value is None:
+            value = instance._data.setdefault(self.name, TypedSequence(self.type))
+        return self._opened(instance, value)
+
+
+_record_variants = {}
+
+
+def _use_layout(field, record):
+    """Give `field` the descriptor methods for a class of the given layout
+
+    Fields shared by record and dict layout classes keep the dict ones,
+    which reach the slots of record instances through their RecordData.
+    """
+    cls = type(field)
+    if not record:
+        field._dict_access = True
+        if isinstance(field, _RecordAccess):
+            field.__class__ = cls._plain
+        return
+    if isinstance(field, _RecordAccess) or getattr(field, "_dict_access", False):
+        return
+    variant = _record_variants.get(cls)
+    if variant is None:
+        bases = (cls, _RecordAccess)
+        if issubclass(cls, ListField):
+            bases = (_RecordListAccess,) + bases
+        # Same names as `cls`: codec schemas are told apart by them
+        variant = _record_variants[cls] = type(cls)(cls.__name__, bases, {
+            "__module__": cls.__module__, "__qualname__": cls.__qualname__, "_plain": cls,
+        })
+    field.__class__ = variant
+
 class ComputedField(Field):
     # Can be used as a decorator for the getter method.
-    def __init__(self, getter=None, setter=None, **kwargs):
+    #
+    # With cache=True, the value is kept per instance along with the fields
+    # (and list contents) the getter read, and dropped when any of those change.
+    def __init__(self, getter=None, setter=None, cache=False, **kwargs):
         super().__init__(**kwargs)
         if getter:
             self.getter = getter
         elif not hasattr(self, "getter"):
             raise TypeError("A 'getter' callable must be passed in, or defined as method")
         self.setter_func = setter
+        self.cache = cache
+        # {id(instance): (instance weakref, value, dependencies)}
+        self._cached = {}
+        # {(id(object), field): {id(instance), ...}}
+        self._dependents = {}
 
     def __get__(self, instance, owner):
         if instance is None:
             return self
-        return self.getter(instance)
+        if not self.cache:
+            return self.getter(instance)
+        entry = self._cached.get(id(instance))
+        if entry is None or entry[0]() is not instance:
+            entry = self._compute(instance)
+        elif _capturing:
+            reads = _reads.get()
+            if reads is not None:
+                # A cached value read by another cached field's getter
+                reads.extend((ref(), field) for _, ref, field in entry[2] if ref() is not None)
+        return entry[1]
+
+    def _compute(self, instance):
+        global _capturing
+        reads = []
+        token = _reads.set(reads)
+        with _capturing_lock:
+            _capturing += 1
+        try:
+            value = self.getter(instance)
+        finally:
+            with _capturing_lock:
+                _capturing -= 1
+            _reads.reset(token)
+        outer = _reads.get()
+        if outer is not None:
+            outer.extend(reads)
+        owner_id = id(instance)
+        self._drop(owner_id)
+        dependencies = []
+        seen = set()
+        for obj, field in reads:
+            key = (id(obj), field)
+            if key in seen:
+                continue
+            seen.add(key)
+            dependencies.append((key, weakref.ref(obj), field))
+            self._dependents.setdefault(key, set()).add(owner_id)
+            if field is None:
+                if self._sequence_changed not in obj.watchers:
+                    obj.watch(self._sequence_changed)
+            elif self._field_changed not in field.watchers:
+                field.watch(self._field_changed)
+        ref = weakref.ref(instance, lambda ref: self._collected(owner_id, ref))
+        entry = self._cached[owner_id] = (ref, value, dependencies)
+        return entry
+
+    def _drop(self, owner_id):
+        entry = self._cached.pop(owner_id, None)
+        if entry is None:
+            return
+        for key, _, _ in entry[2]:
+            owners = self._dependents.get(key)
+            if owners is not None:
+                owners.discard(owner_id)
+                if not owners:
+                    del self._dependents[key]
+
+    def _invalidate(self, key):
+        for owner_id in list(self._dependents.get(key, ())):
+            self._drop(owner_id)
+
+    def _field_changed(self, instance, field, old, new):
+        self._invalidate((id(instance), field))
+
+    def _sequence_changed(self, sequence):
+        self._invalidate((id(sequence), None))
+
+    def _collected(self, owner_id, ref):
+        entry = self._cached.get(owner_id)
+        if entry is not None and entry[0] is ref:
+            self._drop(owner_id)
 
     def __set__(self, instance, value):
-        if not self.setter:
+        if not self.setter_func:
             raise TypeError("Attribute not setable")
         self.setter_func(instance, value)
 
+    def validate(self, owner, value):
+        if not self.setter_func:
+            raise TypeError("Attribute not setable")
+
 
 class IDField(ComputedField, UUIDField):
     # UUIDField Inheritance is here to get the serializer methods.
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+import uuid
+import weakref
+
+
+def uuid4():
+    return uuid.uuid4()
+
+
+class UUID7Generator:
+    """Time-ordered UUIDv7 factory.
+
+    The first 48 bits hold a millisecond timestamp, so IDs created
+    later sort after earlier ones - which keeps ordered indexes and
+    on-disk stores keyed by ID append-mostly. The 12 "rand_a" bits
+    are used as a counter inside the same millisecond, so IDs are
+    strictly increasing within a process.
+
+    Randomness is drawn from `os.urandom` in blocks of `block_size`
+    IDs at a time, instead of a syscall per ID. Forked child processes
+    start over with fresh randomness, so they do not repeat the IDs of
+    their parent.
+    """
+
+    def __init__(self, block_size=4096):
+        self.block_size = block_size
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._reset())
+
+    def _reset(self):
+        self._pool = b""
+        self._pos = 0
+        self._last_ms = -1
+        self._counter = 0
+        # In a forked child, another thread may have held the old one
+        self._lock = threading.Lock()
+
+    def _random(self):
+        # 8 bytes per ID: 62 bits for "rand_b", and the other 2 to seed the counter
+        if self._pos >= len(self._pool):
+            self._pool = os.urandom(8 * self.block_size)
+            self._pos = 0
+        value = int.from_bytes(self._pool[self._pos: self._pos + 8], "big")
+        self._pos += 8
+        return value
+
+    def __call__(self):
+        with self._lock:
+            rand = self._random()
+            ms = time.time_ns() // 1_000_000
+            if ms > self._last_ms:
+                self._last_ms = ms
+                # Leave room in the counter for more IDs in the same millisecond
+                self._counter = (rand >> 62) << 9
+            else:
+                self._counter += 1
+                if self._counter > 0xFFF:
+                    # Counter overflow: borrow the next millisecond
+                    self._last_ms += 1
+                    self._counter = 0
+                ms = self._last_ms
+            counter = self._counter
+
+        value = (ms & 0xFFFF_FFFF_FFFF) << 80
+        value |= 0x7 << 76
+        value |= counter << 64
+        value |= 0b10 << 62
+        value |= rand & 0x3FFF_FFFF_FFFF_FFFF
+        return uuid.UUID(int=value)
+
+
+uuid7 = UUID7Generator()
@@ -0,0 +1,51 @@
+"""A bounded pool of shared values, for fields declared with `intern=True`.
+
+Values written to those fields are looked up in the active context's
+pool (`context.intern_pool`): if an equal value of the same type is
+there, instances get the pooled object, and the one written can be
+freed. Strings and dates do not support weak references, so the pool
+holds its values, but only the `maxsize` most recently used - older
+entries are dropped, and instances keep the objects they already have.
+"""
+from collections import OrderedDict
+import sys
+
+
+class InternPool:
+    def __init__(self, maxsize=2 ** 16):
+        self.maxsize = maxsize
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Sizes of the duplicates replaced by pooled values
+        self.saved_bytes = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        """The pooled value equal to `value`, adding `value` if there is none"""
+        key = (type(value), value)
+        pooled = self.values.get(key)
+        if pooled is None:
+            self.misses += 1
+            self.values[key] = value
+            if len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+            return value
+        self.values.move_to_end(key)
+        self.hits += 1
+        if pooled is not value:
+            self.saved_bytes += sys.getsizeof(value)
+        return pooled
+
+    def clear(self):
+        self.values.clear()
+
+    def report(self):
+        return {
+            "size": len(self.values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_bytes": self.saved_bytes,
+        }
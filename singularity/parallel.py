@@ -0,0 +1,100 @@
+"""Bulk JSON decoding and encoding spread over a pool of processes.
+
+Models are passed to the workers by name and looked up in the model
+registry there, importing their module if needed - so they must be
+defined at module level. Instances travel between processes in the
+compact binary format from `singularity.codec`, with pickled values
+allowed: the workers are trusted, and already talk through pickles.
+
+The parent process still decodes every record the workers send back, or
+encodes every instance it sends them, and that share of the work bounds
+the speedup: near 1.7x for decoding and 3.5x for encoding, whatever the
+number of workers (see benchmarks/parallel.py). These pay off for large
+inputs on idle cores, not as a general replacement for the serial calls.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import importlib
+import json
+
+from . import codec
+from .context_ import get_context
+from .registry import model_registry
+
+
+def model_key(cls):
+    if "<locals>" in cls.__qualname__:
+        raise TypeError(f"{cls.__qualname__!r} is not defined at module level, "
+                        "and can't be used from worker processes")
+    return cls.__module__, cls.__qualname__
+
+
+def resolve_model(key):
+    module, qualname = key
+    name = f"{module}.{qualname}"
+    if name not in model_registry:
+        importlib.import_module(module)
+    return model_registry[name]
+
+
+def _forget(instances):
+    # Worker processes don't keep what they decoded or encoded
+    data = get_context().data
+    for instance in instances:
+        data.pop(instance.id, None)
+
+
+def _decode_chunk(key, chunk):
+    cls = resolve_model(key)
+    if isinstance(chunk, (str, bytes, bytearray)):
+        chunk = json.loads(chunk)
+    instances = [cls.m.from_json(item) for item in chunk]
+    _forget(instances)
+    return codec.dump_many(instances, allow_pickle=True)
+
+
+def _encode_chunk(key, data, serialize):
+    cls = resolve_model(key)
+    instances = list(codec.load_many(data, cls, allow_pickle=True))
+    _forget(instances)
+    return [instance.m.json(serialize=serialize) for instance in instances]
+
+
+def _run(function, jobs, workers, ordered):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(function, *job) for job in jobs]
+        for future in (futures if ordered else as_completed(futures)):
+            yield future.result()
+
+
+def from_json_parallel(cls, chunks, workers=None, ordered=True):
+    """Decode JSON chunks into instances of `cls` using `workers` processes
+
+    Each chunk is a list of JSON objects, or a JSON string holding one.
+    With `ordered=False`, instances come back as each chunk is done.
+    Building the instances from the workers' records takes about 60% of
+    the serial time in this process, which caps the speedup near 1.7x.
+    """
+    key = model_key(cls)
+    results = _run(_decode_chunk, ((key, chunk) for chunk in chunks), workers, ordered)
+    instances = []
+    for data in results:
+        instances.extend(codec.load_many(data, cls, allow_pickle=True))
+    return instances
+
+
+def json_parallel(cls, instances, workers=None, chunk_size=1000, serialize=False, ordered=True):
+    """JSON for each of `instances`, produced by `workers` processes
+
+    Encoding the instances for the workers takes about 30% of the serial
+    time in this process, which caps the speedup near 3.5x.
+    """
+    key = model_key(cls)
+    instances = list(instances)
+    jobs = (
+        (key, codec.dump_many(instances[start: start + chunk_size], allow_pickle=True), serialize)
+        for start in range(0, len(instances), chunk_size)
+    )
+    result = []
+    for chunk in _run(_encode_chunk, jobs, workers, ordered):
+        result.extend(chunk)
+    return result
@@ -0,0 +1,287 @@
+"""A context split by instance ID across worker processes.
+
+Each shard is a process with its own `MemoryContext`, which holds every
+instance whose ID hashes to it. The `PartitionedContext` in the parent
+process routes single-instance operations to the owning shard, and
+scatters queries, aggregations and bulk loads to all shards, gathering
+the results. Instances nested in others (as TypeField or ListField
+values) live in the shard of their owner.
+
+As with `singularity.parallel`, models are passed around by name and
+must be defined at module level, and instances travel in the binary
+format from `singularity.codec`. The shards are trusted processes fed
+through pickling pipes, so values the codec can only pickle are allowed.
+Functions given to `query` and `map` must be picklable.
+"""
+import multiprocessing
+import os
+import uuid
+import zlib
+
+from . import codec, context_
+from .aggregate import Aggregation
+from .parallel import model_key, resolve_model
+
+
+class ShardError(RuntimeError):
+    pass
+
+
+class Shard:
+    """State of a shard, in its worker process"""
+
+    def __init__(self):
+        self.context = context_.active_context = context_.MemoryContext()
+        # The context only holds weak references to instances
+        self.instances = {}
+
+    def keep(self, instances):
+        for instance in instances:
+            self.instances[instance.id] = instance
+
+
+def _serve(connection):
+    shard = Shard()
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        function, args = message
+        try:
+            result = (True, function(shard, *args))
+        except Exception as error:
+            result = (False, error)
+        connection.send(result)
+    connection.close()
+
+
+# Operations run inside the shards. Each gets the Shard as first argument.
+
+def _load(shard, data):
+    shard.keep(list(codec.load_many(data, allow_pickle=True)))
+
+
+def _load_json(shard, key, items):
+    cls = resolve_model(key)
+    shard.keep([cls.m.from_json(item) for item in items])
+
+
+def _get(shard, id_):
+    instance = shard.context.get(id_)
+    return None if instance is None else codec.dumps(instance, allow_pickle=True)
+
+
+def _update(shard, id_, changes):
+    instance = shard.context.get(id_)
+    if instance is None:
+        raise KeyError(id_)
+    instance.m.update(changes)
+
+
+def _remove(shard, id_):
+    return shard.instances.pop(id_, None) is not None
+
+
+def _count(shard, key):
+    cls = resolve_model(key)
+    return sum(1 for _ in shard.context.instances(cls))
+
+
+def _query(shard, key, predicate):
+    cls = resolve_model(key)
+    instances = (
+        instance for instance in shard.context.instances(cls)
+        if predicate is None or predicate(instance)
+    )
+    return codec.dump_many(instances, allow_pickle=True)
+
+
+def _aggregate(shard, key, group_by, bins, measures):
+    aggregation = Aggregation(shard.context, resolve_model(key), group_by=group_by, bins=bins, **measures)
+    aggregation.close()
+    return {
+        group_key: (group["count"], {
+            name: (stats.n, stats.sum, stats.min, stats.max, stats.hist)
+            for name, stats in group["stats"].items()
+        })
+        for group_key, group in aggregation.groups.items()
+    }
+
+
+def _map(shard, function, args):
+    return function(shard.context, *args)
+
+
+class PartitionedContext:
+    """Instances spread over `shards` worker processes, by a hash of their ID
+
+    >>> with PartitionedContext(shards=4) as partitioned:
+    ...     partitioned.load(people)
+    ...     partitioned.aggregate(Person, group_by="city", mean="age")
+    """
+
+    def __init__(self, shards=None):
+        shards = shards or os.cpu_count() or 1
+        self.connections = []
+        self.processes = []
+        for _ in range(shards):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def __len__(self):
+        return len(self.connections)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for connection, process in zip(self.connections, self.processes):
+            connection.send(None)
+            process.join()
+            connection.close()
+        self.connections = []
+        self.processes = []
+
+    def shard_for(self, id_):
+        if not isinstance(id_, uuid.UUID):
+            id_ = uuid.UUID(id_)
+        return zlib.crc32(id_.bytes) % len(self.connections)
+
+    # Messaging
+
+    def _send(self, shard, function, *args):
+        self.connections[shard].send((function, args))
+
+    def _receive(self, shard):
+        ok, result = self.connections[shard].recv()
+        if not ok:
+            raise ShardError(f"Shard {shard} failed: {result!r}") from result
+        return result
+
+    def _call(self, shard, function, *args):
+        self._send(shard, function, *args)
+        return self._receive(shard)
+
+    def _scatter(self, jobs):
+        # jobs: {shard: (function, *args)} - all shards work at the same time
+        for shard, (function, *args) in jobs.items():
+            self._send(shard, function, *args)
+        return {shard: self._receive(shard) for shard in jobs}
+
+    def _broadcast(self, function, *args):
+        return list(self._scatter({shard: (function, *args) for shard in range(len(self))}).values())
+
+    # Loading
+
+    def _route(self, items, id_of):
+        buckets = {}
+        for item in items:
+            buckets.setdefault(self.shard_for(id_of(item)), []).append(item)
+        return buckets
+
+    def load(self, instances):
+        """Copy `instances` to the shards owning their IDs"""
+        buckets = self._route(instances, lambda instance: instance.id)
+        self._scatter({shard: (_load, codec.dump_many(bucket, allow_pickle=True)) for shard, bucket in buckets.items()})
+
+    def load_json(self, cls, items):
+        """Decode JSON objects as instances of `cls` directly in the shards
+
+        Items without an "id" get a new one, so they can be routed.
+        """
+        key = model_key(cls)
+        id_factory = cls.m.id_factory or context_.get_context().id_factory
+        items = [item if "id" in item else dict(item, id=str(id_factory())) for item in items]
+        buckets = self._route(items, lambda item: item["id"])
+        self._scatter({shard: (_load_json, key, bucket) for shard, bucket in buckets.items()})
+
+    # Single instances
+
+    def get(self, id_, default=None):
+        """A local copy of the instance with `id_`"""
+        if not isinstance(id_, uuid.UUID):
+            id_ = uuid.UUID(id_)
+        data = self._call(self.shard_for(id_), _get, id_)
+        if data is None:
+            # Instances nested in others live in the shard of their owner
+            data = next(filter(None, self._broadcast(_get, id_)), None)
+        if data is None:
+            return default
+        return codec.decode(data, register=False, allow_pickle=True)[0]
+
+    def update(self, id_, changes):
+        """Apply `changes` (as in `instance.m.update`) to the instance in its shard"""
+        if not isinstance(id_, uuid.UUID):
+            id_ = uuid.UUID(id_)
+        self._call(self.shard_for(id_), _update, id_, changes)
+
+    def remove(self, id_):
+        if not isinstance(id_, uuid.UUID):
+            id_ = uuid.UUID(id_)
+        return self._call(self.shard_for(id_), _remove, id_)
+
+    # Scatter / gather
+
+    def count(self, cls):
+        return sum(self._broadcast(_count, model_key(cls)))
+
+    def query(self, cls, predicate=None):
+        """Local copies of the instances of `cls` for which `predicate(instance)` is true"""
+        result = []
+        for data in self._broadcast(_query, model_key(cls), predicate):
+            result.extend(codec.load_many(data, cls, register=False, allow_pickle=True))
+        return result
+
+    def instances(self, cls):
+        return iter(self.query(cls))
+
+    def map(self, function, *args):
+        """`function(context, *args)` run in every shard - returns the list of results"""
+        return self._broadcast(_map, function, args)
+
+    def aggregate(self, model, group_by=None, bins=None, **measures):
+        """Like `Context.aggregate`, computed in the shards and merged here
+
+        Returns the figures in the format of `Aggregation.result()`.
+        """
+        partials = self._broadcast(_aggregate, model_key(model), group_by, bins, measures)
+        merged = {}
+        for groups in partials:
+            for key, (count, stats) in groups.items():
+                if key not in merged:
+                    merged[key] = [count, stats]
+                    continue
+                total = merged[key]
+                total[0] += count
+                for name, (n, sum_, min_, max_, hist) in stats.items():
+                    n0, sum0, min0, max0, hist0 = total[1][name]
+                    if hist0 is not None:
+                        hist = [a + b for a, b in zip(hist0, hist)]
+                    total[1][name] = (n0 + n, sum0 + sum_, min(min0, min_), max(max0, max_), hist)
+
+        ops = {}
+        for op, fields in measures.items():
+            for name in ([fields] if isinstance(fields, str) else fields):
+                ops.setdefault(name, set()).add(op)
+        result = {}
+        for key, (count, stats) in merged.items():
+            row = result[key] = {"count": count}
+            for name, (n, sum_, min_, max_, hist) in stats.items():
+                if "sum" in ops[name]:
+                    row[f"sum_{name}"] = sum_
+                if "mean" in ops[name]:
+                    row[f"mean_{name}"] = sum_ / n if n else None
+                if "min" in ops[name]:
+                    row[f"min_{name}"] = min_ if n else None
+                if "max" in ops[name]:
+                    row[f"max_{name}"] = max_ if n else None
+                if "hist" in ops[name]:
+                    row[f"hist_{name}"] = list(hist)
+        return result
@@ -0,0 +1,222 @@
+from array import array
+from functools import lru_cache
+
+from .fields import TypedSequence, _SENTINEL
+
+
+STAR = "*"
+
+
+class PathError(KeyError):
+    pass
+
+
+class CompiledPath:
+    """A dotted item path ("father.pets.*.name") parsed once into its components.
+
+    Integer components index sequences, and "*" expands to every item
+    in a sequence. Evaluation is iterative, and field descriptors are
+    reached straight from the class, without going through the bound
+    "d" namespace.
+    """
+
+    __slots__ = ("path", "components", "has_star", "_prefix")
+
+    def __init__(self, path, components=None):
+        self.path = path
+        if components is None:
+            components = tuple(
+                int(comp) if comp.isdigit() else comp for comp in path.split(".")
+            )
+        self.components = components
+        self.has_star = STAR in components
+        self._prefix = None
+
+    def __repr__(self):
+        return f"<CompiledPath {self.path!r}>"
+
+    @property
+    def prefix(self):
+        # Path to the item holding the last component
+        if self._prefix is None:
+            self._prefix = CompiledPath(self.path.rpartition(".")[0], self.components[:-1])
+        return self._prefix
+
+    @property
+    def last(self):
+        return self.components[-1]
+
+    @staticmethod
+    def _step(item, comp):
+        if comp.__class__ is int:
+            if not isinstance(item, TypedSequence):
+                raise PathError(f"Integer {comp!r} not allowed in this part of the path")
+            return item[comp]
+        field = getattr(type(item), "m", None)
+        field = field.fields.get(comp) if field is not None else None
+        if field is None:
+            raise PathError(comp)
+        return field.__get__(item, type(item))
+
+    def get(self, item, default=None):
+        """Value at the path for a path without "*" components"""
+        try:
+            for comp in self.components:
+                item = self._step(item, comp)
+        except (KeyError, AttributeError, IndexError):
+            return default
+        return item
+
+    def get_many(self, root, default=None):
+        """Yield every value matched by the path.
+
+        Each branch of a "*" expansion that can't be resolved
+        yields `default` once.
+        """
+        if not self.has_star:
+            yield self.get(root, default)
+            return
+        components = self.components
+        size = len(components)
+        stack = [(root, 0)]
+        while stack:
+            item, index = stack.pop()
+            try:
+                while index < size:
+                    comp = components[index]
+                    index += 1
+                    if comp == STAR:
+                        if not isinstance(item, TypedSequence):
+                            raise PathError("'*' only makes sense for sequence components of the key")
+                        stack.extend((element, index) for element in reversed(item))
+                        break
+                    item = self._step(item, comp)
+                else:
+                    yield item
+            except (KeyError, AttributeError, IndexError):
+                yield default
+
+    def pluck(self, instances, default=None, typecode=None, dtype=None):
+        """Evaluate the path over every item in `instances`, in one pass.
+
+        Returns a list of values, an `array.array` if `typecode` is given,
+        or a NumPy array if `dtype` is given. For paths with "*" components
+        a `(values, offsets)` pair is returned instead, where the values
+        for `instances[i]` are `values[offsets[i]:offsets[i + 1]]`.
+        """
+        if not self.has_star:
+            values = [self.get(instance, default) for instance in instances]
+            return _pack(values, typecode, dtype)
+        values = []
+        offsets = array("q", [0])
+        for instance in instances:
+            values.extend(self.get_many(instance, default))
+            offsets.append(len(values))
+        if dtype is not None:
+            offsets = _pack(offsets, None, "int64")
+        return _pack(values, typecode, dtype), offsets
+
+    def inner_items(self, root):
+        """Yield the items holding the last component of the path"""
+        if len(self.components) == 1:
+            yield root
+            return
+        yield from self.prefix.get_many(root, None)
+
+
+class PathTrie:
+    """Dotted paths grouped by their common prefixes.
+
+    Used for bulk updates, so that a prefix shared by many paths
+    ("config.network.*") is resolved only once per instance.
+    """
+
+    __slots__ = ("path", "children", "leaves")
+
+    def __init__(self, path=""):
+        self.path = path
+        self.children = {}
+        self.leaves = []
+
+    @classmethod
+    def from_items(cls, items):
+        root = cls()
+        for path, value in items:
+            node = root
+            compiled = compile_path(path)
+            for comp in compiled.components[:-1]:
+                child = node.children.get(comp)
+                if child is None:
+                    child_path = f"{node.path}.{comp}" if node.path else str(comp)
+                    child = node.children[comp] = cls(child_path)
+                node = child
+            node.leaves.append((compiled.last, value, path))
+        root._check_overlaps()
+        return root
+
+    def _check_overlaps(self):
+        # A path setting an item can't be combined with paths inside that item:
+        # those would be resolved against the item being replaced.
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            children = node.children
+            for last, value, path in node.leaves:
+                if last in children or (children and last == STAR) or (
+                    STAR in children and isinstance(last, int)
+                ):
+                    raise PathError(f"Path {path!r} overlaps with other paths inside it")
+            stack.extend(children.values())
+
+    def targets(self, root):
+        """Yield (inner_item, last_component, value, path) for every leaf"""
+        stack = [(root, self)]
+        while stack:
+            item, node = stack.pop()
+            for last, value, path in node.leaves:
+                yield item, last, value, path
+            for comp, child in node.children.items():
+                if comp == STAR:
+                    if not isinstance(item, TypedSequence):
+                        raise PathError(f"'*' only makes sense for sequence components of the key {child.path!r}")
+                    stack.extend((element, child) for element in item)
+                    continue
+                try:
+                    stack.append((CompiledPath._step(item, comp), child))
+                except (KeyError, AttributeError, IndexError) as error:
+                    raise PathError(child.path) from error
+
+
+def _pack(values, typecode, dtype):
+    if dtype is not None:
+        try:
+            import numpy
+        except ImportError as error:
+            raise ImportError("NumPy is needed to pluck values into NumPy arrays") from error
+        return numpy.array(values, dtype=dtype)
+    if typecode is not None:
+        return array(typecode, values)
+    return values
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path):
+    return CompiledPath(path)
+
+
+def get_item(root, path, default=_SENTINEL):
+    """Mapping-style lookup, with a fast path for single-level keys"""
+    if "." not in path:
+        if path == STAR:
+            raise KeyError("Invalid '*' in item path")
+        field = type(root).m.fields.get(path)
+        if field is not None:
+            try:
+                return field.__get__(root, type(root))
+            except (KeyError, AttributeError):
+                pass
+        return default
+    compiled = compile_path(path)
+    if compiled.has_star:
+        raise KeyError("Invalid '*' in item path")
+    return compiled.get(root, default)
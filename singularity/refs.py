@@ -0,0 +1,150 @@
+"""JSON for object graphs, writing each instance once.
+
+The first time an instance is met it is serialized in full, as by
+`m.json()`; later references to it are written as `{"$ref": "<id>"}`.
+Decoding keeps a table of the instances read so far by ID, so shared
+children come back as one object, and cycles are restored.
+
+Used through `m.json(refs=True)` and `m.from_json(data, refs=True)`.
+"""
+import json
+import weakref
+
+from .fields import ComputedField, IDField, ListField, TypeField
+from .registry import model_registry
+
+
+REF = "$ref"
+
+# Model class resolved for each TypeField/ListField, once it is known
+_models = weakref.WeakKeyDictionary()
+
+
+def _resolve(type_):
+    # Concrete model class for a field type, or None for other types
+    if hasattr(type_, "m"):
+        return type_
+    if hasattr(type_, "singularity_deferred_type"):
+        for cls in model_registry.values():
+            if issubclass(cls, type_):
+                return cls
+    return None
+
+
+def _model(field):
+    # Model class held by `field`, or None for fields of other types
+    if not isinstance(field, (TypeField, ListField)):
+        return None
+    try:
+        return _models[field]
+    except KeyError:
+        pass
+    model = _resolve(field.type)
+    # A deferred type may not be defined yet: only a found class is kept
+    if model is not None or not hasattr(field.type, "singularity_deferred_type"):
+        _models[field] = model
+    return model
+
+
+def _encode(root):
+    # Depth first with an explicit stack, so long chains do not reach
+    # the recursion limit; each item is an instance and where to put it.
+    seen = set()
+    top = {}
+    stack = [(root, top, None)]
+    sentinel = object()
+    while stack:
+        instance, target, key = stack.pop()
+        id_ = str(instance.id)
+        if id_ in seen:
+            target[key] = {REF: id_}
+            continue
+        seen.add(id_)
+        result = target[key] = {}
+        children = []
+        namespace = instance.d
+        for name, field in type(instance).m.fields.items():
+            value = getattr(namespace, name, sentinel)
+            if value is sentinel:
+                continue
+            if _model(field) is None:
+                result[name] = field.json(value)
+            elif isinstance(field, TypeField):
+                result[name] = None
+                children.append((value, result, name))
+            else:
+                items = result[name] = [None] * len(value)
+                children.extend((item, items, index) for index, item in enumerate(value))
+        stack.extend(reversed(children))
+    return top[None]
+
+
+def to_json(instance, serialize=False):
+    result = _encode(instance)
+    return result if not serialize else json.dumps(result)
+
+
+def _decode(cls, data, strict):
+    # Iterative, as _encode. An instance's fields are set once all of
+    # its children are read; it is in `table` before, for cycles.
+    table = {}
+    top = {}
+    stack = [(cls, data, top, None)]
+    while stack:
+        task = stack.pop()
+        if task[0] is None:
+            _, instance, values, _ = task
+            namespace = instance.d
+            for key, value in values:
+                setattr(namespace, key, value)
+            continue
+        cls, data, target, index = task
+        if REF in data:
+            try:
+                target[index] = table[data[REF]]
+            except KeyError:
+                raise ValueError(f"Reference to unknown instance {data[REF]!r}")
+            continue
+        cls_m = cls.m
+        raw_id = data.get("id")
+        id_ = raw_id
+        if id_ is not None:
+            id_ = cls_m.fields["id"].from_json(id_)
+        # Registered before its fields are read, so cycles can refer to it
+        instance = target[index] = cls(id=id_)
+        if raw_id is not None:
+            table[raw_id] = instance
+        table[str(instance.id)] = instance
+        values = []
+        children = []
+        for key, value in data.items():
+            field = cls_m.fields.get(key)
+            if isinstance(field, (IDField, ComputedField)):
+                continue
+            if field is None:
+                if strict:
+                    raise KeyError(f"Unknown field {key!r}")
+                continue
+            model = _model(field)
+            if model and isinstance(field, TypeField):
+                # Filled in place by the child's task
+                pair = [key, None]
+                children.append((model, value, pair, 1))
+                values.append(pair)
+                continue
+            if model:
+                items = [None] * len(value)
+                children.extend((model, item, items, position) for position, item in enumerate(value))
+                value = items
+            elif hasattr(field, "from_json"):
+                value = field.from_json(value)
+            values.append((key, value))
+        stack.append((None, instance, values, None))
+        stack.extend(reversed(children))
+    return top[None]
+
+
+def from_json(cls, data, strict=False):
+    if isinstance(data, str):
+        data = json.loads(data)
+    return _decode(cls, data, strict)
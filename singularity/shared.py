@@ -0,0 +1,297 @@
+"""Read-only context snapshots in shared memory, for pre-fork worker pools.
+
+`context.freeze_to_shared_memory()` writes every live instance of the
+context as a `singularity.codec` record into one
+`multiprocessing.shared_memory` segment:
+
+    header | records... | index
+
+The index has one fixed-size entry per record: the instance ID, and the
+record offset and size, sorted by ID so lookups are a binary search.
+Instances referring to others in the segment hold their IDs, written as
+codec back-references, so each instance is stored once. Workers attach
+with `SharedContext(name)`. The instances they get hold only a position
+in the segment, and decode fields on first access, so reading the
+dataset does not touch refcounts on shared pages. `layout="record"`
+instances are decoded into read-only slots as they are looked up.
+"""
+from collections import ChainMap
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+import struct
+import uuid
+import weakref
+
+from . import codec
+from .base import RecordData
+from .fields import ArraySequence, TypedSequence
+
+
+MAGIC = b"SGSC"
+_header = struct.Struct("<4sIQQ")
+_entry = struct.Struct("<16sQQ")
+
+
+class ReadOnlyError(TypeError):
+    pass
+
+
+class _ReadOnlySequence:
+    def _read_only(self, *args):
+        raise ReadOnlyError("Instances from a SharedContext are read-only")
+
+    __setitem__ = __delitem__ = insert = extend = clear = _read_only
+
+
+class FrozenSequence(_ReadOnlySequence, TypedSequence):
+    pass
+
+
+class FrozenArraySequence(_ReadOnlySequence, ArraySequence):
+    def memoryview(self):
+        return memoryview(self._data).toreadonly()
+
+    def __buffer__(self, flags):
+        return self.memoryview()
+
+
+def _frozen(value):
+    # Read-only sequences sharing the items of `value`
+    if isinstance(value, (FrozenSequence, FrozenArraySequence)) or not isinstance(value, TypedSequence):
+        return value
+    frozen_cls = FrozenArraySequence if isinstance(value, ArraySequence) else FrozenSequence
+    frozen = frozen_cls.__new__(frozen_cls)
+    frozen.__dict__.update(value.__dict__)
+    return frozen
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def freeze(instances, name=None):
+    """Write `instances` into a new shared memory segment - returns its SharedContext"""
+    instances = list(instances)
+    # Written as back-references wherever they are met
+    members = {id(instance): instance for instance in instances}
+    records = []
+    for instance in instances:
+        records.append((instance.id.bytes, codec.encode(instance, refs=ChainMap({}, members))))
+    records.sort(key=lambda record: record[0])
+
+    data_size = sum(len(record) for _, record in records)
+    size = _header.size + data_size + _entry.size * len(records)
+    segment = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+    buffer = segment.buf
+    pos = _header.size
+    index_pos = _header.size + data_size
+    for number, (id_bytes, record) in enumerate(records):
+        buffer[pos: pos + len(record)] = record
+        _entry.pack_into(buffer, index_pos + number * _entry.size, id_bytes, pos, len(record))
+        pos += len(record)
+    _header.pack_into(buffer, 0, MAGIC, 1, len(records), index_pos)
+    return SharedContext(segment=segment)
+
+
+class _Refs(dict):
+    """Instances back-references in records point to, found in the segment if need be"""
+
+    def __init__(self, shared, *args):
+        super().__init__(*args)
+        self.shared = shared
+
+    def __missing__(self, id_):
+        instance = self.shared.get(id_)
+        if instance is None:
+            raise KeyError(id_)
+        return instance
+
+
+class _FrozenRecordData(RecordData):
+    __slots__ = ()
+
+    read_only = True
+
+    def __setitem__(self, key, value):
+        raise ReadOnlyError("Instances from a SharedContext are read-only")
+
+    __delitem__ = __setitem__
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return _frozen(default)
+
+
+def _read_only(instance, *args):
+    raise ReadOnlyError("Instances from a SharedContext are read-only")
+
+
+_frozen_classes = {}
+
+
+def _frozen_class(cls):
+    # Subclass of a layout="record" class with read-only slots, which is
+    # otherwise taken for it: it is not a model class of its own
+    frozen = _frozen_classes.get(cls)
+    if frozen is None:
+        namespace = {
+            "__slots__": (),
+            "__module__": cls.__module__,
+            "__qualname__": cls.__qualname__,
+            "__class__": property(lambda instance: cls),
+            "_data": property(_FrozenRecordData),
+        }
+        for attr in cls.m.slot_attrs.values():
+            namespace[attr] = property(getattr(cls, attr).__get__, _read_only, _read_only)
+        frozen = _frozen_classes[cls] = type.__new__(type(cls), cls.__name__, (cls,), namespace)
+        codec.alias(frozen, cls)
+    return frozen
+
+
+class FrozenData(Mapping):
+    """`_data` for instances living in a shared memory segment.
+
+    Fields are decoded from the segment the first time they are needed,
+    nested instances as views of their own records and sequences as
+    read-only sequences. Writing raises ReadOnlyError; the defaults of
+    unset fields are read without being stored.
+    """
+
+    __slots__ = ("_shared", "_pos", "_cls", "_fields")
+
+    read_only = True
+
+    def __init__(self, shared, pos, cls):
+        self._shared = shared
+        self._pos = pos
+        self._cls = cls
+        self._fields = None
+
+    def _decoded(self):
+        if self._fields is None:
+            fields = {}
+            codec.read_fields(
+                self._shared.buffer, self._pos, self._cls, fields,
+                register=False, refs=_Refs(self._shared), view=self._shared._view,
+            )
+            self._fields = {name: _frozen(value) for name, value in fields.items()}
+        return self._fields
+
+    def __getitem__(self, key):
+        return self._decoded()[key]
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __len__(self):
+        return len(self._decoded())
+
+    def __setitem__(self, key, value):
+        raise ReadOnlyError("Instances from a SharedContext are read-only")
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return _frozen(default)
+
+    __delitem__ = pop = update = __setitem__
+
+
+class SharedContext:
+    """Read-only view of a context frozen to shared memory
+
+    >>> snapshot = context.freeze_to_shared_memory()
+    >>> # in a worker process:
+    >>> shared = SharedContext(snapshot.name)
+    >>> shared.get(some_id).d.name
+    """
+
+    def __init__(self, name=None, segment=None):
+        self.segment = segment if segment is not None else _attach(name)
+        self.buffer = self.segment.buf
+        magic, version, self.count, self.index_pos = _header.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory segment {self.name!r} is not a frozen context")
+        # Live views by ID, so that references to an instance are the same view
+        self._views = weakref.WeakValueDictionary()
+
+    @property
+    def name(self):
+        return self.segment.name
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, number):
+        return _entry.unpack_from(self.buffer, self.index_pos + number * _entry.size)
+
+    def _view(self, pos, cls=None):
+        cls, id_, fields_pos = codec.read_header(self.buffer, pos, cls)
+        instance = self._views.get(id_)
+        if instance is not None:
+            return instance
+        if cls.m.record_layout:
+            # Slots can't be views: record layout instances are decoded
+            # copies, written through the slots of their class
+            frozen_cls = _frozen_class(cls)
+            instance = self._views[id_] = frozen_cls.__new__(frozen_cls)
+            instance._id = id_
+            fields = {}
+            codec.read_fields(
+                self.buffer, fields_pos, cls, fields,
+                register=False, refs=_Refs(self, {id_: instance}), view=self._view,
+            )
+            for name, value in fields.items():
+                getattr(cls, cls.m.slot_attrs[name]).__set__(instance, _frozen(value))
+        else:
+            instance = self._views[id_] = cls.__new__(cls)
+            instance._id = id_
+            instance._data = FrozenData(self, fields_pos, cls)
+        return instance
+
+    def ids(self):
+        for number in range(self.count):
+            yield uuid.UUID(bytes=self._entry(number)[0])
+
+    def get(self, id_, default=None):
+        if not isinstance(id_, uuid.UUID):
+            id_ = uuid.UUID(id_)
+        target = id_.bytes
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            id_bytes = self._entry(middle)[0]
+            if id_bytes < target:
+                low = middle + 1
+            elif id_bytes > target:
+                high = middle
+            else:
+                return self._view(self._entry(middle)[1])
+        return default
+
+    def __getitem__(self, id_):
+        instance = self.get(id_)
+        if instance is None:
+            raise KeyError(id_)
+        return instance
+
+    def instances(self, cls=None):
+        for number in range(self.count):
+            instance = self._view(self._entry(number)[1])
+            if cls is None or isinstance(instance, cls):
+                yield instance
+
+    def close(self):
+        self.buffer = None
+        self.segment.close()
+
+    def unlink(self):
+        """Free the segment - to be called once, by the process that created it"""
+        self.segment.unlink()
@@ -0,0 +1,178 @@
+"""Inverted index over the text of a StringField.
+
+Created for fields declared with `StringField(text_index=True)` - or
+`text_index=tokenizer`, a callable splitting a string into terms - and
+kept by the context, one per field, up to date as values are written.
+
+Each indexed instance gets a document number. A term's posting list is
+a pair of arrays - the sorted numbers of the documents holding it, and
+how many times it occurs in each - and terms are kept in a sorted list,
+so that prefix queries ("jo*") are a binary search and a range scan.
+Searches rank the documents from the posting lists alone, and only the
+instances on the page returned are looked up.
+"""
+from array import array
+from bisect import bisect_left, insort
+import heapq
+import math
+import re
+import weakref
+
+
+_word = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Default tokenizer: lower cased words"""
+    return _word.findall(text.lower())
+
+
+class TextIndex:
+    def __init__(self, field):
+        self.field = field
+        self.tokenize = field.text_index if callable(field.text_index) else tokenize
+        # Sorted terms, and {term: (document numbers, term counts)}
+        self.terms = []
+        self.postings = {}
+        # {id: document number}, {document number: (weak reference, indexed text, id)}
+        self.numbers = {}
+        self.documents = {}
+        self._next = 0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _counts(self, text):
+        counts = {}
+        for term in self.tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        return counts
+
+    def update(self, instance, text):
+        """Index `text` as the value of `instance`, replacing the previous one
+
+        A value that is not a string (as when it is deleted) drops the instance.
+        """
+        id_ = instance.id
+        number = self.numbers.get(id_)
+        entry = self.documents.get(number)
+        if entry is not None and entry[0]() is not instance:
+            entry = None
+        if entry is not None and entry[1] == text:
+            return
+        if number in self.documents:
+            self._drop(number)
+        if not isinstance(text, str):
+            return
+        number = self.numbers[id_] = self._next
+        self._next += 1
+        ref = weakref.ref(instance, lambda ref, number=number: self._collected(number, ref))
+        self.documents[number] = (ref, text, id_)
+        for term, count in self._counts(text).items():
+            if term not in self.postings:
+                self.postings[term] = (array("q"), array("l"))
+                insort(self.terms, term)
+            # New numbers are always the highest: appending keeps lists sorted
+            numbers, counts = self.postings[term]
+            numbers.append(number)
+            counts.append(count)
+
+    def add(self, instance):
+        """Index the value of a newly registered instance, if it has one"""
+        if isinstance(instance, self.field.owner):
+            text = instance._data.get(self.field.name)
+            if text is not None:
+                self.update(instance, text)
+
+    def _drop(self, number):
+        ref, text, id_ = self.documents.pop(number)
+        if self.numbers.get(id_) == number:
+            del self.numbers[id_]
+        for term in self._counts(text):
+            numbers, counts = self.postings[term]
+            position = bisect_left(numbers, number)
+            del numbers[position]
+            del counts[position]
+            if not numbers:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+
+    def _collected(self, number, ref):
+        entry = self.documents.get(number)
+        if entry is not None and entry[0] is ref:
+            self._drop(number)
+
+    def expand(self, prefix):
+        """Indexed terms starting with `prefix`, in order"""
+        terms = self.terms
+        position = bisect_left(terms, prefix)
+        while position < len(terms) and terms[position].startswith(prefix):
+            yield terms[position]
+            position += 1
+
+    def _parse(self, query):
+        # [(term, is_prefix)], for the terms of each query word
+        parsed = []
+        for word in query.split():
+            prefix = word.endswith("*")
+            terms = self.tokenize(word.rstrip("*"))
+            if not terms:
+                continue
+            for term in terms[:-1]:
+                parsed.append((term, False))
+            parsed.append((terms[-1], prefix))
+        return parsed
+
+    def scores(self, query):
+        """{document number: score} for documents matching every word of `query`
+
+        Words ending in "*" match any term starting with them. Scores
+        add up, for each matched term, its count times its inverse
+        document frequency.
+        """
+        total = len(self.documents)
+        result = None
+        for term, prefix in self._parse(query):
+            word_scores = {}
+            for matched in (self.expand(term) if prefix else [term]):
+                posting = self.postings.get(matched)
+                if posting is None:
+                    continue
+                numbers, counts = posting
+                weight = math.log(1 + total / len(numbers))
+                for number, count in zip(numbers, counts):
+                    word_scores[number] = word_scores.get(number, 0) + count * weight
+            if result is None:
+                result = word_scores
+            else:
+                result = {
+                    number: score + word_scores[number]
+                    for number, score in result.items() if number in word_scores
+                }
+            if not result:
+                return {}
+        return result or {}
+
+    def search(self, query, limit=None, offset=0, cls=None):
+        """Instances matching `query`, best ranked first, as a list of `(instance, score)`"""
+        scores = self.scores(query)
+        ranked = ((-score, number) for number, score in scores.items())
+        if cls is self.field.owner:
+            cls = None
+        if limit is not None and cls is None:
+            ranked = heapq.nsmallest(offset + limit, ranked)
+        else:
+            ranked = sorted(ranked)
+        result = []
+        skipped = 0
+        for negative_score, number in ranked:
+            instance = self.documents[number][0]()
+            if instance is None or (cls is not None and not isinstance(instance, cls)):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            result.append((instance, -negative_score))
+            if len(result) == limit:
+                break
+        return result
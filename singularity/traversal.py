@@ -0,0 +1,155 @@
+"""Multi-hop traversal of the relationships between instances.
+
+Relationships are TypeFields and ListFields of model classes, and
+EdgeFields. A path pattern is a dotted sequence of field names, as
+"father.pets": "*" stands for any relationship field, and a trailing "+"
+follows a field one or more times ("children+" reaches every
+descendant). The default pattern, "*+", reaches everything connected
+to the start.
+
+The walk is breadth-first and iterative, so deep hierarchies do not
+hit the recursion limit. Each instance is visited once per position in
+the pattern - the visited sets hold IDs only - and results are streamed
+as they are found.
+"""
+from collections import deque, namedtuple
+
+from .fields import EdgeField, ListField
+from .refs import _model
+from .registry import model_registry
+
+
+DIRECTIONS = ("out", "in", "both")
+
+Step = namedtuple("Step", "name repeat")
+
+
+def parse(pattern):
+    """The steps of a path pattern, "+" steps turned into a step and a repeated step"""
+    if pattern is None:
+        pattern = "*+"
+    names = pattern.split(".") if isinstance(pattern, str) else list(pattern)
+    steps = []
+    for name in names:
+        repeat = name.endswith("+")
+        name = name.rstrip("+")
+        if not name:
+            raise ValueError(f"Invalid path pattern {pattern!r}")
+        steps.append(Step(name, False))
+        if repeat:
+            steps.append(Step(name, True))
+    return steps
+
+
+def _is_relationship(field):
+    if isinstance(field, EdgeField):
+        return True
+    return _model(field) is not None
+
+
+class Traversal:
+    def __init__(self, context, direction="out"):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}, not {direction!r}")
+        self.context = context
+        self.direction = direction
+        self._outgoing_fields = {}
+        self._incoming_fields = {}
+        # {field: {id: [instances referring to it]}}, for TypeFields and ListFields
+        self._reverse = {}
+
+    def outgoing_fields(self, cls, name):
+        key = (cls, name)
+        if key not in self._outgoing_fields:
+            fields = cls.m.fields
+            self._outgoing_fields[key] = [
+                field for field_name, field in fields.items()
+                if (name == "*" or field_name == name) and _is_relationship(field)
+            ]
+        return self._outgoing_fields[key]
+
+    def incoming_fields(self, cls, name):
+        key = (cls, name)
+        if key not in self._incoming_fields:
+            fields = {}
+            for model in list(model_registry.values()):
+                for field_name, field in model.m.fields.items():
+                    if (
+                        (name == "*" or field_name == name) and _is_relationship(field)
+                        and issubclass(cls, _model(field) or field.type)
+                    ):
+                        fields[field] = None
+            self._incoming_fields[key] = list(fields)
+        return self._incoming_fields[key]
+
+    def _value(self, instance, field):
+        try:
+            return field.__get__(instance, type(instance))
+        except AttributeError:
+            return None
+
+    def targets(self, instance, field):
+        if isinstance(field, EdgeField):
+            edges = self.context.edges
+            return [edges.resolve(id_) for id_ in edges.targets(field, instance)]
+        value = self._value(instance, field)
+        if value is None:
+            return ()
+        items = value if isinstance(field, ListField) else (value,)
+        return [item for item in items if hasattr(type(item), "m")]
+
+    def sources(self, instance, field):
+        if isinstance(field, EdgeField):
+            return self.context.edges.referrers(field, instance)
+        reverse = self._reverse.get(field)
+        if reverse is None:
+            # Built on first use, with one pass over the field's class
+            reverse = self._reverse[field] = {}
+            for source in self.context.instances(field.owner):
+                for target in self.targets(source, field):
+                    reverse.setdefault(target.id, []).append(source)
+        return reverse.get(instance.id, ())
+
+    def neighbours(self, instance, name):
+        cls = type(instance)
+        if self.direction != "in":
+            for field in self.outgoing_fields(cls, name):
+                yield from self.targets(instance, field)
+        if self.direction != "out":
+            for field in self.incoming_fields(cls, name):
+                yield from self.sources(instance, field)
+
+    def run(self, start, steps, max_depth=None, limit=None, until=None):
+        end = len(steps)
+        visited = [set() for _ in range(end + 1)]
+        visited[0].add(start.id)
+        queue = deque([(start, 0, 0)])
+        found = 0
+        while queue:
+            instance, position, depth = queue.popleft()
+            if position == end:
+                yield instance
+                found += 1
+                if (limit is not None and found >= limit) or (until is not None and until(instance)):
+                    return
+                continue
+            step = steps[position]
+            if step.repeat:
+                # Done repeating: the same instance, at the next position
+                if instance.id not in visited[position + 1]:
+                    visited[position + 1].add(instance.id)
+                    queue.appendleft((instance, position + 1, depth))
+            if max_depth is not None and depth >= max_depth:
+                continue
+            next_position = position if step.repeat else position + 1
+            seen = visited[next_position]
+            for neighbour in self.neighbours(instance, step.name):
+                if neighbour is not None and neighbour.id not in seen:
+                    seen.add(neighbour.id)
+                    queue.append((neighbour, next_position, depth + 1))
+
+
+def traverse(context, start, path_pattern=None, max_depth=None, direction="out", limit=None, until=None):
+    return Traversal(context, direction).run(
+        start, parse(path_pattern), max_depth=max_depth, limit=limit, until=until
+    )
@@ -30,3 +30,8 @@ class StrictPerson(S.Base, strict=True):
 class Child(StrictPerson, strict=True):
     father = S.TypeField(StrictPerson)
     mother = S.TypeField(StrictPerson)
+
+
+class Series(S.Base):
+    name = S.StringField()
+    samples = S.ListField(float)
@@ -0,0 +1,120 @@
+import gc
+
+import pytest
+
+import singularity as S
+
+pytest.importorskip("numpy")
+
+
+class Order(S.Base):
+    status = S.StringField(options="open paid cancelled".split())
+    amount = S.NumberField()
+
+
+@pytest.fixture
+def orders():
+    # Instances are only tracked by the context while alive
+    return [
+        Order("open", 10), Order("open", 2), Order("paid", 5), Order("paid", 7.5), Order("cancelled")
+    ]
+
+
+@pytest.fixture
+def totals(orders):
+    aggregation = S.context.aggregate(
+        Order, group_by="status", sum="amount", min="amount", max="amount", mean="amount"
+    )
+    yield aggregation
+    aggregation.close()
+
+
+def test_aggregate_groups_and_measures(totals):
+    result = totals.result()
+    assert result["open"] == {
+        "count": 2, "sum_amount": 12, "min_amount": 2, "max_amount": 10, "mean_amount": 6
+    }
+    assert result["paid"]["sum_amount"] == 12.5
+    assert result["cancelled"] == {
+        "count": 1, "sum_amount": 0, "min_amount": None, "max_amount": None, "mean_amount": None
+    }
+
+
+def test_aggregate_without_group(orders):
+    totals = S.context.aggregate(Order, sum="amount")
+    try:
+        assert totals[None] == {"count": 5, "sum_amount": 24.5}
+    finally:
+        totals.close()
+
+
+def test_aggregate_is_updated_on_field_changes(orders, totals):
+    orders[0].d.amount = 1
+    assert totals["open"]["sum_amount"] == 3
+    assert totals["open"]["max_amount"] == 2
+    orders[2].d.status = "open"
+    assert totals["open"]["count"] == 3
+    assert totals["open"]["sum_amount"] == 8
+    assert totals["paid"]["count"] == 1
+    del orders[3].d.amount
+    assert totals["paid"]["sum_amount"] == 0
+    assert totals["paid"]["max_amount"] is None
+
+
+def test_aggregate_is_updated_on_new_and_collected_instances(orders, totals):
+    new_order = Order("paid", 100)
+    assert totals["paid"]["count"] == 3
+    assert totals["paid"]["max_amount"] == 100
+    del new_order
+    gc.collect()
+    assert totals["paid"]["count"] == 2
+    assert totals["paid"]["max_amount"] == 7.5
+
+
+def test_aggregate_histogram(orders):
+    histogram = S.context.aggregate(Order, group_by="status", hist="amount", bins=[0, 5, 10])
+    try:
+        assert histogram["open"]["hist_amount"] == [1, 1]
+        orders[2].d.amount = 1
+        assert histogram["paid"]["hist_amount"] == [1, 1]
+    finally:
+        histogram.close()
+
+
+class Entry(S.Base):
+    amount = S.NumberField()
+
+
+def test_aggregate_counts_each_id_once():
+    entry = Entry(5)
+    totals = S.context.aggregate(Entry, sum="amount")
+    try:
+        copy = Entry.m.from_json(entry.m.json())
+        assert copy.id == entry.id
+        assert totals.result()[None] == {"count": 1, "sum_amount": 5}
+        copy.d.amount = 6
+        assert totals.result()[None]["sum_amount"] == 6
+        del copy
+        gc.collect()
+        # The original is counted again
+        entry.d.amount = 100
+        assert totals.result()[None] == {"count": 1, "sum_amount": 100}
+    finally:
+        totals.close()
+
+
+def test_aggregate_keeps_ints_exact():
+    entries = [Entry(10), Entry(2 ** 70)]
+    totals = S.context.aggregate(Entry, sum="amount", max="amount")
+    try:
+        result = totals.result()[None]
+        assert result["sum_amount"] == 10 + 2 ** 70 and type(result["sum_amount"]) is int
+        assert result["max_amount"] == 2 ** 70
+        entries[0].d.amount = 11
+        assert totals.result()[None]["sum_amount"] == 11 + 2 ** 70
+        del entries[1]
+        gc.collect()
+        assert totals.result()[None] == {"count": 1, "sum_amount": 11, "max_amount": 11}
+        assert type(totals.result()[None]["sum_amount"]) is int
+    finally:
+        totals.close()
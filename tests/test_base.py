@@ -7,7 +7,7 @@ import pytest
 
 import singularity as S
 
-from fixtures import Pet, StrictPet, Person, StrictPerson, Child
+from fixtures import Pet, StrictPet, Person, StrictPerson, Child, Series
 
 
 def test_declare_dataclass():
@@ -261,6 +261,71 @@ def test_deepcopy_works_for_strict_instance(strict_dog, strict_person):
         assert strict_person.d.pets[0] is not new_person.d.pets[0]
 
 
+def test_shallow_copy_does_not_alias_sequences(strict_person, cat):
+    new_person = strict_person.m.copy()
+    new_person.d.pets.append(cat)
+    assert len(strict_person.d.pets) == 1
+    assert new_person.d.pets[0] is strict_person.d.pets[0]
+
+
+def test_deepcopy_shares_children_until_used(strict_person, cat):
+    new_person = strict_person.m.deepcopy()
+    assert new_person._data["pets"] is strict_person._data["pets"]
+
+    # Used from the source: the copy gets its own children first
+    strict_person.d.pets.append(cat)
+    strict_person.d.pets[0].d.name = "Bidu"
+    assert len(new_person.d.pets) == 1
+    assert new_person.d.pets[0].d.name == "Rex"
+    assert new_person.d.pets[0].id != strict_person.d.pets[0].id
+
+
+def test_deepcopy_is_a_snapshot(strict_person, cat):
+    pets = strict_person.d.pets
+    rex = pets[0]
+    new_person = strict_person.m.deepcopy()
+    # Written through references taken before the copy
+    pets.append(cat)
+    rex.d.name = "Bidu"
+    assert len(new_person.d.pets) == 1
+    assert new_person.d.pets[0].d.name == "Rex"
+
+
+def test_deepcopy_is_a_snapshot_of_nested_instances():
+    class Node(S.Base):
+        label = S.StringField()
+        child = S.TypeField(S.Base)
+
+    first, second = Node("first"), Node("second")
+    first.d.child = second
+    new_first = first.m.deepcopy()
+    second.d.label = "changed"
+    assert new_first.d.child.d.label == "second"
+    assert new_first.d.child is not second
+
+
+def test_deepcopy_is_not_copied_on_source_reads(strict_person):
+    new_person = strict_person.m.deepcopy()
+    assert strict_person.d.pets[0].d.name == "Rex"
+    assert new_person._data["pets"] is strict_person._data["pets"]
+    new_person.d.pets[0].d.name = "Bidu"
+    assert strict_person.d.pets[0].d.name == "Rex"
+
+
+def test_deepcopy_handles_cycles():
+    class Node(S.Base):
+        label = S.StringField()
+        link = S.TypeField(S.Base)
+
+    first, second = Node("first"), Node("second")
+    first.d.link, second.d.link = second, first
+
+    new_first = first.m.deepcopy()
+    new_second = new_first.d.link
+    assert new_second is not second and new_second.d.label == "second"
+    assert new_second.d.link is new_first
+
+
 def test_instances_can_be_pickled(strict_dog, strict_person):
     import pickle
     pickle.dumps(strict_dog)
@@ -348,6 +413,32 @@ def test_creating_user_weakrefs_for_instances_dont_break_namespace_caching():
     del t
 
 
+def test_namespaces_do_not_delay_collection():
+    import weakref
+    class Test(S.Base):
+        name = S.StringField()
+    assert Test("bla").d.name == "bla"
+    t = Test("ble")
+    wt = weakref.ref(t)
+    assert t.d.name == "ble" and t.m.json()["name"] == "ble"
+    del t
+    assert wt() is None
+
+
+def test_bound_data_namespace_ignores_unknown_attributes():
+    class Test(S.Base):
+        name = S.StringField()
+    t = Test(other=1)
+    t.d.other = 1
+    assert not hasattr(t.d, "other")
+    assert not hasattr(Test.d, "other")
+    t = Test.m.from_json({"name": "x", "extra": 1})
+    assert t.d.name == "x"
+    assert Test.m.from_json({"name": "x", "extra": 1}, refs=True).d.name == "x"
+    with pytest.raises(KeyError):
+        Test.m.from_json({"name": "x", "extra": 1}, strict=True)
+
+
 def test_instances_have_intrinsc_id_field():
     class Test(S.Base):
         pass
@@ -384,3 +475,137 @@ def test_bound_metadata_instance_is_same_instance(person_cls):
 
     assert p1.m.parent is Person.m.parent
 
+
+
+# Record layout
+
+class RecordPet(S.Base, layout="record"):
+    name = S.StringField()
+    species = S.StringField(options="cat dog other".split())
+    birthday = S.DateField()
+    age = S.ComputedField(lambda self: (date.today() - self.d.birthday).days // 365)
+
+
+def test_record_layout_instances_have_no_dict():
+    p = RecordPet("Rex", "dog", date(2015, 1, 1))
+    assert not hasattr(p, "__dict__")
+    assert p.d.name == "Rex"
+    assert p.name == "Rex"
+    assert RecordPet.m.slots == ("name", "species", "birthday")
+
+
+def test_record_layout_unset_fields():
+    p = RecordPet("Rex")
+    assert p.m.record() == ("Rex", S.fields.UNSET, S.fields.UNSET)
+    assert list(p) == ["id", "name", "age"]
+    with pytest.raises(AttributeError):
+        p.d.species
+    del p.d.name
+    assert not hasattr(p.d, "name")
+    assert len(p) == len(RecordPet.m.computed_fields)
+
+
+def test_record_layout_is_inherited():
+    class Dog(RecordPet):
+        owner = S.StringField(default="")
+
+    d = Dog("Rex", owner="João")
+    assert Dog.m.layout == "record"
+    assert Dog.m.slots == ("name", "species", "birthday", "owner")
+    assert d.m.record() == ("Rex", S.fields.UNSET, S.fields.UNSET, "João")
+
+
+def test_record_layout_fields_use_slots_directly():
+    class Tagged(S.Base, layout="record"):
+        name = S.StringField(default="none")
+        tags = S.ListField(str)
+
+    changes = []
+    watcher = lambda instance, field, old, new: changes.append((old, new))
+    Tagged.name.watch(watcher)
+    try:
+        t = Tagged()
+        assert t.name == "none"
+        t.name = "Rex"
+        t.tags.append("a")
+        assert t._r_name == "Rex"
+        assert list(t._r_tags) == ["a"]
+        del t.name
+        assert changes[-1] == ("Rex", S.fields._SENTINEL)
+        assert t.m.record() == (S.fields.UNSET, t.tags)
+    finally:
+        Tagged.name.unwatch(watcher)
+
+
+
+def test_record_layout_fields_shared_with_dict_layout_classes():
+    class Plain(S.Base):
+        name = S.StringField()
+        tags = S.ListField(str)
+
+    class Record(Plain, layout="record"):
+        pass
+
+    for cls in (Plain, Record):
+        instance = cls("Rex")
+        instance.tags.append("a")
+        assert (instance.name, list(instance.tags)) == ("Rex", ["a"])
+        del instance.name
+        assert not hasattr(instance.d, "name")
+    assert type(Record.name) is S.StringField
+    assert type(RecordPet.name).__name__ == "StringField"
+
+def test_record_layout_uses_less_memory_than_dict_layout():
+    record_dog = RecordPet("Rex", "dog", date(2015, 1, 1))
+    strict_dog = StrictPet("Rex", "dog", date(2015, 1, 1))
+    assert record_dog.m.sizeof() < strict_dog.m.sizeof()
+
+
+def test_record_layout_copy():
+    from copy import copy
+    p = RecordPet("Rex", "dog", date(2015, 1, 1))
+    assert copy(p) == p
+
+
+def test_unpickled_instances_keep_id_and_are_registered(strict_person):
+    import pickle
+    new_person = pickle.loads(pickle.dumps(strict_person))
+    assert new_person.id == strict_person.id
+    assert S.context.get(new_person.id) is new_person
+    assert new_person.d.pets[0].id == strict_person.d.pets[0].id
+
+
+class Link(S.Base):
+    name = S.StringField()
+    link = S.TypeField(S.Base)
+
+
+class RecordLink(S.Base, layout="record"):
+    name = S.StringField()
+    link = S.TypeField(S.Base)
+
+
+@pytest.mark.parametrize("cls", [Link, RecordLink])
+def test_pickling_cyclic_instances(cls):
+    import pickle
+
+    a, b = cls("a"), cls("b")
+    a.d.link, b.d.link = b, a
+    new_a = pickle.loads(pickle.dumps(a))
+    assert new_a.d.link.d.link is new_a
+    assert new_a.d.link.d.name == "b"
+    assert S.context.get(new_a.d.link.id) is new_a.d.link
+
+
+def test_pickle_protocol_5_sends_number_lists_out_of_band():
+    import pickle
+
+    s = Series(samples=[float(i) for i in range(1000)])
+    buffers = []
+    data = pickle.dumps(s, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1
+    assert len(data) < 1000
+    new_s = pickle.loads(data, buffers=buffers)
+    assert new_s == s
+    assert new_s.id == s.id
+    assert pickle.loads(pickle.dumps(s, protocol=2)) == s
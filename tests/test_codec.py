@@ -0,0 +1,146 @@
+from datetime import date, datetime, timezone, timedelta
+from decimal import Decimal
+from fractions import Fraction
+import uuid
+
+import pytest
+
+import singularity as S
+from singularity import codec
+
+from fixtures import StrictPerson, Child
+
+
+class Measure(S.Base):
+    label = S.StringField()
+    value = S.NumberField()
+    taken = S.DateTimeField()
+    day = S.DateField()
+    ref = S.UUIDField()
+    samples = S.ListField(float)
+    tags = S.ListField(str)
+    extra = S.Field()
+
+
+def test_binary_round_trip_of_field_types():
+    m = Measure(
+        "ação", 2.5, datetime(2020, 5, 1, 12, 30, 1, 15), date(2020, 5, 1), uuid.uuid4(),
+        samples=[1.0, 2.0], tags=["a", "b"], extra={"x": [1, 2]}
+    )
+    data = m.m.to_bytes()
+    assert isinstance(data, bytes)
+    new_m = Measure.m.from_bytes(data)
+    assert new_m is not m
+    assert new_m.id == m.id
+    assert new_m == m
+    assert isinstance(new_m.d.samples, S.fields.ArraySequence)
+    assert isinstance(new_m.d.ref, uuid.UUID)
+
+
+def test_binary_round_trip_of_numbers_and_aware_datetimes():
+    moment = datetime(2020, 5, 1, 12, tzinfo=timezone(timedelta(hours=-3)))
+    for value in (1, -(2 ** 63), 2 ** 70, -(2 ** 70), 1.5, True, Decimal("-1.10")):
+        m = Measure(value=value, taken=moment)
+        new_m = codec.loads(codec.dumps(m))
+        assert new_m.d.value == value
+        assert type(new_m.d.value) is type(value)
+        assert new_m.d.taken == moment
+
+
+def test_int_lists_beyond_64_bits_are_rejected():
+    class Counts(S.Base):
+        counts = S.ListField(int)
+
+    counts = Counts(counts=[2 ** 64])
+    with pytest.raises(codec.CodecError):
+        counts.m.to_bytes()
+
+
+def test_binary_encoding_skips_unset_fields():
+    m = Measure(label="x")
+    new_m = Measure.m.from_bytes(memoryview(m.m.to_bytes()))
+    assert set(new_m) == {"id", "label"}
+    assert not hasattr(new_m.d, "value")
+
+
+def test_binary_round_trip_of_nested_instances(child):
+    new_child = Child.m.from_bytes(child.m.to_bytes())
+    assert new_child == child
+    assert new_child.d.father.id == child.d.father.id
+    assert new_child.d.father.d.pets[0].id == child.d.father.d.pets[0].id
+
+
+def test_binary_encoding_is_smaller_than_json(child):
+    assert len(child.m.to_bytes()) < len(child.m.json(serialize=True).encode())
+
+
+def test_truncated_records_are_rejected(child):
+    m = Measure(
+        "a long name", 2.5, datetime(2020, 5, 1), date(2020, 5, 1), uuid.uuid4(),
+        samples=[1.0, 2.0], tags=["a"], extra={"x": 1}
+    )
+    for data in (m.m.to_bytes(), child.m.to_bytes()):
+        for cut in range(len(data)):
+            with pytest.raises(codec.CodecError):
+                codec.decode(data[:cut], register=False)
+
+
+def test_binary_decoding_checks_class(child):
+    with pytest.raises(codec.CodecError):
+        Measure.m.from_bytes(child.m.to_bytes())
+
+
+def test_many_records_in_one_buffer(child, strict_person):
+    data = codec.dump_many([child, strict_person])
+    assert list(codec.load_many(data)) == [child, strict_person]
+    with pytest.raises(codec.CodecError):
+        list(codec.load_many(data, Measure))
+
+
+class Ring(S.Base):
+    label = S.StringField()
+    next = S.TypeField(S.Base)
+    others = S.ListField(S.Base)
+
+
+def test_binary_round_trip_of_cycles():
+    first, second = Ring("first"), Ring("second")
+    first.d.next, second.d.next = second, first
+    first.d.others.append(second)
+    new_first = codec.loads(codec.dumps(first))
+    new_second = new_first.d.next
+    assert new_second.d.label == "second"
+    assert new_second.d.next is new_first
+    assert new_first.d.others[0] is new_second
+
+
+def test_back_references_outside_the_record_are_rejected():
+    first, second = Ring("first"), Ring("second")
+    first.d.next, second.d.next = second, first
+    data = codec.dumps(first)
+    # The nested record of "second", alone, points back to "first"
+    start = data.index(second.id.bytes) - 4
+    with pytest.raises(codec.CodecError):
+        codec.decode(data, start)
+
+
+class Payload:
+    def __reduce__(self):
+        return (print, ("unpickled",))
+
+
+def test_values_are_not_pickled_by_default():
+    with pytest.raises(codec.CodecError):
+        codec.dumps(Measure(value=Fraction(1, 3)))
+    with pytest.raises(codec.CodecError):
+        codec.dumps(Measure(extra={1: "a"}))
+    data = codec.dumps(Measure(extra=Payload()), allow_pickle=True)
+    with pytest.raises(codec.CodecError):
+        codec.loads(data)
+
+
+def test_pickled_values_with_allow_pickle():
+    m = Measure(value=Fraction(1, 3), extra={1: ("a",)})
+    new_m = codec.loads(codec.dumps(m, allow_pickle=True), allow_pickle=True)
+    assert new_m.d.value == Fraction(1, 3)
+    assert new_m.d.extra == {1: ("a",)}
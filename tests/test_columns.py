@@ -0,0 +1,98 @@
+from datetime import date, datetime
+
+import pytest
+
+import singularity as S
+
+np = pytest.importorskip("numpy")
+
+
+class Sale(S.Base):
+    status = S.StringField(options="open paid cancelled".split())
+    customer = S.StringField()
+    amount = S.NumberField()
+    day = S.DateField()
+    moment = S.DateTimeField()
+
+
+@pytest.fixture
+def sales():
+    return [
+        Sale("open", "João", 10, date(2020, 1, 1), datetime(2020, 1, 1, 10)),
+        Sale("paid", "Beatriz", 2.5, date(2020, 1, 2)),
+        Sale("paid", amount=7),
+    ]
+
+
+def test_to_columns_builds_typed_arrays(sales):
+    collection = Sale.m.to_columns(sales)
+    assert len(collection) == 3
+    columns = collection.columns
+    assert columns["amount"].values.dtype == np.float64
+    assert list(columns["amount"].values) == [10, 2.5, 7]
+    assert columns["day"].values.dtype == np.dtype("datetime64[D]")
+    assert columns["moment"].values.dtype == np.dtype("datetime64[us]")
+    assert list(columns["customer"].mask) == [True, True, False]
+    assert list(columns["moment"].mask) == [True, False, False]
+
+
+def test_option_fields_are_categorical(sales):
+    column = Sale.m.Collection(sales).columns["status"]
+    assert column.categories == ("open", "paid", "cancelled")
+    assert list(column.values) == [0, 1, 1]
+
+
+def test_rows_are_instance_proxies(sales):
+    collection = Sale.m.to_columns(sales)
+    row = collection[0]
+    assert isinstance(row, Sale)
+    assert row.id == sales[0].id
+    assert row.d.status == "open"
+    assert row["day"] == date(2020, 1, 1)
+    assert row.d.moment == datetime(2020, 1, 1, 10)
+    assert row == sales[0]
+    with pytest.raises(AttributeError):
+        collection[2].d.customer
+
+
+def test_writing_to_rows_updates_columns(sales):
+    collection = Sale.m.to_columns(sales)
+    row = collection[2]
+    row.d.customer = "Marcelo"
+    row.d.status = "cancelled"
+    assert collection.columns["customer"].values[2] == "Marcelo"
+    assert collection.columns["customer"].mask[2]
+    assert collection.columns["status"].values[2] == 2
+    with pytest.raises(ValueError):
+        row.d.status = "lost"
+
+
+def test_vectorized_filter(sales):
+    collection = Sale.m.to_columns(sales)
+    amount = collection.columns["amount"]
+    expensive = collection.filter(amount.values > 5)
+    assert len(expensive) == 2
+    assert [row.id for row in expensive] == [sales[0].id, sales[2].id]
+    assert expensive.to_instances() == [sales[0], sales[2]]
+
+
+def test_to_instances_keeps_the_originals_registered(sales):
+    copies = Sale.m.to_columns(sales).to_instances()
+    assert copies == sales
+    assert all(copy.id != sale.id for copy, sale in zip(copies, sales))
+    assert S.context.get(sales[0].id) is sales[0]
+    sales[0].d.amount = 99
+    assert S.context.data[sales[0].id]["amount"] == 99
+
+
+def test_ints_beyond_64_bits_are_kept_exact(sales):
+    sales[1].d.amount = 2 ** 70
+    sales[0].d.amount = 1
+    collection = Sale.m.to_columns(sales)
+    column = collection.columns["amount"]
+    assert column.values.dtype == object
+    assert collection[1].d.amount == 2 ** 70
+    collection = Sale.m.to_columns(sales[:1])
+    collection[0].d.amount = 2 ** 64
+    assert collection.columns["amount"].values.dtype == object
+    assert collection[0].d.amount == 2 ** 64
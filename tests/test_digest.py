@@ -0,0 +1,92 @@
+from datetime import date
+
+import singularity as S
+from singularity import digest
+from singularity.fields import UNSET
+
+from fixtures import StrictPerson, StrictPet
+
+
+def test_equal_instances_have_equal_digests(strict_person):
+    other = StrictPerson("João")
+    other.d.pets.append(StrictPet("Rex", "dog", date(2015, 1, 1)))
+    assert strict_person.m.digest() == other.m.digest()
+    assert len(strict_person.m.digest()) == 16
+
+
+def test_digest_follows_field_and_nested_changes(strict_person, cat):
+    before = strict_person.m.digest()
+    strict_person.d.pets[0].d.name = "Bidu"
+    changed = strict_person.m.digest()
+    assert changed != before
+    strict_person.d.pets[0].d.name = "Rex"
+    assert strict_person.m.digest() == before
+    strict_person.d.pets.append(cat)
+    assert strict_person.m.digest() not in (before, changed)
+
+
+def test_digest_treats_equal_numbers_alike():
+    class Measure(S.Base):
+        value = S.NumberField()
+
+    assert Measure(value=1).m.digest() == Measure(value=1.0).m.digest()
+    assert Measure(value=1).m.digest() != Measure(value=1.5).m.digest()
+
+
+def test_digest_of_unordered_and_repr_keyed_values():
+    class Holder(S.Base):
+        value = S.Field()
+
+    class Token:
+        def __eq__(self, other):
+            return isinstance(other, Token)
+
+    first, second = Holder(value={"a": 1, "b": {2, 3}}), Holder(value={"b": {3, 2}, "a": 1.0})
+    assert first.m.digest() == second.m.digest()
+    assert first == second
+    first, second = Holder(value=Token()), Holder(value=Token())
+    first.m.digest(), second.m.digest()
+    assert not digest.differ(first, second)
+    assert first == second
+
+
+def test_eq_uses_cached_digests(strict_person, cat):
+    other = StrictPerson("Ana")
+    strict_person.m.digest(), other.m.digest()
+    assert digest.differ(strict_person, other)
+    assert strict_person != other
+    other.d.name = "João"
+    other.d.pets.append(StrictPet("Rex", "dog", date(2015, 1, 1)))
+    assert not digest.differ(strict_person, other)
+    assert strict_person == other
+
+
+def test_diff_reports_changed_paths(strict_person, cat):
+    other = strict_person.m.deepcopy()
+    other.d.pets[0].d.species = "other"
+    other.d.name = "Bruno"
+    assert strict_person.m.diff(other) == {
+        "name": ("João", "Bruno"),
+        "pets.0.species": ("dog", "other"),
+    }
+    del other.d.name
+    assert strict_person.m.diff(other)["name"] == ("João", UNSET)
+    assert strict_person.m.diff(strict_person.m.deepcopy()) == {}
+
+
+class Node(S.Base):
+    label = S.StringField()
+    x = S.NumberField()
+    link = S.TypeField(S.Base)
+
+
+def test_digests_under_cycles_depend_on_where_they_are_taken():
+    a, b = Node("a"), Node("b")
+    a.d.link, b.d.link = b, a
+    a.m.digest()
+    c = Node("a", x=1, link=b)
+    c2, b2 = Node("a", x=1), Node("b")
+    c2.d.link, b2.d.link = b2, c2
+    assert c.m.digest() != c2.m.digest()
+    assert c.m.diff(c2) == {"link.link.x": (UNSET, 1)}
+    assert c != c2
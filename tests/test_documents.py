@@ -0,0 +1,113 @@
+from datetime import date
+import json
+import pickle
+
+import pytest
+
+import singularity as S
+
+
+class Address(S.Base, layout="document"):
+    city = S.StringField()
+
+
+class Customer(S.Base, layout="document"):
+    name = S.StringField()
+    since = S.DateField()
+    address = S.TypeField(Address)
+    previous = S.ListField(Address)
+    scores = S.ListField(int)
+
+
+@pytest.fixture
+def customer():
+    return Customer(
+        "Ana", date(2020, 5, 1), address=Address("Lisboa"),
+        previous=[Address("Porto")], scores=[1, 2]
+    )
+
+
+def test_document_is_plain_json_data(customer):
+    document = customer.m.document()
+    assert json.loads(json.dumps(document)) == document
+    assert document == {
+        "id": str(customer.id),
+        "name": "Ana",
+        "since": "2020-05-01",
+        "address": {"id": str(customer.d.address.id), "city": "Lisboa"},
+        "previous": [{"id": str(customer.d.previous[0].id), "city": "Porto"}],
+        "scores": [1, 2],
+    }
+    assert S.context.documents[customer.id] is document
+    # Embedded children are not root documents
+    assert customer.d.address.id not in S.context.documents
+
+
+def test_instances_are_views_over_the_document(customer):
+    address = customer.d.address
+    assert customer.d.since == date(2020, 5, 1)
+    assert customer.d.address is address
+    address.d.city = "Braga"
+    assert customer.m.document()["address"]["city"] == "Braga"
+
+    customer.d.previous.append(Address("Faro"))
+    customer.d.scores.append(3)
+    document = customer.m.document()
+    assert [item["city"] for item in document["previous"]] == ["Porto", "Faro"]
+    assert document["scores"] == [1, 2, 3]
+    assert customer.d.previous[1].d.city == "Faro"
+
+
+def test_assigned_instances_become_views(customer):
+    address = Address("Coimbra")
+    customer.d.address = address
+    address.d.city = "Aveiro"
+    assert customer.m.document()["address"]["city"] == "Aveiro"
+    assert customer.d.address is address
+
+
+def test_documents_outlive_their_instances():
+    customer = Customer("Rui", scores=[5])
+    id_ = customer.id
+    del customer
+    again = S.context.get(id_)
+    assert again.d.name == "Rui"
+    assert list(again.d.scores) == [5]
+
+
+def test_document_layout_json_matches_plain_layout(customer):
+    data = customer.m.json()
+    assert data["address"]["city"] == "Lisboa"
+    assert Customer.m.from_json(data) == customer
+
+
+def test_copies_are_documents_of_their_own(customer):
+    for copy in (
+        lambda: customer.m.deepcopy(),
+        lambda: pickle.loads(pickle.dumps(customer)),
+        lambda: S.codec.loads(S.codec.dumps(customer)),
+    ):
+        new_customer = copy()
+        document = new_customer.m.document()
+        assert document is not customer.m.document()
+        assert S.context.documents[new_customer.id] is document
+        assert new_customer == customer
+        new_customer.d.scores.append(3)
+        new_customer.d.address.d.city = "Braga"
+        assert list(customer.d.scores) == [1, 2]
+        assert customer.d.address.d.city == "Lisboa"
+
+
+def test_deepcopy_gives_new_ids_to_embedded_instances(customer):
+    new_customer = customer.m.deepcopy()
+    assert new_customer.id != customer.id
+    assert new_customer.d.address.id != customer.d.address.id
+    assert new_customer.m.document()["previous"][0]["id"] == str(new_customer.d.previous[0].id)
+
+
+def test_shallow_copy_does_not_share_lists(customer):
+    new_customer = customer.m.copy()
+    new_customer.d.scores.append(3)
+    new_customer.d.previous.append(Address("Faro"))
+    assert customer.m.document()["scores"] == [1, 2]
+    assert len(customer.d.previous) == 1
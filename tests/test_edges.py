@@ -0,0 +1,135 @@
+import pytest
+
+import singularity as S
+
+
+class Author(S.Base):
+    name = S.StringField()
+    books = S.EdgeField("Book", reciprocal_field="authors")
+
+
+class Book(S.Base):
+    title = S.StringField()
+    authors = S.EdgeField(Author, reciprocal_field="books")
+    cites = S.EdgeField("Book", reciprocal_field=False)
+
+
+class User(S.Base):
+    name = S.StringField()
+    follows = S.EdgeField("User")
+
+
+def test_edgefield_links_both_classes():
+    author = Author("Ana")
+    book = Book("Notes")
+    author.books.append(book)
+    assert book in author.books
+    assert author in book.authors
+    book.authors.remove(author)
+    assert len(author.books) == 0
+    assert len(book.authors) == 0
+
+
+def test_edgefield_is_indexed_on_the_context():
+    author = Author("Ana")
+    book = Book("Notes")
+    author.books.append(book)
+    assert list(S.context.edges.targets(Author.books, author)) == [book.id]
+    assert list(S.context.edges.sources(Book.authors, author)) == [book.id]
+
+
+def test_edgefield_one_way_links_have_referrers():
+    first, second = Book("First"), Book("Second")
+    second.cites.append(first)
+    assert first in second.cites
+    assert len(first.cites) == 0
+    assert Book.cites.referrers(first) == [second]
+
+
+def test_edgefield_assignment_replaces_links():
+    ana, bia, caio = User("Ana"), User("Bia"), User("Caio")
+    ana.follows = [bia]
+    ana.follows = [caio]
+    assert list(ana.follows) == [caio]
+    assert ana not in bia.follows
+    assert ana in caio.follows
+    del ana.follows
+    assert len(caio.follows) == 0
+
+
+def test_edgefield_type_is_checked():
+    with pytest.raises(TypeError):
+        Author("Ana").books.append(Author("Bia"))
+
+
+def test_edgefield_link_many():
+    authors = [Author(str(i)) for i in range(3)]
+    book = Book("Collected")
+    Author.books.link_many((author, book) for author in authors)
+    assert list(book.authors) == authors
+    assert all(book in author.books for author in authors)
+
+
+def test_edge_index_remove_drops_all_links():
+    ana, bia, caio = User("Ana"), User("Bia"), User("Caio")
+    ana.follows.extend([bia, caio])
+    S.context.edges.remove(bia)
+    assert list(ana.follows) == [caio]
+    assert len(bia.follows) == 0
+
+
+def test_edge_index_bfs():
+    users = [User(str(i)) for i in range(4)]
+    for first, second in zip(users, users[1:]):
+        first.follows.append(second)
+    found = list(S.context.edges.bfs(users[0], User.follows))
+    assert [(user.name, depth) for user, depth in found] == [("0", 0), ("1", 1), ("2", 2), ("3", 3)]
+    found = list(S.context.edges.bfs(users[0], User.follows, max_depth=1))
+    assert [user for user, depth in found] == users[:2]
+
+
+def test_edgefield_json():
+    ana, bia = User("Ana"), User("Bia")
+    ana.follows.append(bia)
+    assert User.follows.json(ana.follows) == [str(bia.id)]
+    assert User.follows.from_json([str(bia.id)]) == [bia.id]
+
+
+def test_edgefield_from_json_links_instances_decoded_later():
+    ana_id, bia_id = S.ids.uuid4(), S.ids.uuid4()
+    ana = User.m.from_json({"id": str(ana_id), "name": "Ana", "follows": [str(bia_id)]})
+    assert len(ana.follows) == 1
+    assert list(S.context.edges.targets(User.follows, ana)) == [bia_id]
+    assert ana.m.json()["follows"] == [str(bia_id)]
+    bia = User.m.from_json({"id": str(bia_id), "name": "Bia", "follows": [str(ana_id)]})
+    assert list(ana.follows) == [bia]
+    assert list(bia.follows) == [ana]
+
+
+def test_edgefield_links_survive_strict_subclasses():
+    class Strict(S.Base, strict=True):
+        name = S.StringField()
+        friends = S.EdgeField("Strict")
+
+    ana, bia = Strict("Ana"), Strict("Bia")
+    ana.d.friends.append(bia)
+
+    class StrictChild(Strict, strict=True):
+        pass
+
+    assert list(ana.d.friends) == [bia]
+    child = StrictChild("Caio")
+    child.d.friends.append(ana)
+    assert list(ana.d.friends) == [bia, child]
+
+
+def test_edge_sequence_indexing():
+    users = [User(str(i)) for i in range(4)]
+    users[0].follows.extend(users[1:])
+    follows = users[0].follows
+    assert (follows[0], follows[2], follows[-1], follows[-3]) == (users[1], users[3], users[3], users[1])
+    assert follows[1:] == users[2:]
+    with pytest.raises(IndexError):
+        follows[3]
+    with pytest.raises(IndexError):
+        follows[-4]
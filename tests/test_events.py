@@ -0,0 +1,119 @@
+import asyncio
+import threading
+
+import pytest
+
+import singularity as S
+from singularity.events import ChangeBus
+from singularity.fields import UNSET
+
+
+class Account(S.Base):
+    owner = S.StringField()
+    balance = S.NumberField()
+    tags = S.ListField(str)
+
+
+@pytest.fixture
+def bus():
+    bus = ChangeBus()
+    yield bus
+    bus.close()
+
+
+def test_changes_are_delivered_immediately_outside_batches(bus):
+    account = Account(owner="Ana")
+    received = []
+    bus.observe(Account, received.extend)
+    account.d.balance = 10
+    del account.d.owner
+    assert [(change.field.name, change.old, change.new) for change in received] == [
+        ("balance", UNSET, 10), ("owner", "Ana", UNSET)
+    ]
+
+
+def test_batched_changes_are_coalesced(bus):
+    account, other = Account(balance=0), Account(balance=0)
+    calls = []
+    bus.observe(Account, calls.append)
+    with bus.batch():
+        for amount in range(1, 6):
+            account.d.balance = amount
+        with bus.batch():
+            other.d.owner = "Rui"
+        assert not calls
+    assert len(calls) == 1
+    changes = {(change.instance is account, change.field.name): change for change in calls[0]}
+    assert len(changes) == 2
+    assert (changes[True, "balance"].old, changes[True, "balance"].new) == (0, 5)
+    assert changes[False, "owner"].new == "Rui"
+
+
+def test_field_observers_and_list_mutations(bus):
+    received = []
+    bus.observe(Account.tags, received.extend)
+    account = Account()
+    account.d.tags.append("vip")
+    account.d.owner = "Ana"
+    assert len(received) == 1
+    change = received[0]
+    assert change.instance is account and change.old is change.new
+    assert list(change.new) == ["vip"]
+
+
+def test_changes_to_asyncio_queue(bus):
+    queue = bus.observe(Account.balance)
+    account = Account()
+    with bus.batch():
+        account.d.balance = 1
+        account.d.balance = 2
+    changes = asyncio.run(asyncio.wait_for(queue.get(), 1))
+    assert [(change.old, change.new) for change in changes] == [(UNSET, 2)]
+
+
+def test_batches_are_local_to_threads(bus):
+    account, other = Account(), Account()
+    calls = []
+    bus.observe(Account.balance, calls.append)
+    inside, done = threading.Event(), threading.Event()
+
+    def write_in_a_batch():
+        with bus.batch():
+            account.d.balance = 1
+            inside.set()
+            done.wait(1)
+
+    thread = threading.Thread(target=write_in_a_batch)
+    thread.start()
+    inside.wait(1)
+    # Not held back by the other thread's batch
+    other.d.balance = 2
+    assert [[change.new for change in changes] for changes in calls] == [[2]]
+    done.set()
+    thread.join()
+    assert [[change.new for change in changes] for changes in calls] == [[2], [1]]
+
+
+def test_batches_are_local_to_asyncio_tasks(bus):
+    account, other = Account(), Account()
+    calls = []
+    bus.observe(Account.balance, calls.append)
+
+    async def batched(instance, value):
+        with bus.batch():
+            instance.d.balance = value
+            await asyncio.sleep(0)
+            instance.d.balance = value + 1
+
+    async def main():
+        await asyncio.gather(batched(account, 1), batched(other, 10))
+
+    asyncio.run(main())
+    assert sorted((change.old, change.new) for changes in calls for change in changes) == [
+        (UNSET, 2), (UNSET, 11)
+    ]
+    assert len(calls) == 2
+
+
+def test_context_has_a_change_bus():
+    assert isinstance(S.context.changes, ChangeBus)
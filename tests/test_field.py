@@ -1,4 +1,5 @@
 from datetime import date, datetime, timedelta
+import threading
 import uuid
 
 import pytest
@@ -167,3 +168,251 @@ def test_uuid_field():
 
 
 # TODO: write more specific tests for field types
+
+
+def test_list_field_of_numbers_is_array_backed():
+    from array import array
+
+    class Series(S.Base):
+        samples = S.ListField(float)
+        counts = S.ListField(int)
+
+    s = Series()
+    s.d.samples.extend([1.0, 2.5])
+    s.d.counts = [1, 2, 3]
+    assert isinstance(s.d.samples, S.fields.ArraySequence)
+    assert isinstance(s.d.samples, S.fields.TypedSequence)
+    assert s.d.samples._data == array("d", [1.0, 2.5])
+    assert s.d.counts == S.fields.TypedSequence(int, [1, 2, 3])
+    assert s.m.json()["counts"] == [1, 2, 3]
+    with pytest.raises(TypeError):
+        s.d.samples.append(1)
+    with pytest.raises(TypeError):
+        s.d.counts.extend([1, "2"])
+    assert list(s.d.counts) == [1, 2, 3]
+
+
+def test_array_sequence_slice_assignment_and_memoryview():
+    seq = S.fields.TypedSequence(int, range(5))
+    seq[1:3] = [10, 20, 30]
+    assert list(seq) == [0, 10, 20, 30, 3, 4]
+    with pytest.raises(TypeError):
+        seq[0:1] = [1.5]
+    view = seq.memoryview()
+    assert view.format == "q"
+    assert view.tolist() == [0, 10, 20, 30, 3, 4]
+
+
+def test_array_sequence_accepts_numpy_arrays():
+    numpy = pytest.importorskip("numpy")
+    seq = S.fields.TypedSequence(float)
+    seq.extend(numpy.arange(3, dtype="float32"))
+    assert list(seq) == [0.0, 1.0, 2.0]
+    with pytest.raises(TypeError):
+        seq.extend(numpy.arange(3))
+
+
+def test_int_sequences_fall_back_to_lists_for_values_arrays_cant_hold():
+    import enum
+
+    class Color(enum.IntEnum):
+        RED = 1
+
+    for values in ([2 ** 63], [-2 ** 63 - 1], [Color.RED], [True]):
+        seq = S.fields.TypedSequence(int, values)
+        assert not isinstance(seq, S.fields.ArraySequence)
+        assert list(seq) == values and type(seq[0]) is type(values[0])
+    assert isinstance(S.fields.TypedSequence(int, [2 ** 63 - 1, -2 ** 63]), S.fields.ArraySequence)
+    with pytest.raises(OverflowError):
+        S.fields.TypedSequence(int, [1]).append(2 ** 63)
+
+
+def test_array_sequence_range_checks_uint64_arrays():
+    numpy = pytest.importorskip("numpy")
+    seq = S.fields.TypedSequence(int)
+    seq.extend(numpy.array([2 ** 63 - 1], dtype="uint64"))
+    assert list(seq) == [2 ** 63 - 1]
+    with pytest.raises(OverflowError):
+        seq.extend(numpy.array([2 ** 64 - 1], dtype="uint64"))
+    assert list(seq) == [2 ** 63 - 1]
+
+
+def test_typed_sequence_bulk_extend_is_all_or_nothing():
+    seq = S.fields.TypedSequence(str, ["a"])
+    seq.extend(["b", "c"])
+    seq += ("d",)
+    assert list(seq) == ["a", "b", "c", "d"]
+    with pytest.raises(TypeError):
+        seq.extend(["e", 1])
+    assert list(seq) == ["a", "b", "c", "d"]
+    seq[0:2] = ["x"]
+    assert list(seq) == ["x", "c", "d"]
+    with pytest.raises(TypeError):
+        seq[0:1] = [None]
+
+
+def test_list_field_adopts_typed_sequences_of_same_type():
+    class Test(S.Base):
+        names = S.ListField(str)
+
+    names = S.fields.TypedSequence(str, ["a", "b"])
+    t = Test(names=names)
+    assert t.d.names is names
+    t.d.names = ["c"]
+    assert t.d.names is not names
+    assert list(t.d.names) == ["c"]
+
+
+def test_list_field_does_not_share_sequences_between_instances():
+    class Test(S.Base):
+        names = S.ListField(str)
+        counts = S.ListField(int)
+
+    a, b = Test(names=["a"], counts=[1]), Test()
+    b.d.names = a.d.names
+    b.d.counts = a.d.counts
+    b.d.names.append("b")
+    b.d.counts.append(2)
+    assert list(a.d.names) == ["a"] and list(b.d.names) == ["a", "b"]
+    assert list(a.d.counts) == [1] and list(b.d.counts) == [1, 2]
+    names = S.fields.TypedSequence(str, ["x"])
+    a.d.names = names
+    b.d.names = names
+    assert a.d.names is names and b.d.names is not names
+
+
+def test_cached_computed_field_is_invalidated_by_its_dependencies():
+    calls = []
+
+    class Item(S.Base):
+        price = S.NumberField()
+
+    def order_total(self):
+        calls.append(self)
+        return sum(item.d.price for item in self.d.items) * self.d.factor
+
+    class Order(S.Base):
+        factor = S.NumberField(default=1)
+        items = S.ListField(Item)
+        note = S.StringField()
+        total = S.ComputedField(order_total, cache=True)
+
+    order = Order(items=[Item(price=2), Item(price=3)])
+    assert order.d.total == 5
+    assert order.d.total == 5
+    assert len(calls) == 1
+
+    order.d.note = "unrelated"
+    assert order.d.total == 5
+    assert len(calls) == 1
+
+    order.d.items[0].d.price = 10
+    assert order.d.total == 13
+    order.d.items.append(Item(price=1))
+    assert order.d.total == 14
+    order.d.factor = 2
+    assert order.d.total == 28
+    order.d.items = [Item(price=4)]
+    assert order.d.total == 8
+    assert len(calls) == 5
+
+
+def test_cached_computed_field_is_kept_per_instance():
+    class Square(S.Base):
+        side = S.NumberField()
+        area = S.ComputedField(lambda self: self.d.side ** 2, cache=True)
+
+    small, large = Square(side=2), Square(side=3)
+    assert (small.d.area, large.d.area) == (4, 9)
+    large.d.side = 4
+    assert (small.d.area, large.d.area) == (4, 16)
+    del small
+    assert len(Square.area._cached) == 1
+
+
+
+def test_cached_computed_field_ignores_reads_from_other_threads():
+    reading, done = threading.Event(), threading.Event()
+
+    def slow_area(self):
+        reading.set()
+        done.wait(5)
+        return self.d.side ** 2
+
+    class Square(S.Base):
+        side = S.NumberField()
+        area = S.ComputedField(slow_area, cache=True)
+
+    class Label(S.Base):
+        text = S.StringField()
+
+    square, label = Square(side=2), Label("a")
+    worker = threading.Thread(target=lambda: square.d.area)
+    worker.start()
+    reading.wait(5)
+    label.d.text
+    done.set()
+    worker.join()
+    dependencies = Square.area._cached[id(square)][2]
+    assert [field for _, _, field in dependencies] == [Square.side]
+
+def test_string_field_options_are_categorical():
+    class Ticket(S.Base):
+        status = S.StringField(options=["open", "closed"])
+
+    field = Ticket.status
+    assert field.categories == ("open", "closed")
+    assert field.encode("closed") == 1
+    assert field.decode(0) == "open"
+    with pytest.raises(ValueError):
+        field.encode("lost")
+    with pytest.raises(ValueError):
+        Ticket(status=["open"])
+    with pytest.raises(TypeError):
+        field.codes["lost"] = 2
+
+    # Values are stored as the field's shared option strings
+    first = Ticket("".join(["cl", "osed"]))
+    second = Ticket.m.from_json({"status": "".join(["clo", "sed"])})
+    assert first.status is second.status is field.categories[1]
+    assert first.m.json() == {"id": str(first.id), "status": "closed"}
+
+
+def test_interned_fields_share_values():
+    class Visit(S.Base):
+        country = S.StringField(intern=True)
+        day = S.DateField(intern=True)
+        note = S.StringField()
+
+    pool = S.context.intern_pool
+    saved = pool.saved_bytes
+    first = Visit("".join(["Bra", "zil"]), date(2020, 1, 1), "".join(["a", "b"]))
+    second = Visit.m.from_json({"country": "".join(["Br", "azil"]), "day": "2020-01-01", "note": "ab"})
+    assert first.country is second.country
+    assert first.day is second.day
+    assert first.note is not second.note
+    assert pool.saved_bytes > saved
+    assert pool.report()["saved_bytes"] == pool.saved_bytes
+
+
+def test_intern_pool_is_bounded():
+    from singularity.interning import InternPool
+
+    pool = InternPool(maxsize=2)
+    for value in ("a", "b", "c", 1, 1.0):
+        pool.intern(value)
+    assert len(pool) == 2
+    # Equal values of different types are kept apart
+    assert type(pool.intern(1.0)) is float
+    assert pool.report()["hits"] == 1
+
+
+def test_interned_fields_are_shared_when_decoded():
+    from singularity import codec
+
+    class Place(S.Base):
+        city = S.StringField(intern=True)
+
+    first = Place("".join(["Rec", "ife"]))
+    second = codec.decode(codec.encode(first), register=False)[0]
+    assert second.city is first.city
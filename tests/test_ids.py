@@ -0,0 +1,93 @@
+import os
+import uuid
+
+import pytest
+
+import singularity as S
+from singularity.ids import UUID7Generator, uuid7
+
+
+def test_uuid7_generator_returns_version_7_uuids():
+    id_ = uuid7()
+    assert isinstance(id_, uuid.UUID)
+    assert id_.version == 7
+    assert id_.variant == uuid.RFC_4122
+
+
+def test_uuid7_ids_are_time_ordered():
+    generator = UUID7Generator(block_size=16)
+    ids = [generator() for _ in range(1000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_id_factory_can_be_set_per_class():
+    class Test(S.Base, id_factory=uuid7):
+        pass
+
+    class SubTest(Test):
+        pass
+
+    assert Test().id.version == 7
+    assert SubTest().id.version == 7
+
+
+def test_id_factory_defaults_to_context_factory(monkeypatch):
+    class Test(S.Base):
+        pass
+
+    fixed = uuid.UUID(int=42)
+    monkeypatch.setattr(S.context, "id_factory", lambda: fixed)
+    assert Test().id == fixed
+
+
+def test_string_ids_are_parsed_unless_trusted():
+    id_ = uuid.uuid4()
+
+    class Test(S.Base):
+        pass
+
+    class TrustedTest(S.Base, trusted_ids=True):
+        pass
+
+    assert Test(id=str(id_)).id == id_
+    sentinel = object()
+    assert TrustedTest(id=sentinel).id is sentinel
+    with pytest.raises(ValueError):
+        Test(id="not an uuid")
+
+
+def test_from_json_preserves_id():
+    class Test(S.Base):
+        name = S.StringField()
+
+    t = Test("Rex")
+    new_t = Test.m.from_json(t.m.json())
+    assert new_t.id == t.id
+    assert S.context.data[t.id] is new_t._data
+
+
+def test_from_json_parses_trusted_ids():
+    class TrustedTest(S.Base, trusted_ids=True):
+        name = S.StringField()
+
+    t = TrustedTest("Rex")
+    new_t = TrustedTest.m.from_json(t.m.json())
+    assert isinstance(new_t.id, uuid.UUID)
+    assert new_t.id == t.id
+    assert S.codec.loads(S.codec.dumps(new_t)).id == t.id
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_uuid7_forked_children_do_not_repeat_the_parent():
+    generator = UUID7Generator()
+    generator()
+    read, write = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.write(write, generator().bytes)
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child_id = uuid.UUID(bytes=os.read(read, 16))
+    parent_id = generator()
+    assert child_id.int & 0xFFF_FFFF_FFFF_FFFF_FFFF != parent_id.int & 0xFFF_FFFF_FFFF_FFFF_FFFF
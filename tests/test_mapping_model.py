@@ -2,6 +2,10 @@ from datetime import date
 
 import pytest
 
+import singularity as S
+
+from fixtures import StrictPerson
+
 
 def test_attributes_can_be_read_as_mapping_items(dog):
     assert dog["name"] == "Rex"
@@ -121,3 +125,149 @@ def test_star_attribute_deletion_works(child, cat):
         assert not hasattr(pet.d, "name")
 
 
+
+
+def test_compiled_path_can_be_reused(child, cat):
+    child["father.pets"].append(cat)
+    names = type(child).m.compile_path("father.pets.*.name")
+    assert list(names.get_many(child)) == ["Rex", "Marie"]
+    assert type(child).m.compile_path("father.name").get(child) == "João"
+    assert type(child).m.compile_path("father.uncle").get(child, "none") == "none"
+
+
+def test_compiled_paths_are_cached(child):
+    assert child.m.compile_path("father.pets.0.name") is child.m.compile_path("father.pets.0.name")
+
+
+def test_star_path_yields_default_for_unresolved_branches(child, cat):
+    child["father.pets"].append(cat)
+    del child["father.pets.0.name"]
+    assert list(child.m.get_many("father.pets.*.name", "?")) == ["?", "Marie"]
+
+
+def test_get_with_out_of_range_index_returns_default(child):
+    assert child.get("father.pets.5.name") is None
+    with pytest.raises(KeyError):
+        child["father.pets.5.name"]
+
+
+def test_pluck_extracts_path_from_many_instances(person_strict_cls, strict_person):
+    people = [strict_person, person_strict_cls("Beatriz"), person_strict_cls()]
+    assert person_strict_cls.m.pluck(people, "name", default="") == ["João", "Beatriz", ""]
+    assert person_strict_cls.m.pluck(people, "pets.0.name") == ["Rex", None, None]
+
+
+def test_pluck_with_star_returns_values_and_offsets(person_strict_cls, strict_person, cat):
+    other = person_strict_cls("Beatriz")
+    other.d.pets.append(cat)
+    strict_person.d.pets.append(cat)
+    people = [strict_person, person_strict_cls(), other]
+    values, offsets = person_strict_cls.m.pluck(people, "pets.*.name")
+    assert values == ["Rex", "Marie", "Marie"]
+    assert list(offsets) == [0, 2, 2, 3]
+
+
+def test_pluck_numeric_leaves_into_arrays():
+    import singularity as S
+
+    class Point(S.Base):
+        x = S.NumberField()
+
+    points = [Point(i) for i in range(5)]
+    values = Point.m.pluck(points, "x", typecode="d")
+    assert values.typecode == "d"
+    assert list(values) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    numpy = pytest.importorskip("numpy")
+    values = Point.m.pluck(points, "x", dtype="float64")
+    assert isinstance(values, numpy.ndarray)
+    assert values.sum() == 10
+
+
+def test_update_sets_many_paths(child, cat):
+    child["father.pets"].append(cat)
+    child.m.update({
+        "name": "Pedro",
+        "father.name": "Renato",
+        "father.pets.*.species": "other",
+        "father.pets.1.name": "Mimi",
+    })
+    assert child["name"] == "Pedro"
+    assert child["father.name"] == "Renato"
+    assert [pet["species"] for pet in child["father.pets"]] == ["other", "other"]
+    assert child["father.pets.1.name"] == "Mimi"
+
+
+def test_update_can_replace_list_items(child, cat):
+    child.m.update({"father.pets.0": cat})
+    assert child["father.pets.0.name"] == "Marie"
+
+
+def test_update_is_atomic(child):
+    with pytest.raises(TypeError):
+        child.m.update({"name": "Pedro", "father.name": 10})
+    assert child["name"] == "Bruno"
+    with pytest.raises(ValueError):
+        child.m.update({"name": "Pedro", "father.pets.*.species": "lemur"})
+    assert child["name"] == "Bruno"
+    with pytest.raises(KeyError):
+        child.m.update({"name": "Pedro", "uncle.name": "Pedro"})
+    assert child["name"] == "Bruno"
+    with pytest.raises(KeyError):
+        child.m.update({"name": "Pedro", "father.pets.3.name": "Toto"})
+    assert child["name"] == "Bruno"
+
+
+def test_update_range_checks_array_items_before_setting():
+    class Counted(S.Base):
+        name = S.StringField()
+        counts = S.ListField(int)
+
+    counted = Counted("old", counts=[1])
+    with pytest.raises(OverflowError):
+        counted.m.update({"name": "new", "counts.0": 2 ** 70})
+    assert counted["name"] == "old"
+    assert list(counted.d.counts) == [1]
+
+
+def test_update_sets_edge_fields():
+    class Friend(S.Base):
+        name = S.StringField()
+        friends = S.EdgeField("Friend")
+
+    p, q = Friend("p"), Friend("q")
+    q.m.update({"friends": [p]})
+    assert list(q.d.friends) == [p]
+    with pytest.raises(TypeError):
+        q.m.update({"name": "r", "friends": ["p"]})
+    assert q.d.name == "q"
+
+
+def test_update_with_computed_field_setter_is_atomic():
+    class Named(S.Base):
+        name = S.StringField()
+        upper = S.ComputedField(lambda self: self.name.upper())
+
+    named = Named("a")
+    with pytest.raises(TypeError):
+        named.m.update({"name": "b", "upper": "X"})
+    assert named.name == "a"
+
+    class Settable(S.Base):
+        name = S.StringField()
+        upper = S.ComputedField(
+            lambda self: self.name.upper(),
+            lambda self, value: setattr(self, "name", value.lower()),
+        )
+
+    settable = Settable("a")
+    settable.m.update({"upper": "X"})
+    assert settable.name == "x"
+
+
+def test_update_rejects_overlapping_paths(child):
+    new_father = StrictPerson("Carlos")
+    with pytest.raises(KeyError):
+        child.m.update({"father": new_father, "father.name": "Renamed"})
+    with pytest.raises(KeyError):
+        child.m.update({"father.pets.*": None, "father.pets.0.name": "Toto"})
+    assert child["father.name"] != "Renamed"
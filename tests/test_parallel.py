@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+import singularity as S
+
+from fixtures import StrictPerson
+
+
+@pytest.fixture
+def people_json():
+    return [
+        {"name": f"Person {i}", "pets": [{"name": "Rex", "species": "dog", "birthday": "2015-01-01"}]}
+        for i in range(20)
+    ]
+
+
+def test_from_json_parallel_decodes_chunks_in_order(people_json):
+    chunks = [people_json[:7], json.dumps(people_json[7:15]), people_json[15:]]
+    people = StrictPerson.m.from_json_parallel(chunks, workers=2)
+    assert [person.d.name for person in people] == [f"Person {i}" for i in range(20)]
+    assert all(isinstance(person, StrictPerson) for person in people)
+    assert people[3].d.pets[0].d.name == "Rex"
+    assert S.context.get(people[3].id) is people[3]
+
+
+def test_from_json_parallel_unordered(people_json):
+    chunks = [people_json[:10], people_json[10:]]
+    people = StrictPerson.m.from_json_parallel(chunks, workers=2, ordered=False)
+    assert sorted(person.d.name for person in people) == sorted(item["name"] for item in people_json)
+
+
+def test_json_parallel_matches_json(strict_person):
+    people = [strict_person, StrictPerson("Beatriz")]
+    assert StrictPerson.m.json_parallel(people, workers=2, chunk_size=1) == [p.m.json() for p in people]
+
+
+def test_parallel_needs_module_level_models():
+    class Local(S.Base):
+        pass
+
+    with pytest.raises(TypeError):
+        Local.m.from_json_parallel([[{}]])
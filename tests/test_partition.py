@@ -0,0 +1,93 @@
+from datetime import date
+
+import pytest
+
+import singularity as S
+from singularity.partition import PartitionedContext, ShardError
+
+from fixtures import StrictPet, StrictPerson
+
+
+class Reading(S.Base):
+    sensor = S.StringField()
+    value = S.NumberField()
+
+
+def is_dog(pet):
+    return pet.d.species == "dog"
+
+
+def count_in_shard(context, cls):
+    return sum(1 for _ in context.instances(cls))
+
+
+@pytest.fixture(scope="module")
+def partitioned():
+    with PartitionedContext(shards=3) as partitioned:
+        yield partitioned
+
+
+@pytest.fixture
+def pets(partitioned):
+    pets = [
+        StrictPet(f"Pet {i}", "dog" if i % 3 else "cat", date(2015, 1, 1 + i))
+        for i in range(30)
+    ]
+    partitioned.load(pets)
+    yield pets
+    for pet in pets:
+        partitioned.remove(pet.id)
+
+
+def test_partitioned_context_spreads_instances(partitioned, pets):
+    per_shard = partitioned.map(count_in_shard, StrictPet)
+    assert len(per_shard) == 3
+    assert sum(per_shard) == partitioned.count(StrictPet) == 30
+    assert all(per_shard)
+
+
+def test_partitioned_context_routes_by_id(partitioned, pets):
+    pet = pets[4]
+    copy = partitioned.get(pet.id)
+    assert copy is not pet and copy.d.name == "Pet 4"
+    partitioned.update(pet.id, {"name": "Renamed"})
+    assert partitioned.get(str(pet.id)).d.name == "Renamed"
+    assert partitioned.get(S.ids.uuid4()) is None
+
+
+def test_partitioned_context_query(partitioned, pets):
+    dogs = partitioned.query(StrictPet, is_dog)
+    assert sorted(pet.d.name for pet in dogs) == sorted(pet.d.name for pet in pets if is_dog(pet))
+
+
+def test_partitioned_context_aggregate(partitioned):
+    pytest.importorskip("numpy")
+    readings = [Reading("a" if i % 2 else "b", i) for i in range(20)] + [Reading("c")]
+    partitioned.load(readings)
+    result = partitioned.aggregate(
+        Reading, group_by="sensor", sum="value", min="value", max="value", mean="value"
+    )
+    assert result["a"] == {
+        "count": 10, "sum_value": 100, "min_value": 1, "max_value": 19, "mean_value": 10
+    }
+    assert result["b"]["sum_value"] == 90 and result["b"]["min_value"] == 0
+    assert result["c"]["count"] == 1 and result["c"]["mean_value"] is None
+
+
+def test_partitioned_context_load_json_keeps_nested_instances_together(partitioned):
+    items = [
+        {"name": "Ana", "pets": [{"name": "Rex", "species": "dog", "birthday": "2015-01-01"}]},
+        {"name": "Rui", "pets": []},
+    ]
+    partitioned.load_json(StrictPerson, items)
+    people = partitioned.query(StrictPerson)
+    assert sorted(person.d.name for person in people) == ["Ana", "Rui"]
+    ana = next(person for person in people if person.d.name == "Ana")
+    assert partitioned.get(ana.d.pets[0].id).d.name == "Rex"
+    for person in people:
+        partitioned.remove(person.id)
+
+
+def test_partitioned_context_reports_shard_errors(partitioned):
+    with pytest.raises(ShardError):
+        partitioned.update(S.ids.uuid4(), {"name": "Nobody"})
@@ -0,0 +1,76 @@
+import json
+
+import singularity as S
+
+from fixtures import StrictPerson, StrictPet, Child
+
+
+def test_shared_children_are_written_once(strict_person, strict_dog):
+    other = StrictPerson("Beatriz")
+    other.d.pets.append(strict_dog)
+    child = Child("Bruno", father=strict_person, mother=other)
+
+    data = child.m.json(refs=True)
+    assert data["father"]["pets"][0]["name"] == "Rex"
+    assert data["mother"]["pets"] == [{"$ref": str(strict_dog.id)}]
+    # Plain JSON repeats the child
+    assert child.m.json()["mother"]["pets"][0]["name"] == "Rex"
+
+
+def test_shared_identity_is_restored(strict_person, strict_dog):
+    other = StrictPerson("Beatriz")
+    other.d.pets.append(strict_dog)
+    child = Child("Bruno", father=strict_person, mother=other)
+
+    payload = child.m.json(serialize=True, refs=True)
+    new_child = Child.m.from_json(json.loads(payload), refs=True)
+    assert new_child == child
+    assert new_child.d.father.d.pets[0] is new_child.d.mother.d.pets[0]
+
+
+class Node(S.Base):
+    label = S.StringField()
+    links = S.ListField("Node")
+
+
+def test_cycles_round_trip():
+    first, second = Node("first"), Node("second")
+    first.d.links.append(second)
+    second.d.links.append(first)
+    data = first.m.json(refs=True)
+    assert data["links"][0]["links"] == [{"$ref": str(first.id)}]
+
+    new_first = Node.m.from_json(data, refs=True)
+    new_second = new_first.d.links[0]
+    assert new_second.d.label == "second"
+    assert new_second.d.links[0] is new_first
+    for node in (first, second, new_first, new_second):
+        node.d.links.clear()
+
+
+def test_trusted_ids_are_parsed():
+    class Trusted(S.Base, trusted_ids=True):
+        label = S.StringField()
+
+    original = Trusted("a")
+    restored = Trusted.m.from_json(original.m.json(serialize=True, refs=True), refs=True)
+    assert restored.id == original.id
+    assert not isinstance(restored.id, str)
+
+
+class Link(S.Base):
+    label = S.StringField()
+    next = S.TypeField("Link")
+
+
+def test_long_chains_do_not_recurse():
+    first = node = Link("0")
+    for index in range(1, 1500):
+        node.d.next = Link(str(index))
+        node = node.d.next
+    data = first.m.json(refs=True)
+    restored = Link.m.from_json(data, refs=True)
+    for index in range(1500):
+        assert restored.d.label == str(index)
+        restored = getattr(restored.d, "next", None)
+    assert restored is None
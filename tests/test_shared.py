@@ -0,0 +1,169 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import singularity as S
+from singularity.shared import SharedContext, ReadOnlyError
+
+from fixtures import StrictPerson, StrictPet, Series
+
+
+def _worker_names(name, ids):
+    shared = SharedContext(name)
+    try:
+        return [shared.get(id_).d.name for id_ in ids]
+    finally:
+        shared.close()
+
+
+@pytest.fixture
+def snapshot(strict_person, cat):
+    snapshot = S.context.freeze_to_shared_memory()
+    yield snapshot
+    snapshot.close()
+    snapshot.unlink()
+
+
+def test_shared_context_finds_instances_by_id(snapshot, strict_person, cat):
+    frozen = snapshot.get(strict_person.id)
+    assert frozen is not strict_person
+    assert frozen.id == strict_person.id
+    assert frozen.d.name == "João"
+    assert frozen.d.pets[0].d.name == "Rex"
+    assert snapshot[str(cat.id)].d.species == "cat"
+    assert snapshot.get(S.ids.uuid4()) is None
+
+
+def test_shared_context_instances_are_read_only(snapshot, cat):
+    frozen = snapshot.get(cat.id)
+    with pytest.raises(ReadOnlyError):
+        frozen.d.name = "Garfield"
+    assert frozen.d.name == "Marie"
+
+
+def test_shared_context_instances_by_class(snapshot, strict_person, cat):
+    assert len(snapshot) >= 3
+    pet_ids = {pet.id for pet in snapshot.instances(StrictPet)}
+    assert cat.id in pet_ids and strict_person.id not in pet_ids
+    assert sorted(snapshot.ids()) == list(snapshot.ids())
+
+
+def test_shared_context_array_fields():
+    series = Series("s", samples=[1.5, 2.5])
+    snapshot = S.context.freeze_to_shared_memory(cls=Series)
+    try:
+        assert snapshot.get(series.id).d.samples.tolist() == [1.5, 2.5]
+    finally:
+        snapshot.close()
+        snapshot.unlink()
+
+
+def test_shared_context_attach_from_other_process(snapshot, strict_person, cat):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        names = executor.submit(_worker_names, snapshot.name, [cat.id, strict_person.id]).result()
+    assert names == ["Marie", "João"]
+
+
+def test_shared_context_with_cycles():
+    class Ring(S.Base):
+        label = S.StringField()
+        next = S.TypeField(S.Base)
+
+    first, second = Ring("first"), Ring("second")
+    first.d.next, second.d.next = second, first
+    snapshot = S.context.freeze_to_shared_memory(cls=Ring)
+    try:
+        frozen = snapshot.get(first.id)
+        assert frozen.d.next.d.label == "second"
+        assert frozen.d.next.d.next.id == first.id
+    finally:
+        snapshot.close()
+        snapshot.unlink()
+
+
+def test_shared_context_reads_defaults_without_writing():
+    class Tagged(S.Base):
+        n = S.NumberField(default=3)
+        tags = S.ListField(str)
+
+    tagged = Tagged()
+    snapshot = S.context.freeze_to_shared_memory(cls=Tagged)
+    try:
+        frozen = snapshot.get(tagged.id)
+        assert frozen.d.n == 3
+        assert list(frozen.d.tags) == []
+        assert "n" not in frozen._data and "tags" not in frozen._data
+        with pytest.raises(ReadOnlyError):
+            frozen.d.tags.append("x")
+    finally:
+        snapshot.close()
+        snapshot.unlink()
+
+
+def test_shared_context_nested_values_are_read_only(snapshot, strict_person):
+    frozen = snapshot.get(strict_person.id)
+    with pytest.raises(ReadOnlyError):
+        frozen.d.pets[0].d.name = "hacked"
+    with pytest.raises(ReadOnlyError):
+        frozen.d.pets.append(frozen.d.pets[0])
+    with pytest.raises(ReadOnlyError):
+        del frozen.d.pets[0]
+    assert frozen.d.pets[0].d.name == "Rex"
+    assert len(frozen.d.pets) == 1
+
+
+def test_shared_context_array_fields_are_read_only():
+    series = Series("s", samples=[1.5])
+    snapshot = S.context.freeze_to_shared_memory(cls=Series)
+    try:
+        samples = snapshot.get(series.id).d.samples
+        with pytest.raises(ReadOnlyError):
+            samples[0] = 2.0
+        assert samples.memoryview().readonly
+    finally:
+        snapshot.close()
+        snapshot.unlink()
+
+
+class Tags(S.Base, layout="record"):
+    name = S.StringField()
+    size = S.NumberField(default=1)
+    tags = S.ListField(str)
+    empty = S.ListField(str)
+
+
+def test_shared_context_record_layout_instances_are_read_only():
+    record = Tags("r", tags=["a"])
+    snapshot = S.context.freeze_to_shared_memory(cls=Tags)
+    try:
+        frozen = snapshot.get(record.id)
+        assert isinstance(frozen, Tags) and frozen.__class__ is Tags
+        assert frozen == record
+        assert (frozen.d.name, frozen.d.size, list(frozen.d.tags), list(frozen.d.empty)) == ("r", 1, ["a"], [])
+        with pytest.raises(ReadOnlyError):
+            frozen.d.name = "changed"
+        with pytest.raises(ReadOnlyError):
+            del frozen.d.name
+        with pytest.raises(ReadOnlyError):
+            frozen.d.tags.append("b")
+        with pytest.raises(ReadOnlyError):
+            frozen.d.empty.append("b")
+        assert frozen.d.name == "r"
+        assert Tags.m.from_bytes(frozen.m.to_bytes()) == record
+    finally:
+        snapshot.close()
+        snapshot.unlink()
+
+
+def test_shared_context_stores_each_instance_once(snapshot, strict_person):
+    dog = strict_person.d.pets[0]
+    frozen = snapshot.get(strict_person.id)
+    assert frozen.d.pets[0] is snapshot.get(dog.id)
+    size = snapshot.index_pos
+    strict_person.d.pets.extend([dog] * 20)
+    bigger = S.context.freeze_to_shared_memory()
+    try:
+        assert bigger.index_pos - size == 20 * 17
+    finally:
+        bigger.close()
+        bigger.unlink()
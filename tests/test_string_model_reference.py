@@ -55,7 +55,6 @@ def test_listfield_can_reference_own_class():
         p1.friends.append("")
 
 
-@pytest.mark.skip
 def test_edgefield_reciprocrates_inclusions():
     class Person(S.Base):
         name = S.StringField()
@@ -0,0 +1,101 @@
+import copy
+import gc
+
+import pytest
+
+import singularity as S
+from singularity.textindex import tokenize
+
+
+class Contact(S.Base):
+    name = S.StringField(text_index=True)
+    notes = S.StringField()
+
+
+class Product(S.Base):
+    code = S.StringField(text_index=lambda text: text.split("-"))
+
+
+@pytest.fixture
+def contacts():
+    S.context.text_indexes.clear()
+    return [
+        Contact("João Silva"),
+        Contact("Joana Souza"),
+        Contact("Maria Silva"),
+        Contact("John Jones Johnson"),
+    ]
+
+
+def names(instances):
+    return [instance.name for instance in instances]
+
+
+def test_default_tokenizer():
+    assert tokenize("João da Silva-Souza") == ["joão", "da", "silva", "souza"]
+
+
+def test_search_exact_term(contacts):
+    assert sorted(names(S.context.search(Contact, "name", "silva"))) == ["João Silva", "Maria Silva"]
+    assert S.context.search(Contact, "name", "pedro") == []
+
+
+def test_search_prefix(contacts):
+    found = names(S.context.search(Contact, "name", "jo*"))
+    assert sorted(found) == ["Joana Souza", "John Jones Johnson", "João Silva"]
+    # Three matching terms rank first
+    assert found[0] == "John Jones Johnson"
+
+
+def test_search_all_words_must_match(contacts):
+    assert names(S.context.search(Contact, "name", "jo* silva")) == ["João Silva"]
+
+
+def test_search_paging(contacts):
+    everything = S.context.search(Contact, "name", "jo*")
+    assert S.context.search(Contact, "name", "jo*", limit=2) == everything[:2]
+    assert S.context.search(Contact, "name", "jo*", limit=2, offset=2) == everything[2:]
+    scored = S.context.search(Contact, "name", "jo*", scores=True)
+    assert [instance for instance, score in scored] == everything
+    assert scored[0][1] > scored[-1][1]
+
+
+def test_index_follows_writes(contacts):
+    contacts[0].name = "Pedro Alves"
+    assert names(S.context.search(Contact, "name", "silva")) == ["Maria Silva"]
+    assert names(S.context.search(Contact, "name", "ped*")) == ["Pedro Alves"]
+    del contacts[2].name
+    assert S.context.search(Contact, "name", "silva") == []
+    assert "silva" not in S.context.text_index(Contact.name).terms
+
+
+def test_index_drops_collected_instances(contacts):
+    del contacts[:]
+    gc.collect()
+    assert S.context.search(Contact, "name", "jo*") == []
+    assert len(S.context.text_index(Contact.name)) == 0
+
+
+def test_index_includes_copies(contacts):
+    clone = copy.deepcopy(contacts[2])
+    assert clone in S.context.search(Contact, "name", "maria")
+
+
+def test_posting_lists_are_arrays(contacts):
+    numbers, counts = S.context.text_index(Contact.name).postings["silva"]
+    assert numbers.typecode == "q"
+    assert list(numbers) == sorted(numbers)
+    assert list(counts) == [1, 1]
+
+
+def test_custom_tokenizer():
+    product = Product("AB-12-X")
+    assert S.context.search(Product, "code", "12") == [product]
+    assert S.context.search(Product, "code", "AB-12") == [product]
+
+
+def test_search_needs_text_index(contacts):
+    with pytest.raises(TypeError):
+        S.context.search(Contact, "notes", "x")
+    with pytest.raises(KeyError):
+        S.context.search(Contact, "email", "x")
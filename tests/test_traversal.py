@@ -0,0 +1,87 @@
+import sys
+
+import pytest
+
+import singularity as S
+
+
+class Animal(S.Base):
+    name = S.StringField()
+
+
+class Member(S.Base):
+    name = S.StringField()
+    parent = S.TypeField("Member")
+    children = S.ListField("Member")
+    pets = S.ListField(Animal)
+    friends = S.EdgeField("Member")
+
+
+@pytest.fixture
+def family():
+    root = Member("root")
+    kids = [Member("kid0"), Member("kid1")]
+    root.children = kids
+    grandkid = Member("grandkid", parent=kids[0])
+    kids[0].children.append(grandkid)
+    grandkid.pets.append(Animal("Rex"))
+    kids[1].pets.append(Animal("Tom"))
+    return root
+
+
+def names(instances):
+    return [instance.name for instance in instances]
+
+
+def test_traverse_single_step(family):
+    assert names(S.context.traverse(family, "children")) == ["kid0", "kid1"]
+
+
+def test_traverse_multi_hop(family):
+    assert names(S.context.traverse(family, "children.children.pets")) == ["Rex"]
+
+
+def test_traverse_repeated_step(family):
+    assert names(S.context.traverse(family, "children+")) == ["kid0", "kid1", "grandkid"]
+    assert names(S.context.traverse(family, "children+.pets")) == ["Tom", "Rex"]
+
+
+def test_traverse_any_field(family):
+    assert sorted(names(S.context.traverse(family))) == ["Rex", "Tom", "grandkid", "kid0", "kid1"]
+
+
+def test_traverse_max_depth_and_limit(family):
+    assert names(S.context.traverse(family, "children+", max_depth=1)) == ["kid0", "kid1"]
+    assert names(S.context.traverse(family, "children+", limit=1)) == ["kid0"]
+    found = S.context.traverse(family, "children+", until=lambda member: member.name == "kid1")
+    assert names(found) == ["kid0", "kid1"]
+
+
+def test_traverse_incoming(family):
+    rex = next(S.context.traverse(family, "children.children.pets"))
+    assert names(S.context.traverse(rex, "pets.children+", direction="in")) == ["kid0", "root"]
+    grandkid = family.children[0].children[0]
+    assert names(S.context.traverse(grandkid, "parent", direction="both")) == ["kid0"]
+
+
+def test_traverse_edges_visits_each_instance_once():
+    members = [Member(str(i)) for i in range(5)]
+    for member in members:
+        member.friends.extend([other for other in members if other is not member])
+    found = list(S.context.traverse(members[0], "friends+"))
+    assert len(found) == 5
+    assert found[0] is members[1]
+
+
+def test_traverse_deep_chain_is_iterative():
+    chain = [Member(str(i)) for i in range(sys.getrecursionlimit() + 100)]
+    for parent, child in zip(chain, chain[1:]):
+        child.d.parent = parent
+    assert sum(1 for _ in S.context.traverse(chain[-1], "parent+")) == len(chain) - 1
+
+
+def test_traverse_invalid_arguments(family):
+    with pytest.raises(ValueError):
+        S.context.traverse(family, "children..pets")
+    with pytest.raises(ValueError):
+        S.context.traverse(family, direction="up")